@@ -1,20 +1,44 @@
+import os
 from typing import Sequence
 
 import click
 from arbol.arbol import aprint, asection
 
-from dexp.cli.parsing import channels_option, input_dataset_argument
+from dexp.cli.parsing import channels_option, input_dataset_argument, workers_option
 from dexp.datasets.zarr_dataset import ZDataset
 
 
 @click.command()
 @input_dataset_argument()
 @channels_option()
-def check(input_dataset: ZDataset, channels: Sequence[int]) -> None:
+@click.option(
+    "--verify",
+    "-v",
+    is_flag=True,
+    default=False,
+    help="Decompresses and hashes every chunk, and compares the hashes to the manifest of the dataset if it exists.",
+    show_default=True,
+)
+@click.option(
+    "--manifest",
+    "-m",
+    is_flag=True,
+    default=False,
+    help="Writes the chunk hashes to a manifest next to the dataset, for later verifications.",
+    show_default=True,
+)
+@workers_option()
+def check(input_dataset: ZDataset, channels: Sequence[int], verify: bool, manifest: bool, workers: int) -> None:
     """Checks the integrity of a dataset."""
 
+    if workers < 0:
+        workers = max(1, (os.cpu_count() or 1) // -workers)
+
     with asection(f"checking integrity of datasets {input_dataset.path}, channels: {channels}"):
-        result = input_dataset.check_integrity(channels)
+        if isinstance(input_dataset, ZDataset):
+            result = input_dataset.check_integrity(channels, verify=verify, write_manifest=manifest, workers=workers)
+        else:
+            result = input_dataset.check_integrity(channels)
         input_dataset.close()
 
         if not result:
@@ -27,9 +27,17 @@ from dexp.datasets.zarr_dataset import ZDataset
 @click.option(
     "--method",
     "-m",
-    type=str,
+    type=click.Choice(["lr", "alr", "wb", "admm"]),
     default="lr",
-    help="Deconvolution method: for now only lr (Lucy Richardson)",
+    help="Deconvolution method: lr (Lucy Richardson), alr (accelerated Lucy Richardson), wb (Lucy Richardson, same as lr, the Wiener-Butterworth back projector is selected with --back-projection wb) or admm",
+    show_default=True,
+)
+@click.option(
+    "--tolerance",
+    "-tol",
+    type=float,
+    default=None,
+    help="Reports convergence after each Lucy Richardson iteration and stops once the relative change of the estimate falls below this tolerance. By default all iterations are run.",
     show_default=True,
 )
 @click.option(
@@ -111,6 +119,7 @@ def deconv(
     channels: Sequence[str],
     tilesize: int,
     method: str,
+    tolerance: Optional[float],
     iterations: Optional[int],
     max_correction: int,
     power: float,
@@ -153,6 +162,7 @@ def deconv(
             psf_show=show_psf,
             scaling=scaling,
             devices=devices,
+            tolerance=tolerance,
         )
 
         input_dataset.close()
@@ -23,15 +23,25 @@ from dexp.datasets.zarr_dataset import ZDataset
 @multi_devices_option()
 @slicing_option()
 @tilesize_option()
+@click.option(
+    "--calibration-interval",
+    "-ci",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Number of time points between calibrations of the denoiser, the parameters of the time points in between "
+    "are interpolated. Use 1 to calibrate every time point.",
+)
 def denoise(
     input_dataset: BaseDataset,
     output_dataset: ZDataset,
     channels: Sequence[str],
     tilesize: int,
     devices: Union[str, Sequence[int]],
+    calibration_interval: int,
 ):
     """Denoises input image using butterworth filter, parameters are estimated automatically
-    using noise2self j-invariant cross-validation loss.
+    using noise2self j-invariant cross-validation loss on keyframes, and interpolated in between.
     """
     with asection(f"Denoising data to {output_dataset.path} for channels {channels}"):
         dataset_denoise(
@@ -40,6 +50,7 @@ def denoise(
             channels=channels,
             tilesize=tilesize,
             devices=devices,
+            calibration_interval=calibration_interval,
         )
 
     input_dataset.close()
@@ -1,9 +1,13 @@
 import os
+import shutil
 
 import click
 from arbol.arbol import aprint, asection
 
 from dexp.cli.parsing import _get_output_path, workers_option
+from dexp.datasets.chunk_integrity import manifest_path
+from dexp.utils.fastcopy import COMPARE_MODES
+from dexp.utils.fastcopy import fastcopy as fastcopy_engine
 from dexp.utils.robocopy import robocopy
 
 
@@ -12,27 +16,45 @@ from dexp.utils.robocopy import robocopy
 @click.option("--output_path", "-o")
 @workers_option()
 @click.option(
-    "--large_files", "-lf", is_flag=True, help="Set to true to speed up large file transfer", show_default=True
+    "--large_files",
+    "-lf",
+    is_flag=True,
+    help="Set to true to speed up large file transfer, only used on Windows (robocopy), ignored on other platforms",
+    show_default=True,
 )
-def fastcopy(input_path: str, output_path: str, workers: int, large_files: bool) -> None:
+@click.option(
+    "--compare",
+    "-c",
+    type=click.Choice(COMPARE_MODES),
+    default="mtime",
+    help="How files already identical at the destination are detected and skipped (Linux and OSX): "
+    "same size and modification time ('mtime'), or same size and content hash ('hash').",
+    show_default=True,
+)
+def fastcopy(input_path: str, output_path: str, workers: int, large_files: bool, compare: str) -> None:
     """Copies a dataset fast, with no processing, just moves the data as fast as possible. For each operating system it uses the best method."""
 
     output_path = _get_output_path(input_path, output_path, "_copy")
 
-    if workers == -1:
+    if workers < 0:
         workers = max(1, os.cpu_count() // abs(workers))
 
     with asection(f"Fast copying from: {input_path} to {output_path} "):
 
         from sys import platform
 
-        if platform == "linux" or platform == "linux2":
-            raise NotImplementedError("Fast copy not yet implemented for Linux")
-        elif platform == "darwin":
-            raise NotImplementedError("Fast copy not yet implemented for OSX")
-        elif platform == "win32":
+        if platform == "win32":
             robocopy(
                 input_path, output_path, nb_threads=workers, large_files=large_files or not (".zarr" in input_path)
             )
+        else:
+            # copy_file_range/sendfile on Linux, buffered copies elsewhere:
+            fastcopy_engine(input_path, output_path, nb_threads=workers, compare=compare)
+
+        # the manifest of chunk hashes is next to the dataset, with it the copy is verified with 'dexp check --verify'
+        # by hashing its chunks, without decompressing them:
+        if os.path.exists(manifest_path(input_path)):
+            shutil.copy2(manifest_path(input_path), manifest_path(output_path))
+            aprint(f"Copied manifest of chunk hashes to: '{manifest_path(output_path)}'")
 
         aprint("Done!")
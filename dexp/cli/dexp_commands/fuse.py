@@ -183,6 +183,15 @@ from dexp.datasets.operations.fuse import dataset_fuse
     default=False,
     help="Use this flag to remove beads before equalizing and fusing",
 )
+@click.option(
+    "--prefetch",
+    "-pf",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of time points whose views are loaded ahead while the current time point is processed, "
+    "0 to load them only when needed.",
+)
 def fuse(
     input_dataset: BaseDataset,
     output_dataset: ZDataset,
@@ -210,6 +219,7 @@ def fuse(
     white_top_hat_size: float,
     white_top_hat_sampling: int,
     remove_beads: bool,
+    prefetch: int,
 ):
     """Fuses the views of a multi-view light-sheet microscope dataset (available: simview and mvsols)"""
 
@@ -247,6 +257,7 @@ def fuse(
             white_top_hat_size=white_top_hat_size,
             white_top_hat_sampling=white_top_hat_sampling,
             remove_beads=remove_beads,
+            prefetch=prefetch,
         )
 
         input_dataset.close()
@@ -101,6 +101,15 @@ from dexp.datasets.operations.register import dataset_register
     default=False,
     help="Use this flag to remove beads before equalizing and fusing",
 )
+@click.option(
+    "--prefetch",
+    "-pf",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of time points whose views are loaded ahead while the current time point is processed, "
+    "0 to load them only when needed.",
+)
 def register(
     input_dataset: BaseDataset,
     out_model_path: str,
@@ -118,6 +127,7 @@ def register(
     white_top_hat_sampling: int,
     remove_beads: bool,
     devices: Sequence[int],
+    prefetch: int,
 ) -> None:
     """
     Computes registration model for fusing.
@@ -144,6 +154,7 @@ def register(
             remove_beads=remove_beads,
             max_proj=max_proj,
             devices=devices,
+            prefetch=prefetch,
         )
 
     input_dataset.close()
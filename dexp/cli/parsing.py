@@ -11,6 +11,7 @@ from toolz import curry
 from dexp.cli.defaults import DEFAULT_CLEVEL, DEFAULT_CODEC, DEFAULT_STORE
 from dexp.datasets import ZDataset
 from dexp.datasets.open_dataset import glob_datasets
+from dexp.datasets.zarr_dataset import CHUNKINGS, IO_ENGINES
 from dexp.utils import overwrite2mode
 
 
@@ -77,7 +78,7 @@ def parse_devices(devices: str) -> Union[str, Sequence[int]]:
 
 def _parse_chunks(chunks: Optional[str]) -> Optional[Tuple[int]]:
     if chunks is not None:
-        chunks = (int(c) for c in chunks.split(","))
+        chunks = tuple(int(c) for c in chunks.split(","))
     return chunks
 
 
@@ -194,6 +195,10 @@ def input_dataset_argument() -> Callable:
 
 def output_dataset_callback(ctx: click.Context, opt: click.Option, value: Optional[str]) -> None:
     mode = overwrite2mode(ctx.params.pop("overwrite"))
+    resume = ctx.params.pop("resume")
+    if resume:
+        # existing output is kept, only its uninitialized time points are processed:
+        mode = "a"
     if value is None:
         # new name with suffix if value is None
         value = _get_output_path(ctx.params["input_dataset"].path, None, "." + ctx.command.name)
@@ -206,6 +211,10 @@ def output_dataset_callback(ctx: click.Context, opt: click.Option, value: Option
         clevel=ctx.params.pop("clevel"),
         chunks=_parse_chunks(ctx.params.pop("chunks")),
         parent=ctx.params["input_dataset"],
+        io_engine=ctx.params.pop("io_engine"),
+        pyramid_levels=ctx.params.pop("pyramid_levels"),
+        chunking=ctx.params.pop("chunking"),
+        resume=resume,
     )
     # removing used parameters
     opt.expose_value = False
@@ -217,6 +226,16 @@ def output_dataset_options() -> Callable:
             "--output-path", "-o", default=None, help="Dataset output path.", callback=output_dataset_callback
         ),
         overwrite_option(),
+        click.option(
+            "--resume",
+            "-rs",
+            is_flag=True,
+            default=False,
+            help="Resumes an interrupted run: existing output channels are kept and only the time points "
+            "not yet written are processed.",
+            show_default=True,
+            is_eager=True,
+        ),
         click.option(
             "--store",
             "-st",
@@ -228,6 +247,17 @@ def output_dataset_options() -> Callable:
         click.option(
             "--chunks", "-chk", default=None, help="Dataset chunks dimensions, e.g. (1, 126, 512, 512).", is_eager=True
         ),
+        click.option(
+            "--chunking",
+            "-chg",
+            type=click.Choice(CHUNKINGS),
+            default="stack",
+            help="Chunking policy when chunks are not given: one chunk per stack (‘stack’) "
+            "or sub-volume chunks of at most 16 MB (‘subvolume’), use with the ‘ndir’ store "
+            "to group the chunks of each time point in one directory.",
+            show_default=True,
+            is_eager=True,
+        ),
         click.option(
             "--codec",
             "-z",
@@ -245,6 +275,24 @@ def output_dataset_options() -> Callable:
             show_default=True,
             is_eager=True,
         ),
+        click.option(
+            "--io-engine",
+            "-io",
+            type=click.Choice(IO_ENGINES),
+            default="zarr",
+            help="Library used to write the output dataset: ‘zarr’ or ‘tensorstore’",
+            show_default=True,
+            is_eager=True,
+        ),
+        click.option(
+            "--pyramid-levels",
+            "-pl",
+            type=click.IntRange(min=0),
+            default=0,
+            help="Number of downscaled levels (2x, 4x, 8x, ...) written along with each output channel.",
+            show_default=True,
+            is_eager=True,
+        ),
     ]
 
     def decorator(f: Callable) -> Callable:
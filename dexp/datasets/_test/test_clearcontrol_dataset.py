@@ -0,0 +1,66 @@
+import os
+import re
+from pathlib import Path
+
+import numpy
+import pytest
+
+from dexp.datasets.clearcontrol_dataset import CCDataset
+from dexp.io.compress_array import compress_array
+
+
+def _write_cc_dataset(path: Path, stacks: numpy.ndarray, compressed: bool) -> None:
+    channel = "C0L0"
+    os.makedirs(path / "stacks" / channel)
+    depth, height, width = stacks.shape[1:]
+    with open(path / f"{channel}.index.txt", "w") as index_file:
+        for time_point, stack in enumerate(stacks):
+            index_file.write(f"{time_point}\t{time_point * 0.5}\t{width}, {height}, {depth}\n")
+            file_name = path / "stacks" / channel / str(time_point).zfill(6)
+            if compressed:
+                with open(file_name.with_suffix(".blc"), "wb") as stack_file:
+                    stack_file.write(compress_array(stack, min_num_chunks=5))
+            else:
+                stack.astype("<u2").tofile(file_name.with_suffix(".raw"))
+
+
+def test_clearcontrol_dataset(tmp_path: Path):
+    stacks = numpy.random.randint(0, 4096, size=(2, 12, 32, 48), dtype=numpy.uint16)
+
+    for compressed in (True, False):
+        path = tmp_path / f"compressed_{compressed}"
+        _write_cc_dataset(path, stacks, compressed)
+
+        dataset = CCDataset(str(path), nb_threads=3)
+        assert dataset.channels() == ["C0L0"]
+        assert tuple(dataset.shape("C0L0")) == stacks.shape
+
+        for time_point in range(stacks.shape[0]):
+            stack = numpy.asarray(dataset.get_stack("C0L0", time_point))
+            assert numpy.array_equal(stack, stacks[time_point])
+
+        file_name = dataset._get_stack_file_name("C0L0", 1)
+        z_slice = dataset._get_slice_array_for_stack_file_and_z(file_name, stacks.shape[1:], 7)
+        assert numpy.array_equal(z_slice, stacks[1, 7])
+
+        z_range = dataset._get_z_range_array_for_stack_file(file_name, stacks.shape[1:], 3, 10)
+        assert numpy.array_equal(z_range, stacks[1, 3:10])
+
+        assert numpy.array_equal(numpy.asarray(dataset.get_array("C0L0")), stacks)
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_clearcontrol_dataset_truncated_file(tmp_path: Path, compressed: bool):
+    stacks = numpy.random.randint(0, 4096, size=(2, 12, 32, 48), dtype=numpy.uint16)
+    _write_cc_dataset(tmp_path, stacks, compressed)
+
+    dataset = CCDataset(str(tmp_path))
+    file_name = dataset._get_stack_file_name("C0L0", 1)
+    with open(file_name, "r+b") as stack_file:
+        stack_file.truncate(0 if compressed else stacks[0, :6].nbytes)
+
+    with pytest.raises(ValueError, match=re.escape(file_name)):
+        numpy.asarray(dataset.get_stack("C0L0", 1, per_z_slice=False))
+
+    with pytest.raises(ValueError, match=re.escape(file_name)):
+        dataset._get_z_range_array_for_stack_file(file_name, stacks.shape[1:], 3, 10)
@@ -1,6 +1,8 @@
 import tempfile
 from os.path import join
 
+import numpy
+import pytest
 from skimage.data import binary_blobs
 from skimage.filters import gaussian
 
@@ -56,3 +58,40 @@ def test_joined_dataset():
                 )
                 assert joined_dataset.shape(channel)[1:] == dataset.shape(channel)[1:]
                 assert joined_dataset.dtype(channel) == dataset.dtype(channel)
+
+
+def test_joined_array(tmp_path):
+    arrays = [numpy.random.rand(length, 4, 6, 8).astype("f4") for length in (3, 1, 5)]
+    datasets = []
+    for i, array in enumerate(arrays):
+        zdataset = ZDataset(path=join(tmp_path, f"test{i}.zarr"), mode="w")
+        zdataset.add_channel(name="channel", shape=array.shape, dtype=array.dtype)
+        zdataset.write_array("channel", array)
+        datasets.append(zdataset)
+
+    expected = numpy.concatenate(arrays)
+    joined_dataset = JoinedDataset(datasets)
+    joined_array = joined_dataset.get_array("channel")
+    assert joined_array.shape == expected.shape
+    assert joined_array.dtype == expected.dtype
+
+    assert joined_array.locate(3) == (1, 0)
+    assert joined_array.locate(-1) == (2, 4)
+    for time_point in range(len(expected)):
+        assert numpy.array_equal(joined_array[time_point], expected[time_point])
+        assert numpy.array_equal(joined_dataset.get_stack("channel", time_point), expected[time_point])
+
+    for key in (slice(None), slice(2, 7), slice(None, None, -2), [8, 0, 3, 4], (slice(1, 5), 2, slice(1, 3)), ...):
+        assert numpy.array_equal(joined_array[key], expected[key])
+    assert joined_array[5:5].shape == (0,) + expected.shape[1:]
+    assert numpy.array_equal(numpy.asarray(joined_array), expected)
+
+    stacks = joined_dataset["channel"]
+    assert numpy.array_equal(stacks[4], expected[4])
+
+    assert numpy.array_equal(joined_dataset.get_array("channel", wrap_with_dask=True).compute(), expected)
+    projection = joined_dataset.get_projection_array("channel", axis=0)
+    assert numpy.array_equal(projection[:], expected.max(axis=1))
+
+    with pytest.raises(IndexError):
+        joined_array[len(expected)]
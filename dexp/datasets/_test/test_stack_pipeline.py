@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import numpy
+import pytest
+
+from dexp.datasets import ZDataset
+from dexp.datasets.stack_pipeline import (
+    load_views,
+    pipelined_stack_processing,
+    process_stacks_to_dataset,
+    split_time_points,
+    split_time_points_for_workers,
+)
+
+
+def test_split_time_points():
+    batches = split_time_points(10, 3)
+    assert batches == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+    assert split_time_points(2, 4) == [[0], [1]]
+    assert split_time_points(4, 2, start=1) == [[1, 2], [3, 4]]
+    assert split_time_points(0, 2, start=1) == []
+
+    # remaining time points of a resumed channel:
+    assert split_time_points([0, 4, 5, 9, 11], 2) == [[0, 4, 5], [9, 11]]
+    assert split_time_points([], 3) == []
+
+
+def test_split_time_points_for_workers():
+    # several batches per worker, when there are enough time points:
+    batches = split_time_points_for_workers(100, 2)
+    assert len(batches) == 8
+    assert sum(batches, []) == list(range(100))
+
+    # batches are not shorter than the minimal length, but there is at least one batch per worker:
+    assert len(split_time_points_for_workers(20, 2)) == 5
+    assert len(split_time_points_for_workers(5, 3)) == 3
+    assert split_time_points_for_workers(2, 4) == [[0], [1]]
+    assert split_time_points_for_workers([], 2) == []
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1, 3])
+def test_pipelined_stack_processing(read_ahead: int):
+    written = []
+
+    def _write(t, output):
+        written.append(t)
+        return output + 1
+
+    results = pipelined_stack_processing(
+        range(7),
+        load_func=lambda t: t * 10,
+        process_func=lambda t, stack: stack + t,
+        write_func=_write,
+        read_ahead=read_ahead,
+    )
+
+    assert results == [t * 11 + 1 for t in range(7)]
+    assert written == list(range(7))
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1])
+@pytest.mark.parametrize("failing_stage", ["load", "process", "write"])
+def test_pipelined_stack_processing_error(failing_stage: str, read_ahead: int):
+    def _fail(stage: str, t: int, value):
+        if stage == failing_stage and t == 3:
+            raise RuntimeError(f"{stage} failed")
+        return value
+
+    with pytest.raises(RuntimeError, match=failing_stage):
+        pipelined_stack_processing(
+            range(7),
+            load_func=lambda t: _fail("load", t, t),
+            process_func=lambda t, stack: _fail("process", t, stack),
+            write_func=lambda t, output: _fail("write", t, output),
+            read_ahead=read_ahead,
+        )
+
+
+def test_process_stacks_to_dataset(tmp_path: Path):
+    shape = (5, 8, 9, 10)
+    array = numpy.random.uniform(size=shape).astype(numpy.float32)
+
+    in_ds = ZDataset(tmp_path / "in.zarr", mode="w")
+    in_ds.add_channel("channel", shape, dtype=array.dtype)
+    for t in range(shape[0]):
+        in_ds.write_stack("channel", t, array[t])
+
+    out_ds = ZDataset(tmp_path / "out.zarr", mode="w")
+    out_ds.add_channel("channel", shape, dtype=array.dtype)
+
+    for time_points in split_time_points(shape[0], 2):
+        process_stacks_to_dataset(
+            time_points,
+            stacks=in_ds["channel"],
+            process_func=lambda t, stack: stack * 2,
+            out_dataset=out_ds,
+            channel="channel",
+        )
+
+    assert out_ds.check_integrity()
+    numpy.testing.assert_allclose(out_ds.get_array("channel")[...], array * 2)
+
+
+def test_load_views(tmp_path: Path):
+    shape = (3, 4, 9, 10)
+    ds = ZDataset(tmp_path / "views.zarr", mode="w")
+    arrays = {}
+    for view in ("C0L0", "C0L1", "C1L0", "C1L1"):
+        arrays[view] = numpy.random.randint(0, 4096, size=shape, dtype=numpy.uint16)
+        ds.add_channel(view, shape, dtype=arrays[view].dtype)
+        for t in range(shape[0]):
+            ds.write_stack(view, t, arrays[view][t])
+
+    views = {view: ds[view] for view in arrays}
+    for workers in (None, 1):
+        views_tp = load_views(views, 1, workers=workers)
+        assert list(views_tp.keys()) == list(arrays.keys())
+        for view, stack in views_tp.items():
+            assert isinstance(stack, numpy.ndarray)
+            numpy.testing.assert_array_equal(stack, arrays[view][1])
@@ -2,12 +2,15 @@ import os
 from pathlib import Path
 
 import numpy
+import pytest
 from arbol import aprint
 from ome_zarr.utils import info
 from skimage.data import binary_blobs
 from skimage.filters import gaussian
+from skimage.transform import downscale_local_mean
 
 from dexp.datasets import ZDataset
+from dexp.datasets.chunk_integrity import chunk_hash, manifest_path, verify_chunks
 from dexp.utils.backends import NumpyBackend
 
 
@@ -187,3 +190,196 @@ def test_ome_zarr_convertion(tmp_path: Path):
     ome_zarr_path = tmp_path / "test_ome.ome.zarr"
     zdataset.to_ome_zarr(ome_zarr_path)
     aprint(list(info(ome_zarr_path, stats=True)))
+
+
+@pytest.mark.parametrize("store", ["dir", "ndir", "zip"])
+def test_tensorstore_io_engine(tmp_path: Path, store: str):
+    zdataset = ZDataset(path=tmp_path / "test", mode="w", store=store, io_engine="tensorstore")
+    zdataset.add_channel(name="first", shape=(4, 20, 30, 40), chunks=(1, 10, 15, 20), dtype="u2")
+    zdataset.add_channel(name="second", shape=(3, 10, 20, 30), dtype="f4")
+
+    rng = numpy.random.default_rng(0)
+    first = rng.integers(0, 1000, size=(4, 20, 30, 40), dtype=numpy.uint16)
+    second = rng.random(size=(3, 10, 20, 30), dtype=numpy.float32)
+
+    for i in range(first.shape[0]):
+        zdataset.write_stack("first", i, first[i])
+    zdataset.write_array("second", second)
+    path = zdataset.path
+    zdataset.close()
+
+    for io_engine in ("zarr", "tensorstore"):
+        zdataset = ZDataset(path=path, mode="r", io_engine=io_engine)
+        assert zdataset.io_engine == io_engine
+        assert zdataset.dtype("first") == numpy.uint16
+        assert zdataset.chunk_shape("first") == (1, 10, 15, 20)
+
+        for i in range(first.shape[0]):
+            assert numpy.all(zdataset.get_stack("first", i) == first[i])
+            assert numpy.all(zdataset["first"][i] == first[i])
+            for axis in range(3):
+                projection = numpy.asarray(zdataset.get_projection_array("first", axis=axis)[i])
+                assert numpy.all(projection == first[i].max(axis=axis))
+
+        assert numpy.all(numpy.asarray(zdataset.get_array("second")) == second)
+        assert zdataset.check_integrity()
+        zdataset.close()
+
+
+def test_zip_stacks_without_tensorstore(tmp_path: Path, monkeypatch):
+    zdataset = ZDataset(path=tmp_path / "test", mode="w", store="zip")
+    zdataset.add_channel(name="first", shape=(2, 10, 20, 30), dtype="u2")
+    first = numpy.random.default_rng(0).integers(0, 1000, size=(2, 10, 20, 30), dtype=numpy.uint16)
+    for i in range(first.shape[0]):
+        zdataset.write_stack("first", i, first[i])
+    path = zdataset.path
+    zdataset.close()
+
+    # tensorstore releases without the zip key-value store can't open zip stores:
+    def _load_tensorstore(self, array):
+        raise ValueError("zip key-value store not available")
+
+    monkeypatch.setattr(ZDataset, "_load_tensorstore", _load_tensorstore)
+
+    zdataset = ZDataset(path=path, mode="r")
+    for i in range(first.shape[0]):
+        assert numpy.all(zdataset["first"][i] == first[i])
+    zdataset.close()
+
+
+def test_invalid_io_engine(tmp_path: Path):
+    with pytest.raises(ValueError):
+        ZDataset(path=tmp_path / "test.zarr", mode="w", io_engine="hdf5")
+
+
+@pytest.mark.parametrize("io_engine", ["zarr", "tensorstore"])
+def test_pyramid_levels(tmp_path: Path, io_engine: str):
+    zdataset = ZDataset(path=tmp_path / "test.zarr", mode="w", store="dir", io_engine=io_engine)
+    zdataset.add_channel(name="first", shape=(3, 20, 30, 41), chunks=(1, 10, 15, 20), dtype="f4", pyramid_levels=3)
+    zdataset.add_channel(name="second", shape=(3, 20, 30, 41), dtype="f4")
+
+    assert zdataset.pyramid_levels("first") == 3
+    assert zdataset.pyramid_levels("second") == 0
+    assert zdataset.get_pyramid_array("second", 1) is None
+    assert "first_pyramid_1" not in zdataset.channels()
+
+    rng = numpy.random.default_rng(0)
+    array = rng.random(size=(3, 20, 30, 41), dtype=numpy.float32)
+    for i in range(array.shape[0]):
+        zdataset.write_stack("first", i, array[i])
+
+    assert numpy.asarray(zdataset.get_pyramid_array("first", 0)).shape == (3, 20, 30, 41)
+    expected_shapes = [(3, 10, 15, 21), (3, 5, 8, 11), (3, 3, 4, 6)]
+    for i in range(array.shape[0]):
+        level_stack = array[i]
+        for level, expected_shape in enumerate(expected_shapes, start=1):
+            level_array = zdataset.get_pyramid_array("first", level)
+            assert level_array.shape == expected_shape
+            level_stack = downscale_local_mean(level_stack, (2, 2, 2))
+            assert numpy.allclose(numpy.asarray(level_array[i]), level_stack)
+
+
+def test_subvolume_chunking(tmp_path: Path):
+    shape = (2, 64, 512, 256)
+    assert ZDataset._default_chunks(shape, "u2") == (1, 64, 512, 256)
+
+    chunks = ZDataset._default_chunks(shape, "u2", chunking="subvolume", chunk_size=2**18)
+    assert chunks == (1, 32, 64, 64)
+    assert numpy.prod(chunks) * 2 <= 2**18
+
+    zdataset = ZDataset(path=tmp_path / "test.zarr", mode="w", store="ndir", chunking="subvolume")
+    zdataset.add_channel(name="first", shape=(2, 32, 1024, 1024), dtype="u2")
+    assert numpy.prod(zdataset.chunk_shape("first")) * 2 <= 2**24
+    assert zdataset.chunk_shape("first")[0] == 1
+
+    array = numpy.random.randint(0, 1000, size=(32, 1024, 1024), dtype=numpy.uint16)
+    zdataset.write_stack("first", 1, array)
+    assert numpy.array_equal(zdataset.get_stack("first", 1), array)
+    assert numpy.array_equal(zdataset.get_array("first")[1, 3:5, 100:200, 700:900], array[3:5, 100:200, 700:900])
+
+    with pytest.raises(ValueError):
+        ZDataset(path=tmp_path / "other.zarr", mode="w", chunking="cubes")
+
+
+@pytest.mark.parametrize("store", ["dir", "ndir"])
+def test_resume(tmp_path: Path, store: str):
+    path = tmp_path / "test.zarr"
+    stack = numpy.ones((8, 16, 16), dtype=numpy.uint16)
+
+    zdataset = ZDataset(path=path, mode="w", store=store, pyramid_levels=1)
+    zdataset.add_channel(name="first", shape=(5, 8, 16, 16), chunks=(1, 4, 8, 16), dtype="u2")
+    assert zdataset.uninitialized_time_points("first") == [0, 1, 2, 3, 4]
+    zdataset.write_stack("first", 1, stack)
+    zdataset.write_stack("first", 3, stack)
+    assert zdataset.uninitialized_time_points("first") == [0, 2, 4]
+    assert zdataset.first_uninitialized_time_point("first") == 0
+    with pytest.raises(ValueError):
+        zdataset.add_channel(name="first", shape=(5, 8, 16, 16), dtype="u2")
+    path = zdataset.path
+    zdataset.close()
+
+    with pytest.raises(ValueError):
+        ZDataset(path=path, mode="w-", resume=True)
+
+    zdataset = ZDataset(path=path, mode="a", resume=True)
+    array = zdataset.add_channel(name="first", shape=(5, 8, 16, 16), dtype="u2")
+    assert array.shape == (5, 8, 16, 16)
+    with pytest.raises(ValueError):
+        zdataset.add_channel(name="first", shape=(5, 8, 16, 16), dtype="f4")
+
+    for time_point in zdataset.uninitialized_time_points("first"):
+        zdataset.write_stack("first", time_point, stack)
+    assert zdataset.uninitialized_time_points("first") == []
+    assert zdataset.first_uninitialized_time_point("first") == 4
+
+
+@pytest.mark.parametrize("store", ["dir", "ndir"])
+def test_check_integrity_manifest(tmp_path: Path, store: str):
+    zdataset = ZDataset(path=tmp_path / "test.zarr", mode="w", store=store)
+    zdataset.add_channel(name="first", shape=(3, 8, 16, 16), chunks=(1, 4, 8, 16), dtype="u2")
+    zdataset.add_channel(name="second", shape=(3, 8, 16, 16), dtype="u2")
+    stack = numpy.random.randint(0, 1000, size=(8, 16, 16), dtype=numpy.uint16)
+    for time_point in range(3):
+        zdataset.write_stack("first", time_point, stack)
+
+    # the second channel is checked too:
+    assert not zdataset.check_integrity()
+    for time_point in range(3):
+        zdataset.write_stack("second", time_point, stack)
+    assert zdataset.check_integrity(verify=True, write_manifest=True)
+    assert os.path.exists(manifest_path(zdataset.path))
+    assert zdataset.check_integrity(verify=True)
+
+    # corrupted chunk, detected by its hash:
+    array = zdataset._get_zarr_array("first")
+    separator = "/" if store == "ndir" else "."
+    key = f"{array.path}/1{separator}0{separator}0{separator}0"
+    data = bytearray(array.chunk_store[key])
+    data[-1] ^= 0xFF
+    array.chunk_store[key] = bytes(data)
+    assert zdataset.check_integrity(["second"], verify=True)
+    assert not zdataset.check_integrity(["first"], verify=True)
+
+    # missing chunk:
+    del array.chunk_store[key]
+    assert not zdataset.check_integrity(["first"])
+
+
+def test_verify_chunks_incremental(tmp_path: Path):
+    zdataset = ZDataset(path=tmp_path / "test.zarr", mode="w")
+    zdataset.add_channel(name="channel", shape=(2, 8, 16, 16), chunks=(1, 8, 16, 16), dtype="u2")
+    zdataset.write_array("channel", numpy.random.randint(0, 1000, size=(2, 8, 16, 16), dtype=numpy.uint16))
+    array = zdataset._get_zarr_array("channel")
+    arrays = {array.path: array}
+    manifest, corrupted = verify_chunks(arrays)
+    assert corrupted == {}
+
+    # a chunk that can't be decompressed, but whose hash is in the manifest, is not decompressed again:
+    key = f"{array.path}/1.0.0.0"
+    array.chunk_store[key] = b"not a blosc chunk"
+    manifest[array.path]["1.0.0.0"] = chunk_hash(b"not a blosc chunk")
+    assert verify_chunks(arrays, manifest=manifest)[1] == {}
+
+    # without the manifest entry, the new chunk is decompressed:
+    del manifest[array.path]["1.0.0.0"]
+    assert verify_chunks(arrays, manifest=manifest)[1] == {array.path: ["1.0.0.0"]}
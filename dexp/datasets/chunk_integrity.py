@@ -0,0 +1,150 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+import zarr
+from arbol import aprint
+
+# Manifests of chunk hashes are written next to the dataset, with this suffix:
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Hash of the stored (compressed) bytes of each chunk, hashlib releases the GIL while hashing:
+HASH_ALGORITHM = "blake2b-128"
+
+
+def manifest_path(dataset_path: str) -> str:
+    """Returns the path of the manifest of chunk hashes of a dataset."""
+    return dataset_path.rstrip("/") + MANIFEST_SUFFIX
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, str]]:
+    """Loads a manifest of chunk hashes: array path -> chunk key -> hash, empty if there is no manifest."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("algorithm") != HASH_ALGORITHM:
+        aprint(f"Ignoring manifest '{path}' with unsupported hash algorithm: {manifest.get('algorithm')}")
+        return {}
+    return manifest["chunks"]
+
+
+def save_manifest(path: str, chunks: Dict[str, Dict[str, str]]) -> None:
+    """Saves a manifest of chunk hashes, atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump({"algorithm": HASH_ALGORITHM, "chunks": chunks}, manifest_file, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    aprint(f"Wrote manifest of {sum(len(hashes) for hashes in chunks.values())} chunk hashes to: '{path}'")
+
+
+def chunk_keys(array: zarr.Array) -> List[str]:
+    """Lists the stored chunks of an array, as '.' separated chunk indices."""
+    prog = re.compile(r"[./]".join([r"\d+"] * array.ndim) + "$")
+    return [key.replace("/", ".") for key in zarr.storage.listdir(array.chunk_store, array.path) if prog.match(key)]
+
+
+def missing_chunk_keys(array: zarr.Array) -> List[str]:
+    """Lists the chunks of an array that are not stored, as '.' separated chunk indices."""
+    stored = set(chunk_keys(array))
+    if len(stored) >= array.nchunks:
+        return []
+    indices = itertools.product(*(range(n) for n in array.cdata_shape))
+    return [key for key in (".".join(str(i) for i in index) for index in indices) if key not in stored]
+
+
+def chunk_store_key(array: zarr.Array, key: str) -> str:
+    """Returns the key in the chunk store of a chunk given as '.' separated chunk indices."""
+    separator = getattr(array, "_dimension_separator", None) or "."
+    return f"{array.path}/{key.replace('.', separator)}"
+
+
+def chunk_hash(data: bytes) -> str:
+    """Returns the hash of the stored (compressed) bytes of a chunk, as written in manifests."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _hash_chunk(array: zarr.Array, key: str, expected: Optional[str] = None) -> Tuple[Optional[str], int, bool]:
+    """
+    Returns the hash and size of a stored chunk, and whether it was decompressed.
+    Chunks whose hash is the expected one (from a manifest) were already verified and are not decompressed again,
+    the hash is None if the chunk can't be decompressed.
+    """
+    data = array.chunk_store[chunk_store_key(array, key)]
+    hashed = chunk_hash(data)
+    if expected is not None and hashed == expected:
+        return hashed, len(data), False
+    try:
+        if array.compressor is not None:
+            decoded = array.compressor.decode(data)
+            if len(memoryview(decoded).cast("B")) != numpy.prod(array.chunks, dtype=numpy.int64) * array.dtype.itemsize:
+                return None, len(data), True
+    except Exception as error:
+        aprint(f"Could not decompress chunk '{key}' of array '{array.path}': {error}")
+        return None, len(data), True
+    return hashed, len(data), True
+
+
+def verify_chunks(
+    arrays: Dict[str, zarr.Array],
+    manifest: Optional[Dict[str, Dict[str, str]]] = None,
+    workers: Optional[int] = None,
+) -> Tuple[Dict[str, Dict[str, str]], Dict[str, List[str]]]:
+    """
+    Hashes all stored chunks of the given arrays concurrently, and compares their hashes to those of a manifest
+    when given. Verification is incremental: chunks whose hash matches the manifest were verified when the manifest
+    was written and are not decompressed again, only new or changed chunks are decompressed.
+
+    Parameters
+    ----------
+    arrays : arrays to verify, indexed by their path.
+    manifest : previous chunk hashes (array path -> chunk key -> hash), chunks not in the manifest are only checked
+        for decompression, chunks with a different hash are corrupted.
+    workers : number of threads, by default the number of cores.
+
+    Returns
+    -------
+    Chunk hashes (array path -> chunk key -> hash), and corrupted chunks (array path -> chunk keys)
+    that can't be decompressed or whose hash differs from the manifest.
+    """
+    if manifest is None:
+        manifest = {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    tasks = [(path, key) for path, array in arrays.items() for key in chunk_keys(array)]
+
+    def _verify(task: Tuple[str, str]) -> Tuple[Optional[str], int, bool]:
+        path, key = task
+        return _hash_chunk(arrays[path], key, manifest.get(path, {}).get(key))
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(_verify, tasks))
+    elapsed = time.time() - start
+
+    hashes = {path: {} for path in arrays}
+    corrupted = {}
+    nbytes = 0
+    nb_decompressed = 0
+    for (path, key), (hashed, size, decompressed) in zip(tasks, results):
+        nbytes += size
+        nb_decompressed += decompressed
+        expected = manifest.get(path, {}).get(key)
+        if hashed is None or (expected is not None and expected != hashed):
+            corrupted.setdefault(path, []).append(key)
+        if hashed is not None:
+            hashes[path][key] = hashed
+
+    aprint(
+        f"Verified {len(tasks)} chunks ({nbytes / 1e6:.1f} MB) in {elapsed:.2f}s "
+        f"({nbytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s) with {workers} threads, "
+        f"{len(tasks) - nb_decompressed} chunks matched the manifest and were not decompressed."
+    )
+    return hashes, corrupted
@@ -1,9 +1,11 @@
+import mmap
 import os
 import re
+from contextlib import contextmanager
 from fnmatch import fnmatch
 from os import listdir
 from os.path import exists, join
-from typing import Any, List, Sequence, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 
 import numpy as np
 from arbol.arbol import aprint
@@ -11,17 +13,28 @@ from cachey import Cache
 from dask import array, delayed
 
 from dexp.datasets.base_dataset import BaseDataset
-from dexp.io.compress_array import decompress_array
-from dexp.utils.config import config_blosc
+from dexp.io.compress_array import decompress_array, decompress_array_range
+from dexp.utils.config import config_blosc, inner_threads
 
 
 class CCDataset(BaseDataset):
-    def __init__(self, path, cache_size=8e9):
+    def __init__(self, path, cache_size=8e9, nb_threads: Optional[int] = None):
+        """Instantiates a ClearControl dataset.
+
+        Parameters
+        ----------
+        path : dataset folder.
+        cache_size : size in bytes of the cache of z slices.
+        nb_threads : number of threads decompressing the Blosc chunks of '.blc' stacks,
+            by default the number of threads per worker of the thread budget (see 'set_thread_budget').
+        """
 
         super().__init__(dask_backed=False, path=path)
 
         config_blosc()
 
+        self._nb_threads = inner_threads() if nb_threads is None else nb_threads
+
         self._channels = []
         self._index_files = {}
 
@@ -103,6 +116,18 @@ class CCDataset(BaseDataset):
         else:
             return raw_file_name
 
+    @staticmethod
+    @contextmanager
+    def _map_file(file_name):
+        # memory-maps a stack file, the compressed data is read by the OS as it is decompressed, without copies:
+        with open(file_name, "rb") as binary_file:
+            # an empty file can't be memory-mapped, e.g. when the acquisition was interrupted:
+            if os.fstat(binary_file.fileno()).st_size == 0:
+                raise ValueError(f"Stack file '{file_name}' is empty")
+            with mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                with memoryview(mapped_file) as buffer:
+                    yield buffer
+
     def _get_array_for_stack_file(self, file_name, shape=None, dtype=None):
 
         try:
@@ -113,13 +138,16 @@ class CCDataset(BaseDataset):
                 dt = dt.newbyteorder("L")
 
                 array = np.fromfile(file_name, dtype=dt)
+                if shape is not None and array.size != np.prod(shape, dtype=np.int64):
+                    raise ValueError(
+                        f"Stack file '{file_name}' of {array.size} voxels does not match the stack shape: {shape}"
+                    )
 
             elif file_name.endswith(".blc"):
                 array = np.empty(shape=shape, dtype=dtype)
-                with open(file_name, "rb") as binary_file:
-                    # Read the whole file at once
-                    data = binary_file.read()
-                    decompress_array(data, array)
+                with self._map_file(file_name) as data:
+                    # Blosc chunks are decompressed in parallel directly into the array:
+                    decompress_array(data, array, num_threads=self._nb_threads)
 
             # Reshape array:
             if shape is not None:
@@ -131,28 +159,38 @@ class CCDataset(BaseDataset):
             aprint(f"Could not find file: {file_name} for array of shape: {shape}")
             return np.zeros(shape, dtype=np.uint16)
 
-    def _get_slice_array_for_stack_file_and_z(self, file_name, shape, z):
+    def _get_z_range_array_for_stack_file(self, file_name, shape, z_start, z_stop):
 
+        nb_slices = z_stop - z_start
         try:
             if file_name.endswith(".raw"):
-                aprint(f"Accessing file: {file_name} at z={z}")
-
-                length = shape[1] * shape[2] * np.dtype(np.uint16).itemsize
-                offset = z * length
+                aprint(f"Accessing file: {file_name} at z in [{z_start}, {z_stop})")
 
                 dt = np.dtype(np.uint16)
                 dt = dt.newbyteorder("L")
 
-                array = np.fromfile(file_name, offset=offset, count=length, dtype=dt)
+                slice_length = shape[1] * shape[2]
+                offset = z_start * slice_length * dt.itemsize
+
+                array = np.fromfile(file_name, offset=offset, count=nb_slices * slice_length, dtype=dt)
+                if array.size != nb_slices * slice_length:
+                    raise ValueError(f"Stack file '{file_name}' is truncated, z range [{z_start}, {z_stop}) is missing")
             elif file_name.endswith(".blc"):
-                raise NotImplementedError("This type of access is not yet supported")
+                array = np.empty((nb_slices,) + tuple(shape[1:]), dtype=np.uint16)
+                offset = z_start * array[0].nbytes
+                with self._map_file(file_name) as data:
+                    # only the Blosc chunks overlapping the z range are decompressed:
+                    decompress_array_range(data, array, offset=offset, num_threads=self._nb_threads)
 
-            array = array.reshape(shape[1:])
+            array = array.reshape((nb_slices,) + tuple(shape[1:]))
             return array
 
         except FileNotFoundError:
-            aprint(f"Could  not find file: {file_name} for array of shape: {shape} at z={z}")
-            return np.zeros(shape[1:], dtype=np.uint16)
+            aprint(f"Could  not find file: {file_name} for array of shape: {shape} at z in [{z_start}, {z_stop})")
+            return np.zeros((nb_slices,) + tuple(shape[1:]), dtype=np.uint16)
+
+    def _get_slice_array_for_stack_file_and_z(self, file_name, shape, z):
+        return self._get_z_range_array_for_stack_file(file_name, shape, z, z + 1)[0]
 
     def close(self):
         # Nothing to do...
@@ -1,12 +1,123 @@
-from typing import Any, List, Sequence, Tuple
+from numbers import Integral
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 
 import numpy
+import zarr
 from arbol.arbol import aprint
 from dask.array import concatenate
 
 from dexp.datasets.base_dataset import BaseDataset
+from dexp.datasets.zarr_dataset import ZDataset
+
+
+def _read(array: Any, key: Tuple) -> numpy.ndarray:
+    result = array[key]
+    if hasattr(result, "read") and not isinstance(result, zarr.Array):
+        # tensorstore views are read asynchronously:
+        result = result.read().result()
+    return numpy.asarray(result)
+
+
+class _StackView:
+    """Array-like access to the stacks of a channel of a dataset without partial reads (e.g. ClearControl),
+    each requested stack is read whole with 'get_stack' and then sliced."""
+
+    def __init__(self, dataset: BaseDataset, channel: str):
+        self._dataset = dataset
+        self._channel = channel
+
+    def __getitem__(self, key: Tuple) -> numpy.ndarray:
+        time_key, rest = key[0], key[1:]
+        if isinstance(time_key, slice):
+            time_points = range(*time_key.indices(self._dataset.nb_timepoints(self._channel)))
+            return numpy.stack([self[(time_point,) + rest] for time_point in time_points])
+        stack = self._dataset.get_stack(self._channel, time_key, per_z_slice=False)
+        return numpy.asarray(stack)[rest]
+
+
+class JoinedArray:
+    """
+    Read-only view of arrays concatenated along their first (time) axis. A global time index is mapped to
+    a (sub-array, local time index) pair with a precomputed table of offsets, and the sub-array is then read
+    directly, without building any dask graph. Sub-arrays are only opened when first accessed.
+
+    Parameters
+    ----------
+    sources : functions returning each sub-array (zarr array, tensorstore, or any array indexable
+        by a tuple whose first element is a time point or a slice of time points).
+    lengths : number of time points of each sub-array.
+    shape : shape of a stack, i.e. of the sub-arrays without their time axis.
+    dtype : dtype of the sub-arrays.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[Callable[[], Any]],
+        lengths: Sequence[int],
+        shape: Tuple[int, ...],
+        dtype: numpy.dtype,
+    ):
+        self._sources = list(sources)
+        self._arrays: List[Optional[Any]] = [None] * len(self._sources)
+        self._offsets = numpy.concatenate(([0], numpy.cumsum(lengths, dtype=numpy.int64)))
+        self._shape = (int(self._offsets[-1]),) + tuple(shape)
+        self._dtype = numpy.dtype(dtype)
 
-# Configure multithreading for Dask:
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def dtype(self) -> numpy.dtype:
+        return self._dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self._shape)
+
+    def __len__(self) -> int:
+        return self._shape[0]
+
+    def __array__(self, dtype=None) -> numpy.ndarray:
+        return numpy.asarray(self[:], dtype=dtype)
+
+    def _array(self, index: int) -> Any:
+        if self._arrays[index] is None:
+            self._arrays[index] = self._sources[index]()
+        return self._arrays[index]
+
+    def locate(self, time_point: int) -> Tuple[int, int]:
+        """Returns the index of the sub-array holding a (global) time point, and the local time point in it."""
+        if time_point < 0:
+            time_point += len(self)
+        if not 0 <= time_point < len(self):
+            raise IndexError(f"Time point {time_point} out of bounds for joined array of length {len(self)}")
+        index = int(numpy.searchsorted(self._offsets, time_point, side="right")) - 1
+        return index, time_point - int(self._offsets[index])
+
+    def __getitem__(self, key: Any) -> numpy.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        time_key, rest = key[0], key[1:]
+        if time_key is Ellipsis:
+            time_key, rest = slice(None), key
+
+        if isinstance(time_key, Integral):
+            index, local_time_point = self.locate(int(time_key))
+            return _read(self._array(index), (local_time_point,) + rest)
+
+        # slices and sequences of time points are read by runs of consecutive time points within a sub-array:
+        time_points = numpy.arange(len(self))[time_key]
+        if len(time_points) == 0:
+            return numpy.empty((0,) + self._shape[1:], dtype=self._dtype)[(slice(None),) + rest]
+        indices = numpy.searchsorted(self._offsets, time_points, side="right") - 1
+        breaks = numpy.flatnonzero((numpy.diff(indices) != 0) | (numpy.diff(time_points) != 1)) + 1
+        runs = []
+        for start, stop in zip(numpy.concatenate(([0], breaks)), numpy.concatenate((breaks, [len(time_points)]))):
+            index = int(indices[start])
+            local_start = int(time_points[start] - self._offsets[index])
+            runs.append(_read(self._array(index), (slice(local_start, local_start + stop - start),) + rest))
+        return numpy.concatenate(runs)
 
 
 class JoinedDataset(BaseDataset):
@@ -60,22 +171,33 @@ class JoinedDataset(BaseDataset):
                     )
                     raise ValueError("All datasets must have the same exact dtype for the same channels!")
 
-        # Build concatenated dask arrays:
-        self._arrays = {}
-        self._projection_arrays = {}
-        for channel in self.channels():
-            self._arrays[channel] = concatenate(
+        # Time offsets of the datasets, the arrays are only opened when accessed:
+        self._arrays = {
+            channel: JoinedArray(
+                [self._source(dataset, channel) for dataset in self._dataset_list],
+                [dataset.nb_timepoints(channel) for dataset in self._dataset_list],
+                self.shape(channel)[1:],
+                self.dtype(channel),
+            )
+            for channel in self.channels()
+        }
+
+        # dask arrays are only concatenated when requested, see 'get_array':
+        self._dask_arrays = {}
+
+    @staticmethod
+    def _source(dataset: BaseDataset, channel: str) -> Callable[[], Any]:
+        if isinstance(dataset, ZDataset):
+            # zarr arrays are indexed directly, so that only the requested chunks are read:
+            return lambda: dataset.get_array(channel)
+        return lambda: _StackView(dataset, channel)
+
+    def _dask_array(self, channel: str):
+        if channel not in self._dask_arrays:
+            self._dask_arrays[channel] = concatenate(
                 dataset.get_array(channel, per_z_slice=False, wrap_with_dask=True) for dataset in self._dataset_list
             )
-
-            for axis in range(len(self.shape(channel)) - 1):
-                try:
-                    self._projection_arrays[f"{channel}/{axis}"] = concatenate(
-                        dataset.get_projection_array(channel, axis=axis, wrap_with_dask=True)
-                        for dataset in self._dataset_list
-                    )
-                except KeyError:
-                    self._projection_arrays[f"{channel}/{axis}"] = None
+        return self._dask_arrays[channel]
 
     def close(self):
         for dataset in self._dataset_list:
@@ -131,13 +253,31 @@ class JoinedDataset(BaseDataset):
         raise NotImplementedError("Method append_metadata is not available for a joined dataset!")
 
     def get_array(self, channel: str, per_z_slice: bool = False, wrap_with_dask: bool = False):
+        if wrap_with_dask:
+            return self._dask_array(channel)
         return self._arrays[channel]
 
     def get_stack(self, channel: str, time_point: int, per_z_slice: bool = False, wrap_with_dask: bool = False):
+        if wrap_with_dask:
+            return self._dask_array(channel)[time_point]
         return self._arrays[channel][time_point]
 
     def get_projection_array(self, channel: str, axis: int, wrap_with_dask: bool = False) -> Any:
-        return self._projection_arrays[f"{channel}/{axis}"]
+        projections = [
+            dataset.get_projection_array(channel, axis=axis, wrap_with_dask=wrap_with_dask)
+            for dataset in self._dataset_list
+        ]
+        if any(projection is None for projection in projections):
+            return None
+        if wrap_with_dask:
+            return concatenate(projections)
+        shape = tuple(projections[0].shape[1:])
+        return JoinedArray(
+            [lambda projection=projection: projection for projection in projections],
+            [projection.shape[0] for projection in projections],
+            shape,
+            self.dtype(channel),
+        )
 
     def add_channel(self, name: str, shape: Tuple[int, ...], dtype, enable_projections: bool = True, **kwargs) -> Any:
         raise NotImplementedError("Cannot write to a joined dataset!")
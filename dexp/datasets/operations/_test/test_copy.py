@@ -1,5 +1,12 @@
+import os
+
+import numpy
+import pytest
 from arbol import aprint
 
+from dexp.datasets import ZDataset
+from dexp.datasets.chunk_integrity import chunk_keys, manifest_path
+from dexp.datasets.operations.copy import dataset_copy
 from dexp.datasets.operations.demo.demo_copy import _demo_copy
 from dexp.utils.backends import CupyBackend, NumpyBackend
 
@@ -16,3 +23,79 @@ def test_copy_cupy():
 
     except ModuleNotFoundError:
         aprint("Cupy module not found! demo ignored")
+
+
+def test_copy_resume(tmp_path):
+    input_dataset = ZDataset(tmp_path / "input.zarr", mode="w")
+    input_dataset.add_channel("channel", shape=(6, 4, 8, 8), dtype="u2")
+    array = numpy.random.randint(0, 1000, size=(6, 4, 8, 8), dtype=numpy.uint16)
+    input_dataset.write_array("channel", array)
+
+    # interrupted copy, only some of the time points were written (recompressed with another codec):
+    output_dataset = ZDataset(tmp_path / "output.zarr", mode="w", codec="lz4")
+    output_dataset.add_channel("channel", shape=array.shape, dtype=array.dtype)
+    output_dataset.write_stack("channel", 2, array[2])
+    output_dataset.close()
+
+    output_dataset = ZDataset(tmp_path / "output.zarr", mode="a", codec="lz4", resume=True)
+    written = []
+    write_stack = output_dataset.write_stack
+
+    def _write_stack(channel, time_point, stack_array):
+        written.append(time_point)
+        write_stack(channel, time_point, stack_array)
+
+    output_dataset.write_stack = _write_stack
+    dataset_copy(input_dataset, output_dataset, channels=["channel"])
+
+    assert sorted(written) == [0, 1, 3, 4, 5]
+    assert numpy.array_equal(ZDataset(tmp_path / "output.zarr").get_array("channel")[:], array)
+
+
+@pytest.mark.parametrize("store", ["dir", "ndir", "zip"])
+def test_copy_compressed_chunks(tmp_path, store):
+    array = numpy.random.randint(0, 1000, size=(6, 4, 8, 8), dtype=numpy.uint16)
+    input_dataset = ZDataset(tmp_path / "input.zarr", mode="w", pyramid_levels=1)
+    input_dataset.add_channel("channel", shape=array.shape, dtype=array.dtype)
+    input_dataset.write_array("channel", array)
+
+    output_path = tmp_path / ("output.zarr.zip" if store == "zip" else "output.zarr")
+    output_dataset = ZDataset(output_path, mode="w", store=store, pyramid_levels=1)
+    assert output_dataset.can_copy_chunks_from(input_dataset, "channel")
+    output_dataset.write_stack = None  # stacks must not be decompressed and recompressed
+    dataset_copy(input_dataset, output_dataset, channels=["channel"], workers=2)
+
+    output_dataset = ZDataset(output_dataset.path, store=store)
+    for name, input_array in input_dataset._root_group["channel"].arrays():
+        assert numpy.array_equal(output_dataset._root_group["channel"][name][:], input_array[:])
+
+    # a different codec is recompressed:
+    assert not ZDataset(tmp_path / "other.zarr", mode="w", codec="lz4").can_copy_chunks_from(input_dataset, "channel")
+
+
+def test_copy_compressed_chunks_manifest(tmp_path):
+    array = numpy.random.randint(0, 1000, size=(4, 4, 8, 8), dtype=numpy.uint16)
+    input_dataset = ZDataset(tmp_path / "input.zarr", mode="w")
+    input_dataset.add_channel("channel", shape=array.shape, dtype=array.dtype)
+    input_dataset.write_array("channel", array)
+    assert input_dataset.check_integrity(write_manifest=True)
+
+    # copied chunks are checked against the source manifest, and their hashes added to the destination manifest:
+    output_dataset = ZDataset(tmp_path / "output.zarr", mode="w")
+    output_dataset.add_channel("channel", shape=array.shape, dtype=array.dtype)
+    output_dataset.copy_chunks_from(input_dataset, "channel")
+    assert os.path.exists(manifest_path(output_dataset.path))
+    assert output_dataset.check_integrity(verify=True)
+
+    # chunks corrupted at the source are not copied:
+    input_array = input_dataset._get_zarr_array("channel")
+    key = f"{input_array.path}/2.0.0.0"
+    data = bytearray(input_array.chunk_store[key])
+    data[-1] ^= 0xFF
+    input_array.chunk_store[key] = bytes(data)
+
+    other_dataset = ZDataset(tmp_path / "other.zarr", mode="w")
+    other_dataset.add_channel("channel", shape=array.shape, dtype=array.dtype)
+    with pytest.raises(ValueError, match="2.0.0.0"):
+        other_dataset.copy_chunks_from(input_dataset, "channel")
+    assert "2.0.0.0" not in chunk_keys(other_dataset._get_zarr_array("channel"))
@@ -1,11 +1,17 @@
 from pathlib import Path
 
+import numpy
 import pytest
 from arbol import asection
 
 from dexp.cli.parsing import parse_devices
 from dexp.datasets import ZDataset
-from dexp.datasets.operations.denoise import dataset_denoise
+from dexp.datasets.operations.denoise import (
+    _keyframes,
+    _parameter_trajectory,
+    _parameters_at,
+    dataset_denoise,
+)
 from dexp.utils.testing.testing import cupy_only
 
 
@@ -50,6 +56,29 @@ def test_dataset_denoise(dexp_nuclei_background_data, tmp_path: Path, display_te
     out_ds.close()
 
 
+def test_parameter_trajectory():
+    assert _keyframes(25, 10) == [0, 10, 20, 24]
+    assert _keyframes(21, 10) == [0, 10, 20]
+    assert _keyframes(3, 1) == [0, 1, 2]
+    assert _keyframes(1, 10) == [0]
+
+    keyframes = [0, 10, 20, 24]
+    parameters = [
+        dict(freq_cutoff=[0.2, 0.4, 0.4], order=2.0),
+        dict(freq_cutoff=[0.3, 0.5, 0.5], order=3.0),
+        dict(freq_cutoff=[0.9, 0.9, 0.9], order=6.0),  # failed calibration, removed by the running median
+        dict(freq_cutoff=[0.3, 0.5, 0.5], order=3.0),
+    ]
+    trajectory = _parameter_trajectory(keyframes, parameters)
+    assert trajectory["calibrated"] == parameters
+    assert trajectory["order"] == [2.0, 3.0, 3.0, 3.0]
+
+    params = _parameters_at(trajectory, 5)
+    assert numpy.allclose(params["freq_cutoff"], (0.25, 0.45, 0.45))
+    assert params["order"] == pytest.approx(2.5)
+    assert _parameters_at(trajectory, 24)["freq_cutoff"] == pytest.approx((0.3, 0.5, 0.5))
+
+
 if __name__ == "__main__":
     from dexp.utils.testing import test_as_demo
 
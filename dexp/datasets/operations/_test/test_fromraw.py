@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+import numpy
+import pytest
+
+from dexp.datasets import CCDataset, ZDataset
+from dexp.datasets.operations.fromraw import _valid_time_points_mask, dataset_fromraw
+from dexp.io.compress_array import compress_array
+
+
+def _brute_force_mask(ch_secs: numpy.ndarray, min_secs: numpy.ndarray) -> numpy.ndarray:
+    mask = numpy.ones(len(ch_secs), dtype=bool)
+    while mask.sum() > len(min_secs):
+        min_shift = numpy.flatnonzero(mask)[-1]
+        min_cost = numpy.abs(ch_secs[: len(min_secs)] - min_secs).sum()
+        for i in range(len(min_secs) - 1):
+            if not mask[i]:
+                continue
+            candidate = mask.copy()
+            candidate[i] = False
+            cost = numpy.abs(ch_secs[candidate][: len(min_secs)] - min_secs).sum()
+            if cost < min_cost:
+                min_cost = cost
+                min_shift = i
+        mask[min_shift] = False
+    return mask
+
+
+def test_valid_time_points_mask():
+    rng = numpy.random.default_rng(0)
+    min_secs = numpy.arange(40) * 2.0 + rng.uniform(-0.1, 0.1, 40)
+    for duplicates in ([5], [0, 17], [3, 4, 30], [39]):
+        ch_secs = numpy.sort(numpy.concatenate((min_secs, min_secs[duplicates] + 0.3)))
+        mask = _valid_time_points_mask(ch_secs, min_secs)
+        assert mask.sum() == len(min_secs)
+        assert numpy.array_equal(mask, _brute_force_mask(ch_secs, min_secs))
+
+
+def _write_cc_channel(path: Path, channel: str, stacks: numpy.ndarray, secs: numpy.ndarray) -> None:
+    os.makedirs(path / "stacks" / channel)
+    depth, height, width = stacks.shape[1:]
+    with open(path / f"{channel}.index.txt", "w") as index_file:
+        for time_point, (stack, sec) in enumerate(zip(stacks, secs)):
+            index_file.write(f"{time_point}\t{sec}\t{width}, {height}, {depth}\n")
+            file_name = path / "stacks" / channel / str(time_point).zfill(6)
+            with open(file_name.with_suffix(".blc"), "wb") as stack_file:
+                stack_file.write(compress_array(stack, min_num_chunks=3))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fromraw(tmp_path: Path, workers: int):
+    stacks = numpy.random.randint(0, 4096, size=(5, 6, 16, 24), dtype=numpy.uint16)
+    secs = numpy.arange(5) * 1.0
+
+    # the second channel has a duplicated time point at index 2:
+    duplicated = numpy.concatenate((stacks[:3], stacks[2:]))
+    duplicated_secs = numpy.concatenate((secs[:3], [2.4], secs[3:]))
+    _write_cc_channel(tmp_path / "raw", "C0L0", stacks, secs)
+    _write_cc_channel(tmp_path / "raw", "C1L0", duplicated, duplicated_secs)
+
+    in_dataset = CCDataset(str(tmp_path / "raw"))
+    out_dataset = ZDataset(tmp_path / "out.zarr", mode="w")
+    dataset_fromraw(in_dataset, out_dataset, channel_prefix=None, workers=workers)
+
+    out_dataset = ZDataset(tmp_path / "out.zarr")
+    for channel in ("C0L0", "C1L0"):
+        assert numpy.array_equal(out_dataset.get_array(channel)[:], stacks)
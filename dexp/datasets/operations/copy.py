@@ -8,6 +8,7 @@ from toolz import curry
 from dexp.datasets import BaseDataset, ZDataset
 from dexp.datasets.clearcontrol_dataset import CCDataset
 from dexp.datasets.stack_iterator import StackIterator
+from dexp.utils.config import set_thread_budget
 from dexp.utils.misc import compute_num_workers
 
 
@@ -53,15 +54,27 @@ def dataset_copy(
         with asection(f"Copying channel {channel}:"):
 
             aprint(f"Slicing with: {array.slicing}")
+            # without slicing nor zero level, identically encoded chunks are copied without being decompressed:
+            passthrough = (
+                zerolevel == 0 and array.slicing is None and output_dataset.can_copy_chunks_from(input_dataset, channel)
+            )
             output_dataset.add_channel(name=channel, shape=array.shape, dtype=array.dtype)
+            time_points = output_dataset.uninitialized_time_points(channel)
 
-            if workers == 1:
-                for i in range(len(array)):
+            if passthrough:
+                aprint("Source and destination chunks are encoded identically, copying compressed chunks.")
+                if len(time_points) > 0:
+                    n_threads = compute_num_workers(workers, len(time_points))
+                    output_dataset.copy_chunks_from(input_dataset, channel, time_points, workers=n_threads)
+            elif workers == 1:
+                set_thread_budget(1)
+                for i in time_points:
                     process(i)
-            else:
-                n_jobs = compute_num_workers(workers, len(array))
+            elif len(time_points) > 0:
+                n_jobs = compute_num_workers(workers, len(time_points))
+                set_thread_budget(n_jobs)
                 parallel = Parallel(n_jobs=n_jobs, backend=workersbackend)
-                parallel(delayed(process)(i) for i in range(len(array)))
+                parallel(delayed(process)(i) for i in time_points)
 
         if isinstance(input_dataset, CCDataset):
             time = input_dataset.time_sec(channel).tolist()
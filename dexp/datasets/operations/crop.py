@@ -13,6 +13,7 @@ from dexp.datasets.stack_iterator import StackIterator
 from dexp.datasets.zarr_dataset import ZDataset
 from dexp.processing.filters.fft_convolve import fft_convolve
 from dexp.utils.backends import Backend, BestBackend
+from dexp.utils.config import set_thread_budget
 from dexp.utils.misc import compute_num_workers
 
 
@@ -96,14 +97,17 @@ def dataset_crop(
             array = input_dataset[channel]
             output_dataset.add_channel(name=channel, shape=array.shape, dtype=array.dtype)
             process = _process(array=array, output_dataset=output_dataset, channel=channel)
+            time_points = output_dataset.uninitialized_time_points(channel)
 
             if workers == 1:
-                for i in range(len(array)):
+                set_thread_budget(1)
+                for i in time_points:
                     process(i)
-            else:
-                n_jobs = compute_num_workers(workers, len(array))
+            elif len(time_points) > 0:
+                n_jobs = compute_num_workers(workers, len(time_points))
+                set_thread_budget(n_jobs)
                 parallel = Parallel(n_jobs=n_jobs)
-                parallel(delayed(process)(i) for i in range(len(array)))
+                parallel(delayed(process)(i) for i in time_points)
 
     # Dataset info:
     aprint(output_dataset.info())
@@ -1,4 +1,3 @@
-import functools
 from pathlib import Path
 from typing import Callable, List, Optional, Sequence, Tuple
 
@@ -9,17 +8,20 @@ from arbol.arbol import aprint, asection
 from toolz import curry
 
 from dexp.datasets import BaseDataset
-from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    process_stacks_to_dataset,
+    split_time_points_for_workers,
+)
 from dexp.datasets.zarr_dataset import ZDataset
 from dexp.optics.psf.standard_psfs import nikon16x08na, olympus20x10na
 from dexp.processing.deconvolution import (
+    DeconvolutionPlan,
     admm_deconvolution,
     lucy_richardson_deconvolution,
 )
-from dexp.processing.filters.fft_convolve import fft_convolve
 from dexp.processing.utils.scatter_gather_i2i import scatter_gather_i2i
 from dexp.utils.backends import BestBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 
 
 def get_psf(
@@ -87,10 +89,28 @@ def get_deconv_func(
     power: float,
     wb_order: int,
     back_projection: str,
+    tolerance: Optional[float] = None,
 ) -> Callable:
-
-    if method == "lr" or method == "wb":
-        convolve = functools.partial(fft_convolve, in_place=False, mode="reflect", internal_dtype=np.float32)
+    """
+    Returns the deconvolution function of a given method: 'lr' (Lucy-Richardson),
+    'alr' (accelerated Lucy-Richardson, Biggs-Andrews vector extrapolation), 'wb' (same as 'lr', the back projector
+    is selected with back_projection) or 'admm'.
+    For (accelerated) Lucy-Richardson, if a tolerance is given the convergence is reported after each iteration
+    and iterations stop early once the relative change of the estimate falls below the tolerance.
+    """
+
+    if method in ("lr", "alr", "wb"):
+        # kernels and their spectra are shared by all tiles and time points:
+        plan = DeconvolutionPlan(
+            psf_kernel,
+            back_projection=back_projection,
+            wb_order=wb_order,
+            blind_spot=blind_spot,
+            blind_spot_mode="median+uniform",
+            blind_spot_axis_exclusion=(0,),
+            mode="reflect",
+            internal_dtype=np.float32,
+        )
 
         def deconv(image):
             min_value = image.min()
@@ -103,12 +123,9 @@ def get_deconv_func(
                 max_correction=max_correction,
                 normalise_minmax=(min_value, max_value),
                 power=power,
-                blind_spot=blind_spot,
-                blind_spot_mode="median+uniform",
-                blind_spot_axis_exclusion=(0,),
-                wb_order=wb_order,
-                back_projection=back_projection,
-                convolve_method=convolve,
+                plan=plan,
+                acceleration="biggs" if method == "alr" else None,
+                tolerance=tolerance,
             )
 
     elif method == "admm":
@@ -128,21 +145,17 @@ def get_deconv_func(
     return deconv
 
 
-@dask.delayed
 @curry
 def _process(
     time_point: int,
-    stacks: StackIterator,
-    out_dataset: ZDataset,
-    channel: str,
+    stack: np.ndarray,
+    nb_time_points: int,
+    out_dtype: np.dtype,
     deconv_func: Callable,
     scaling: Tuple[int],
-):
-
-    with asection(f"Deconvolving time point for time point {time_point}/{len(stacks)}"):
-        with asection(f"Loading channel: {channel}"):
-            stack = np.asarray(stacks[time_point])
+) -> np.ndarray:
 
+    with asection(f"Deconvolving time point for time point {time_point}/{nb_time_points}"):
         with BestBackend() as bkd:
             if any(s != 1.0 for s in scaling):
                 with asection(f"Applying scaling {scaling} to image."):
@@ -155,14 +168,9 @@ def _process(
                 stack = deconv_func(stack)
 
                 with asection("Moving array from backend to numpy."):
-                    stack = bkd.to_numpy(stack, dtype=out_dataset.dtype(channel), force_copy=False)
-
-            with asection(
-                f"Saving deconvolved stack for time point {time_point}, shape:{stack.shape}, dtype:{stack.dtype}"
-            ):
-                out_dataset.write_stack(channel=channel, time_point=time_point, stack_array=stack)
+                    stack = bkd.to_numpy(stack, dtype=out_dtype, force_copy=False)
 
-            aprint(f"Done processing time point: {time_point}/{len(stacks)} .")
+    return stack
 
 
 def dataset_deconv(
@@ -186,6 +194,7 @@ def dataset_deconv(
     psf_show: bool,
     scaling: Tuple[float],
     devices: List[int],
+    tolerance: Optional[float] = None,
 ):
     aprint(f"Input images will be scaled by: (sz,sy,sx)={scaling}")
 
@@ -201,6 +210,7 @@ def dataset_deconv(
         power,
         wb_order,
         back_projection,
+        tolerance,
     )
     deconv_func = curry(
         scatter_gather_i2i,
@@ -210,6 +220,18 @@ def dataset_deconv(
         normalise=method == "admm",
     )
 
+    # when there are fewer stacks than devices, time-parallelism can't use all devices,
+    # the tiles of each stack are then distributed over the devices instead:
+    nb_stacks = sum(len(input_dataset[channel]) for channel in channels)
+    if not isinstance(devices, str) and 1 < len(devices) and nb_stacks < len(devices):
+        aprint(f"Distributing the tiles of {nb_stacks} stack(s) over devices: {devices}")
+        deconv_func = deconv_func(devices=devices)
+        client = None
+    else:
+        # CUDA DASK cluster
+        client = get_dask_client(devices)
+        aprint("Dask Client", client)
+
     lazy_computation = []
 
     for channel in channels:
@@ -222,21 +244,30 @@ def dataset_deconv(
         output_dataset.add_channel(name=channel, shape=out_shape, dtype=dtype)
 
         process = _process(
-            stacks=stacks,
-            out_dataset=output_dataset,
-            channel=channel,
+            nb_time_points=len(stacks),
+            out_dtype=output_dataset.dtype(channel),
             scaling=scaling,
             deconv_func=deconv_func(internal_dtype=dtype),
         )
 
-        for t in range(len(stacks)):
-            lazy_computation.append(process(time_point=t))
+        # only the time points not yet written are processed when resuming:
+        time_points = output_dataset.uninitialized_time_points(channel)
 
-    dask.compute(*lazy_computation)
+        if client is None:
+            process_stacks_to_dataset(
+                time_points, stacks=stacks, process_func=process, out_dataset=output_dataset, channel=channel
+            )
+            continue
+
+        # contiguous batches of time points, several per worker, balanced between the workers:
+        for batch in split_time_points_for_workers(time_points, get_number_of_workers(client)):
+            lazy_computation.append(
+                dask.delayed(process_stacks_to_dataset)(
+                    batch, stacks=stacks, process_func=process, out_dataset=output_dataset, channel=channel
+                )
+            )
 
-    # CUDA DASK cluster
-    client = get_dask_client(devices)
-    aprint("Dask Client", client)
+    dask.compute(*lazy_computation)
 
     # Dataset info:
     aprint(output_dataset.info())
@@ -1,39 +1,116 @@
-from typing import Callable, Sequence, Tuple
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
 import dask
+import numpy as np
 from arbol import aprint, asection
+from scipy.ndimage import median_filter
 from toolz import curry
 
 from dexp.datasets import BaseDataset, ZDataset
 from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    process_stacks_to_dataset,
+    split_time_points,
+    split_time_points_for_workers,
+)
 from dexp.processing.denoising import calibrate_denoise_butterworth, denoise_butterworth
 from dexp.processing.utils.scatter_gather_i2i import scatter_gather_i2i
 from dexp.utils.backends import CupyBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 from dexp.utils.fft import clear_fft_plan_cache
 
+# Metadata key of the calibrated parameters of each channel (keyframes, cut-off frequencies and orders):
+CALIBRATION_KEY = "denoise_calibration"
+
+
+def _keyframes(nb_time_points: int, interval: int) -> List[int]:
+    """Returns the time points where the denoiser is calibrated: every 'interval' time points, and the last one."""
+    keyframes = list(range(0, nb_time_points, max(1, interval)))
+    if len(keyframes) > 0 and keyframes[-1] != nb_time_points - 1:
+        keyframes.append(nb_time_points - 1)
+    return keyframes
+
+
+def _calibrate_keyframes(keyframes: Sequence[int], stacks: StackIterator, channel: str) -> List[Dict[str, Any]]:
+    """
+    Calibrates the Butterworth denoiser on keyframes, in order: the first keyframe is calibrated with
+    a global search (SHGO + L-BFGS), the following ones with L-BFGS warm-started from the previous optimum.
+
+    Returns
+    -------
+    List of parameters (freq_cutoff and order) of each keyframe.
+    """
+    parameters = []
+    previous = None
+    with CupyBackend() as bkd:
+        for keyframe in keyframes:
+            with asection(f"Calibrating channel {channel} keyframe {keyframe}"):
+                stack = bkd.to_backend(np.asarray(stacks[keyframe]))
+                if previous is None:
+                    _, best_params = calibrate_denoise_butterworth(stack)
+                else:
+                    _, best_params = calibrate_denoise_butterworth(
+                        stack, optimiser="lbfgs", initial_parameters=previous
+                    )
+                previous = best_params
+                parameters.append(
+                    dict(
+                        freq_cutoff=[float(fc) for fc in best_params["freq_cutoff"]],
+                        order=float(best_params["order"]),
+                    )
+                )
+                del stack
+                clear_fft_plan_cache()
+    return parameters
+
+
+def _parameter_trajectory(keyframes: Sequence[int], parameters: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Smooths the parameters calibrated at the keyframes with a running median over 3 keyframes,
+    so that a single failed calibration does not affect its time points."""
+    freq_cutoffs = np.asarray([p["freq_cutoff"] for p in parameters], dtype=np.float64)
+    orders = np.asarray([p["order"] for p in parameters], dtype=np.float64)
+    return dict(
+        keyframes=list(keyframes),
+        freq_cutoff=median_filter(freq_cutoffs, size=(3, 1), mode="nearest").tolist(),
+        order=median_filter(orders, size=3, mode="nearest").tolist(),
+        calibrated=list(parameters),
+    )
+
+
+def _parameters_at(trajectory: Dict[str, Any], time_point: int) -> Dict[str, Any]:
+    """Returns the denoising parameters of a time point, linearly interpolated between keyframes."""
+    keyframes = trajectory["keyframes"]
+    freq_cutoffs = np.asarray(trajectory["freq_cutoff"])
+    freq_cutoff = tuple(
+        float(np.interp(time_point, keyframes, freq_cutoffs[:, i])) for i in range(freq_cutoffs.shape[1])
+    )
+    order = float(np.interp(time_point, keyframes, trajectory["order"]))
+    return dict(freq_cutoff=freq_cutoff, order=order)
+
 
 @curry
 def _process(
-    stacks: StackIterator,
-    out_dataset: ZDataset,
-    channel: str,
     time_point: int,
+    stack: np.ndarray,
+    channel: str,
+    trajectory: Dict[str, Any],
     scatter_gather: Callable,
-) -> None:
+) -> np.ndarray:
 
     with CupyBackend() as bkd:
-        with asection(f"Calibrating and denoising channel {channel} time point {time_point}"):
-            stack = bkd.to_backend(stacks[time_point])
-            _, best_params = calibrate_denoise_butterworth(stack)
+        with asection(f"Denoising channel {channel} time point {time_point}"):
+            stack = bkd.to_backend(stack)
+            best_params = _parameters_at(trajectory, time_point)
+            aprint(f"Interpolated parameters: {best_params}")
             denoise_fun = curry(denoise_butterworth, **best_params)
 
-            with asection("Denoising"):
-                denoised = scatter_gather(function=denoise_fun, image=stack)
+            denoised = scatter_gather(function=denoise_fun, image=stack)
 
-            out_dataset.write_stack(channel, time_point, bkd.to_numpy(denoised))
+            denoised = bkd.to_numpy(denoised)
             clear_fft_plan_cache()
 
+    return denoised
+
 
 def dataset_denoise(
     input_dataset: BaseDataset,
@@ -41,33 +118,70 @@ def dataset_denoise(
     channels: Sequence[str],
     tilesize: Tuple[int],
     devices: Sequence[int],
+    calibration_interval: int = 10,
 ):
-    # NOTE:
-    #   we might want in the future to smooth the parameters estimation over neighboring time points.
-    lazy_computations = []
+    """
+    Denoises the channels of a dataset with a Butterworth filter whose parameters are calibrated with
+    the Noise2Self J-invariance loss. The denoiser is only calibrated on keyframes, every 'calibration_interval'
+    time points, the parameters of the other time points are interpolated. The parameter trajectory is saved
+    in the output metadata and reused when resuming.
+
+    Parameters
+    ----------
+    input_dataset : input dataset.
+    output_dataset : output dataset.
+    channels : channels to denoise.
+    tilesize : tile size for scatter-gather processing.
+    devices : GPU devices.
+    calibration_interval : number of time points between keyframes, 1 calibrates every time point.
+    """
+    client = get_dask_client(devices)
+    aprint("Dask client", client)
+    nb_workers = get_number_of_workers(client)
 
     for ch in channels:
         stacks = input_dataset[ch]
         output_dataset.add_channel(ch, stacks.shape, dtype=input_dataset.dtype(ch))
+        time_points = output_dataset.uninitialized_time_points(ch)
+        if len(time_points) == 0:
+            continue
+
+        calibrations = output_dataset.get_metadata().get(CALIBRATION_KEY, {})
+        trajectory = calibrations.get(ch)
+        if trajectory is None:
+            keyframes = _keyframes(len(stacks), calibration_interval)
+            with asection(f"Calibrating channel {ch} on {len(keyframes)} keyframes: {keyframes}"):
+                # each worker calibrates a contiguous batch of keyframes, warm-starting from one keyframe to the next,
+                # one batch per worker, each additional batch would start with a global search:
+                lazy_calibrations = [
+                    dask.delayed(_calibrate_keyframes)(batch, stacks=stacks, channel=ch)
+                    for batch in split_time_points(keyframes, nb_workers)
+                ]
+                parameters = sum(dask.compute(*lazy_calibrations), [])
+
+            trajectory = _parameter_trajectory(keyframes, parameters)
+            calibrations[ch] = trajectory
+            output_dataset.append_metadata({CALIBRATION_KEY: calibrations})
+        else:
+            aprint(f"Reusing the calibration of channel {ch} on keyframes: {trajectory['keyframes']}")
 
         # Create processing function with default parameters
-        process = dask.delayed(
-            _process(
-                stacks=stacks,
-                out_dataset=output_dataset,
-                channel=ch,
-                scatter_gather=curry(scatter_gather_i2i, tiles=tilesize, margins=32),
-            )
+        process = _process(
+            channel=ch,
+            trajectory=trajectory,
+            scatter_gather=curry(scatter_gather_i2i, tiles=tilesize, margins=32),
         )  # using 32 because Jordao assumed it's good enough and 320 (default tile) + 64 = 384
         # has a nice prime factorization, speeding up fft computation
 
-        # Stores functions to be computed
-        lazy_computations += [process(time_point=t) for t in range(len(stacks))]
-
-    client = get_dask_client(devices)
-    aprint("Dask client", client)
+        # Stores functions to be computed, contiguous batches of time points balanced between the workers
+        lazy_computations = [
+            dask.delayed(process_stacks_to_dataset)(
+                batch, stacks=stacks, process_func=process, out_dataset=output_dataset, channel=ch
+            )
+            for batch in split_time_points_for_workers(time_points, nb_workers)
+        ]
 
-    # Compute everything
-    dask.compute(*lazy_computations)
+        # Compute everything
+        dask.compute(*lazy_computations)
 
     output_dataset.check_integrity()
@@ -2,36 +2,48 @@ from typing import Callable, List, Optional, Sequence
 
 import dask
 import fasteners
+import numpy as np
 from arbol.arbol import aprint, asection
 from toolz import curry
 
 from dexp.datasets import BaseDataset
 from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    pipelined_stack_processing,
+    split_time_points_for_workers,
+)
 from dexp.datasets.zarr_dataset import ZDataset
 from dexp.processing.deskew import deskew_functions
 from dexp.utils.backends import BestBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 from dexp.utils.lock import create_lock
 
 
-@dask.delayed
 @curry
 def _process(
     time_point: int,
-    stacks: StackIterator,
+    stack: np.ndarray,
     channel: str,
-    output_dataset: ZDataset,
-    lock: fasteners.InterProcessLock,
     deskew_func: Callable,
-) -> None:
+) -> np.ndarray:
     with asection(f"Deskweing channel {channel} at time point {time_point}."):
         with BestBackend() as bkd:
-            with asection("Loading data"):
-                stack = bkd.to_backend(stacks[time_point])
             with asection("Processing"):
+                stack = bkd.to_backend(stack)
                 stack = deskew_func(stack)
-            stack = bkd.to_numpy(stack)
+            return bkd.to_numpy(stack)
+
 
+@dask.delayed
+def _process_time_points(
+    time_points: Sequence[int],
+    stacks: StackIterator,
+    channel: str,
+    output_dataset: ZDataset,
+    lock: fasteners.InterProcessLock,
+    process: Callable,
+) -> None:
+    def _write(time_point: int, stack: np.ndarray) -> None:
         with lock:
             if channel not in output_dataset:
                 output_dataset.add_channel(
@@ -40,9 +52,17 @@ def _process(
                     dtype=stack.dtype,
                 )
 
-        with asection("Saving deskwed array"):
+        with asection(f"Saving deskwed array for time point {time_point}"):
             output_dataset.write_stack(channel, time_point, stack)
 
+    # loading of the next time point and saving of the previous one overlap with deskewing:
+    pipelined_stack_processing(
+        time_points,
+        load_func=lambda time_point: np.asarray(stacks[time_point]),
+        process_func=process,
+        write_func=_write,
+    )
+
 
 def dataset_deskew(
     input_dataset: BaseDataset,
@@ -86,28 +106,35 @@ def dataset_deskew(
         padding=padding,
     )
 
+    # setting up dask compute scheduler
+    client = get_dask_client(devices)
+    aprint("Dask client", client)
+
     lazy_computations = []
 
     # Iterate through channels
     for i, channel in enumerate(channels):
         stacks = input_dataset[channel]
         lock = create_lock(channel)
+        process = _process(channel=channel, deskew_func=deskew_func(flip_depth_axis=flips[i]))
+        # output channels are created with the first deskewed stack, when resuming only missing time points are left:
+        if channel in output_dataset:
+            time_points = output_dataset.uninitialized_time_points(channel)
+        else:
+            time_points = range(len(stacks))
+        # contiguous batches of time points, several per worker, balanced between the workers:
         lazy_computations += [
-            _process(
-                time_point=t,
+            _process_time_points(
+                batch,
                 stacks=stacks,
                 channel=channel,
-                lock=lock,
                 output_dataset=output_dataset,
-                deskew_func=deskew_func(flip_depth_axis=flips[i]),
+                lock=lock,
+                process=process,
             )
-            for t in range(len(stacks))
+            for batch in split_time_points_for_workers(time_points, get_number_of_workers(client))
         ]
 
-    # setting up dask compute scheduler
-    client = get_dask_client(devices)
-
-    aprint("Dask client", client)
     dask.compute(*lazy_computations)
 
     # shape and dtype of views to deskew:
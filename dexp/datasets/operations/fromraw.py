@@ -1,19 +1,95 @@
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 from arbol import aprint, asection
 from joblib import Parallel, delayed
-from toolz import curry
 
 from dexp.datasets import CCDataset, ZDataset
+from dexp.datasets.stack_pipeline import pipelined_stack_processing, split_time_points
+from dexp.utils.config import set_thread_budget
 from dexp.utils.misc import compute_num_workers
 
 
-@curry
-def _write(in_ds: CCDataset, out_ds: ZDataset, channel: str, indices: np.ndarray, index: int):
-    aprint(f"Writing time point {index} of channel {channel}")
-    stack = in_ds.get_stack(channel, indices[index])
-    out_ds.write_stack(channel, index, stack)
+def _valid_time_points_mask(ch_secs: np.ndarray, min_secs: np.ndarray) -> np.ndarray:
+    """
+    Finds the duplicated time points of a channel with more time points than the reference channel:
+    time points are dropped one at a time, each time the one whose removal best aligns the time stamps of the channel
+    with those of the reference channel, only the time stamps of the index are used (no stack is read).
+
+    Parameters
+    ----------
+    ch_secs : time stamps of the channel.
+    min_secs : time stamps of the reference channel, the channel with the least time points.
+
+    Returns
+    -------
+    Boolean mask of the time points of the channel to keep.
+    """
+    mask = np.ones(len(ch_secs), dtype=bool)
+    nb_time_points = len(min_secs)
+
+    while mask.sum() > nb_time_points:
+        valid = np.flatnonzero(mask)
+        secs = ch_secs[valid]
+
+        # cost of dropping the kept time point at position p: the time stamps before p are aligned as they are,
+        # and the ones after are shifted by one, computed for all positions at once with cumulative sums:
+        kept = np.abs(secs[:nb_time_points] - min_secs)
+        shifted = np.abs(secs[1 : nb_time_points + 1] - min_secs)
+        costs = np.concatenate(([0.0], np.cumsum(kept)))[:-1] + np.cumsum(shifted[::-1])[::-1]
+
+        # only time points before the last reference time point can be dropped, otherwise drops the last one:
+        candidates = np.flatnonzero(valid[:nb_time_points] < nb_time_points - 1)
+        min_shift = valid[-1]
+        if len(candidates) > 0:
+            best = candidates[np.argmin(costs[candidates])]
+            if costs[best] < np.abs(ch_secs[:nb_time_points] - min_secs).sum():
+                min_shift = valid[best]
+
+        aprint(f"Min. shift at {min_shift}.")
+        mask[min_shift] = False
+
+    return mask
+
+
+def _ingest(
+    time_points: Sequence[int],
+    in_ds: CCDataset,
+    out_ds: ZDataset,
+    channel: str,
+    indices: np.ndarray,
+    read_ahead: int,
+    write_behind: int,
+) -> None:
+    """Reads, checks and writes the stacks of the given time points, each stack is read once,
+    reading and writing overlap thanks to a pipeline with bounded queues."""
+    shape = tuple(out_ds.shape(channel)[1:])
+    dtype = out_ds.dtype(channel)
+
+    def _load(index: int) -> np.ndarray:
+        # whole stacks are read at once, without the per z-slice cache:
+        return np.asarray(in_ds.get_stack(channel, indices[index], per_z_slice=False))
+
+    def _check(index: int, stack: np.ndarray) -> np.ndarray:
+        if stack.shape != shape or stack.dtype != dtype:
+            raise ValueError(
+                f"Stack {indices[index]} of channel {channel} of shape: {stack.shape} and dtype: {stack.dtype} "
+                + f"does not match the output shape: {shape} and dtype: {dtype}"
+            )
+        return stack
+
+    def _write(index: int, stack: np.ndarray) -> None:
+        out_ds.write_stack(channel, index, stack)
+        aprint(f"Written time point {index} of channel {channel}")
+
+    pipelined_stack_processing(
+        time_points,
+        load_func=_load,
+        process_func=_check,
+        write_func=_write,
+        read_ahead=read_ahead,
+        write_behind=write_behind,
+    )
 
 
 def dataset_fromraw(
@@ -21,7 +97,23 @@ def dataset_fromraw(
     out_dataset: ZDataset,
     channel_prefix: Optional[str],
     workers: int,
+    read_ahead: int = 1,
+    write_behind: int = 2,
 ) -> None:
+    """
+    Converts a ClearControl dataset to zarr in a single streaming pass: duplicated time points are found
+    from the time stamps of the index, then each stack is read once, checked and written while the next stacks
+    are read (read ahead) and the previous ones are compressed and written (write behind).
+
+    Parameters
+    ----------
+    in_dataset : input ClearControl dataset.
+    out_dataset : output dataset.
+    channel_prefix : prefix of the channels to convert, all channels if None.
+    workers : number of workers, each converts a contiguous batch of time points.
+    read_ahead : maximal number of stacks read and waiting to be written, per worker.
+    write_behind : maximal number of stacks waiting to be compressed and written, per worker.
+    """
 
     if channel_prefix is not None:
         channels = list(filter(lambda x: x.startswith(channel_prefix), in_dataset.channels()))
@@ -38,43 +130,37 @@ def dataset_fromraw(
     min_secs = in_dataset.time_sec(argmin)
     min_time_pts = in_dataset.nb_timepoints(argmin)
 
-    ch_to_mask = {ch: np.ones(in_dataset.nb_timepoints(ch), dtype=bool) for ch in channels}
-
     aprint(f"Min. time points is {min_time_pts} at channel {argmin}.")
 
+    ch_to_mask = {}
     for ch in channels:
         ch_secs = in_dataset.time_sec(ch)
 
         with asection(f"Channel {ch} has {len(ch_secs)} time points."):
-            while ch_to_mask[ch].sum() > min_time_pts:
-                min_shift = ch_to_mask[ch].sum() - 1
-                min_cost = np.abs(ch_secs[: len(min_secs)] - min_secs).sum()  # this should be the current cost
-                for i in range(min_time_pts - 1):
-                    mask = ch_to_mask[ch].copy()
-                    if not mask[i]:
-                        continue
-                    mask[i] = False
-                    cost = np.abs(ch_secs[mask][: len(min_secs)] - min_secs).sum()
-                    if cost < min_cost:
-                        min_cost = cost
-                        min_shift = i
-
-                aprint(f"Channel {ch} min. shift at {min_shift}.")
-                ch_to_mask[ch][min_shift] = False
+            ch_to_mask[ch] = _valid_time_points_mask(ch_secs, min_secs)
 
         aprint(f"Channel {ch} min. shifts: {np.where(np.logical_not(ch_to_mask[ch]))[0]}")
 
     for ch in channels:
         out_dataset.add_channel(ch, in_dataset.shape(argmin), in_dataset.dtype(ch))
-        write_fun = _write(in_dataset, out_dataset, ch, np.where(ch_to_mask[ch])[0])
-
-        if workers == 1:
-            for i in range(min_time_pts):
-                write_fun(i)
-        else:
-            n_jobs = compute_num_workers(workers, min_time_pts)
-            parallel = Parallel(n_jobs=n_jobs)
-            parallel(delayed(write_fun)(i) for i in range(min_time_pts))
+        indices = np.where(ch_to_mask[ch])[0]
+        time_points = out_dataset.uninitialized_time_points(ch)
+
+        if len(time_points) == 0:
+            continue
+
+        n_jobs = compute_num_workers(workers, len(time_points))
+        set_thread_budget(n_jobs)
+        batches = split_time_points(time_points, n_jobs)
+
+        with asection(f"Converting {len(time_points)} time points of channel {ch} with {n_jobs} worker(s)"):
+            if n_jobs == 1:
+                _ingest(time_points, in_dataset, out_dataset, ch, indices, read_ahead, write_behind)
+            else:
+                Parallel(n_jobs=n_jobs)(
+                    delayed(_ingest)(batch, in_dataset, out_dataset, ch, indices, read_ahead, write_behind)
+                    for batch in batches
+                )
 
     aprint(out_dataset.info())
     out_dataset.check_integrity()
@@ -1,3 +1,5 @@
+import os
+import shutil
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
@@ -8,9 +10,15 @@ from toolz import curry
 
 from dexp.datasets import BaseDataset, ZDataset
 from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    load_views,
+    pipelined_stack_processing,
+    split_time_points_for_workers,
+)
 from dexp.processing.multiview_lightsheet.fusion.mvsols import msols_fuse_1C2L
 from dexp.processing.multiview_lightsheet.fusion.simview import SimViewFusion
 from dexp.processing.registration.model.model_io import (
+    from_json,
     model_list_from_file,
     model_list_to_file,
 )
@@ -19,7 +27,7 @@ from dexp.processing.registration.model.pairwise_registration_model import (
 )
 from dexp.utils import xpArray
 from dexp.utils.backends import Backend, BestBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 
 
 def load_registration_models(model_list_filename: Path, n_time_pts: int) -> Sequence[PairwiseRegistrationModel]:
@@ -35,6 +43,33 @@ def load_registration_models(model_list_filename: Path, n_time_pts: int) -> Sequ
     return models
 
 
+# Metadata key of the equalisation ratios of the first time point, reloaded when resuming:
+EQUALISATION_RATIOS_KEY = "fusion_equalisation_ratios"
+
+
+def _model_parts_path(model_list_filename: str) -> Path:
+    """Directory where the registration model of each fused time point is saved, until all are written to file."""
+    return Path(model_list_filename).with_suffix(".parts")
+
+
+def _save_model_part(model_parts_path: Path, time_point: int, model: PairwiseRegistrationModel) -> None:
+    model_parts_path.mkdir(parents=True, exist_ok=True)
+    file_path = model_parts_path / f"{time_point:06d}.json"
+    tmp_file_path = model_parts_path / f".{time_point:06d}.json.tmp"
+    with open(tmp_file_path, "w") as model_file:
+        model_file.write(model.to_json())
+    # atomic, an interrupted run does not leave truncated models:
+    os.replace(tmp_file_path, file_path)
+
+
+def _load_model_part(model_parts_path: Path, time_point: int) -> Optional[PairwiseRegistrationModel]:
+    file_path = model_parts_path / f"{time_point:06d}.json"
+    if not file_path.exists():
+        return None
+    with open(file_path) as model_file:
+        return from_json(model_file.read())
+
+
 @curry
 def get_fusion_func(
     model: Optional[PairwiseRegistrationModel],
@@ -141,19 +176,13 @@ def get_fusion_func(
 @curry
 def _process(
     time_point: int,
-    views: Dict[str, StackIterator],
-    out_dataset: ZDataset,
+    views_tp: Dict[str, np.ndarray],
+    nb_time_points: int,
+    dtype: np.dtype,
     fusion_func: Callable,
-) -> Tuple[List, PairwiseRegistrationModel]:
-
-    stack = list(views.values())[0]
-    in_shape = stack.shape
-    dtype = stack.dtype
-
-    with asection(f"Fusing time point for time point {time_point}/{in_shape[0]}"):
-        with asection(f"Loading channels {list(views.keys())}"):
-            views_tp = {k: np.asarray(view[time_point]) for k, view in views.items()}
+) -> Tuple[np.ndarray, List, PairwiseRegistrationModel]:
 
+    with asection(f"Fusing time point for time point {time_point}/{nb_time_points}"):
         with BestBackend():
             stack, new_equalisation_ratios, model = fusion_func(views_tp)
 
@@ -168,21 +197,61 @@ def _process(
 
             new_equalisation_ratios = [None if v is None else Backend.to_numpy(v) for v in new_equalisation_ratios]
 
-    with asection(f"Saving fused stack for time point {time_point}"):
+    return stack, new_equalisation_ratios, model
+
 
-        if time_point == 0:
-            # We allocate last minute once we know the shape... because we don't always know
-            # the shape in advance!!
-            # @jordao NOTE: that could be pre computed
-            out_dataset.add_channel("fused", shape=(in_shape[0],) + stack.shape, dtype=stack.dtype)
+def _write(
+    time_point: int,
+    output: Tuple[np.ndarray, List, PairwiseRegistrationModel],
+    out_dataset: ZDataset,
+    nb_time_points: int,
+    model_parts_path: Optional[Path] = None,
+) -> Tuple[List, PairwiseRegistrationModel]:
+    stack, new_equalisation_ratios, model = output
 
+    # the model is saved before the stack, a written stack always has its model:
+    if model_parts_path is not None and model is not None:
+        _save_model_part(model_parts_path, time_point, model)
+
+    with asection(f"Saving fused stack for time point {time_point}"):
         out_dataset.write_stack(channel="fused", time_point=time_point, stack_array=stack)
 
-    aprint(f"Done processing time point: {time_point} / {in_shape[0]}.")
+    aprint(f"Done processing time point: {time_point} / {nb_time_points}.")
 
     return new_equalisation_ratios, model
 
 
+@dask.delayed
+def _process_time_points(
+    time_points: Sequence[int],
+    views: Dict[str, StackIterator],
+    out_dataset: ZDataset,
+    fusion_func: Callable,
+    models: Optional[Sequence[PairwiseRegistrationModel]],
+    model_parts_path: Optional[Path],
+    prefetch: int,
+) -> List[Tuple[List, PairwiseRegistrationModel]]:
+
+    stack = list(views.values())[0]
+    process = _process(nb_time_points=stack.shape[0], dtype=stack.dtype)
+
+    def _fuse(time_point: int, views_tp: Dict[str, np.ndarray]) -> Tuple:
+        model = None if models is None else models[time_point]
+        return process(time_point, views_tp, fusion_func=fusion_func(model=model))
+
+    # the views of a time point are loaded concurrently, and loading of the next time points
+    # and saving of the previous one overlap with fusion:
+    return pipelined_stack_processing(
+        time_points,
+        load_func=curry(load_views, views),
+        process_func=_fuse,
+        write_func=curry(
+            _write, out_dataset=out_dataset, nb_time_points=stack.shape[0], model_parts_path=model_parts_path
+        ),
+        read_ahead=prefetch,
+    )
+
+
 def dataset_fuse(
     input_dataset: BaseDataset,
     output_dataset: ZDataset,
@@ -211,6 +280,7 @@ def dataset_fuse(
     white_top_hat_sampling: int,
     remove_beads: bool,
     devices: Sequence[int],
+    prefetch: int = 1,
 ):
 
     views = {channel.split("-")[-1]: input_dataset[channel] for channel in channels}
@@ -252,41 +322,81 @@ def dataset_fuse(
         remove_beads=remove_beads,
     )
 
-    # it creates the output dataset from the first time point output shape
-    equalisation_ratios, model = _process(
-        time_point=0,
-        views=views,
-        out_dataset=output_dataset,
-        fusion_func=fusion_func(
-            model=models[0] if loadreg else None,
-            equalisation_ratios=None,
-        ),
-    )
+    # registration models computed during fusion are saved for each time point, and reloaded when resuming:
+    model_parts_path = None if loadreg else _model_parts_path(model_list_filename)
+
+    # when resuming, only the time points not yet fused are processed:
+    if "fused" in output_dataset:
+        time_points = output_dataset.uninitialized_time_points("fused")
+    else:
+        time_points = list(range(n_time_pts))
+
+    if len(time_points) > 0 and time_points[0] == 0:
+        # it creates the output dataset from the first time point output shape
+        with asection(f"Loading channels {list(views.keys())}"):
+            views_tp = load_views(views, 0)
+
+        output = _process(
+            0,
+            views_tp,
+            nb_time_points=n_time_pts,
+            dtype=list(views.values())[0].dtype,
+            fusion_func=fusion_func(
+                model=models[0] if loadreg else None,
+                equalisation_ratios=None,
+            ),
+        )
+        del views_tp
+
+        # We allocate last minute once we know the shape... because we don't always know
+        # the shape in advance!!
+        # @jordao NOTE: that could be pre computed
+        stack = output[0]
+        output_dataset.add_channel("fused", shape=(n_time_pts,) + stack.shape, dtype=stack.dtype)
+        equalisation_ratios, _ = _write(
+            0, output, out_dataset=output_dataset, nb_time_points=n_time_pts, model_parts_path=model_parts_path
+        )
+        del stack, output
+
+        # saved to be reused when resuming:
+        output_dataset.append_metadata(
+            {EQUALISATION_RATIOS_KEY: [None if v is None else np.asarray(v).tolist() for v in equalisation_ratios]}
+        )
+        time_points = time_points[1:]
+
+    else:
+        aprint(f"Resuming fusion, reloading the equalisation ratios and {len(time_points)} time points left to fuse.")
+        equalisation_ratios = output_dataset.get_metadata().get(EQUALISATION_RATIOS_KEY)
 
     if equalise_mode == "all":
         equalisation_ratios = None
 
-    output_models = [model]
-
     client = get_dask_client(devices)
     aprint("Dask Client", client)
 
-    lazy_computations = []
-    for t in range(1, n_time_pts):
-        lazy_computations.append(
-            dask.delayed(_process)(
-                time_point=t,
-                views=views,
-                out_dataset=output_dataset,
-                fusion_func=fusion_func(equalisation_ratios=equalisation_ratios, model=models[t] if loadreg else None),
-            )
+    # contiguous batches of time points, several per worker, balanced between the workers:
+    lazy_computations = [
+        _process_time_points(
+            batch,
+            views=views,
+            out_dataset=output_dataset,
+            fusion_func=fusion_func(equalisation_ratios=equalisation_ratios),
+            models=models if loadreg else None,
+            model_parts_path=model_parts_path,
+            prefetch=prefetch,
         )
-
-    # compute remaining stacks and save models
-    output_models += [output[1] for output in dask.compute(*lazy_computations)]
-
-    if not loadreg and output_models[0] is not None:
-        model_list_to_file(model_list_filename, output_models)
+        for batch in split_time_points_for_workers(time_points, get_number_of_workers(client))
+    ]
+
+    # compute remaining stacks
+    dask.compute(*lazy_computations)
+
+    # save models, including those of the time points fused by previous runs:
+    if model_parts_path is not None and model_parts_path.exists():
+        output_models = [_load_model_part(model_parts_path, time_point) for time_point in range(n_time_pts)]
+        if output_models[0] is not None:
+            model_list_to_file(model_list_filename, output_models)
+        shutil.rmtree(model_parts_path, ignore_errors=True)
 
     aprint(output_dataset.info())
 
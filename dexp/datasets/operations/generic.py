@@ -1,31 +1,33 @@
 from typing import Callable, Optional, Sequence, Tuple
 
 import dask
+import numpy as np
 from arbol import aprint, asection
 from toolz import curry
 
 from dexp.datasets import BaseDataset, ZDataset
-from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    process_stacks_to_dataset,
+    split_time_points_for_workers,
+)
 from dexp.processing.utils.scatter_gather_i2i import scatter_gather_i2i
 from dexp.utils.backends import CupyBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 
 
-@dask.delayed
 @curry
 def _process(
     time_point: int,
-    stacks: StackIterator,
-    out_dataset: ZDataset,
+    stack: np.ndarray,
     channel: str,
     func: Callable,
-) -> None:
+) -> np.ndarray:
 
     with CupyBackend() as bkd:
         with asection(f"Applying {func.__name__} for channel {channel} at time point {time_point}"):
-            stack = bkd.to_backend(stacks[time_point])
+            stack = bkd.to_backend(stack)
             stack = func(stack)
-            out_dataset.write_stack(channel, time_point, bkd.to_numpy(stack))
+            return bkd.to_numpy(stack)
 
 
 def dataset_generic(
@@ -36,22 +38,29 @@ def dataset_generic(
     tilesize: Optional[Tuple[int]],
     devices: Sequence[int],
 ) -> None:
-    lazy_computations = []
-
     if tilesize is not None:
         func = curry(scatter_gather_i2i, function=func, tiles=tilesize, margins=32)
 
+    client = get_dask_client(devices)
+    aprint("Dask client", client)
+
+    lazy_computations = []
+
     for ch in channels:
         stacks = input_dataset[ch]
         output_dataset.add_channel(ch, stacks.shape, dtype=input_dataset.dtype(ch))
 
-        process = _process(stacks=stacks, out_dataset=output_dataset, channel=ch, func=func)
-
-        # Stores functions to be computed
-        lazy_computations += [process(time_point=t) for t in range(len(stacks))]
+        process = _process(channel=ch, func=func)
 
-    client = get_dask_client(devices)
-    aprint("Dask client", client)
+        # Stores functions to be computed, contiguous batches of time points balanced between the workers
+        lazy_computations += [
+            dask.delayed(process_stacks_to_dataset)(
+                time_points, stacks=stacks, process_func=process, out_dataset=output_dataset, channel=ch
+            )
+            for time_points in split_time_points_for_workers(
+                output_dataset.uninitialized_time_points(ch), get_number_of_workers(client)
+            )
+        ]
 
     # Compute everything
     dask.compute(*lazy_computations)
@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import Dict, List, Sequence
+from typing import Callable, Dict, List, Sequence
 
 import dask
 import numpy
@@ -9,6 +9,11 @@ from toolz import curry
 
 from dexp.datasets.base_dataset import BaseDataset
 from dexp.datasets.stack_iterator import StackIterator
+from dexp.datasets.stack_pipeline import (
+    load_views,
+    pipelined_stack_processing,
+    split_time_points_for_workers,
+)
 from dexp.processing.multiview_lightsheet.fusion.basefusion import BaseFusion
 from dexp.processing.multiview_lightsheet.fusion.simview import SimViewFusion
 from dexp.processing.registration.model.model_io import model_list_to_file
@@ -16,14 +21,13 @@ from dexp.processing.registration.model.translation_registration_model import (
     TranslationRegistrationModel,
 )
 from dexp.utils.backends import BestBackend
-from dexp.utils.dask import get_dask_client
+from dexp.utils.dask import get_dask_client, get_number_of_workers
 
 
-@dask.delayed
 @curry
 def _process(
     tp: int,
-    views: Dict[str, StackIterator],
+    views_tp: Dict[str, np.ndarray],
     fuse_model: BaseFusion,
     max_proj: bool,
     registration_edge_filter: bool,
@@ -32,9 +36,6 @@ def _process(
     fuse_model = deepcopy(fuse_model)
 
     with BestBackend(exclusive=True, enable_unified_memory=True):
-        with asection(f"Loading volume {tp}"):
-            views_tp = {k: np.asarray(view[tp]) for k, view in views.items()}
-
         with asection(f"Registring volume {tp}:"):
             C0Lx, C1Lx = fuse_model.preprocess(**views_tp)
             fuse_model.compute_registration(
@@ -49,6 +50,24 @@ def _process(
     return model
 
 
+@dask.delayed
+def _process_time_points(
+    time_points: Sequence[int],
+    views: Dict[str, StackIterator],
+    process: Callable,
+    prefetch: int,
+) -> List[TranslationRegistrationModel]:
+
+    # the views of a time point are loaded concurrently, and loading of the next time points overlaps with registration:
+    return pipelined_stack_processing(
+        time_points,
+        load_func=curry(load_views, views),
+        process_func=process,
+        write_func=lambda tp, model: model,
+        read_ahead=prefetch,
+    )
+
+
 def dataset_register(
     dataset: BaseDataset,
     model_path: str,
@@ -66,6 +85,7 @@ def dataset_register(
     white_top_hat_sampling: int,
     remove_beads: bool,
     devices: Sequence[int],
+    prefetch: int = 1,
 ) -> None:
 
     views = {channel.split("-")[-1]: dataset[channel] for channel in channels}
@@ -101,18 +121,18 @@ def dataset_register(
     else:
         raise NotImplementedError
 
-    process = _process(
-        views=views, fuse_model=fuse_model, max_proj=max_proj, registration_edge_filter=registration_edge_filter
-    )
+    process = _process(fuse_model=fuse_model, max_proj=max_proj, registration_edge_filter=registration_edge_filter)
 
     client = get_dask_client(devices)
     aprint("Dask Client", client)
 
-    lazy_computations = []
-    for i in range(n_time_pts):
-        lazy_computations.append(process(tp=i))
+    # contiguous batches of time points, several per worker, balanced between the workers:
+    lazy_computations = [
+        _process_time_points(batch, views=views, process=process, prefetch=prefetch)
+        for batch in split_time_points_for_workers(n_time_pts, get_number_of_workers(client))
+    ]
 
-    models = dask.compute(*lazy_computations)
+    models = [model for batch_models in dask.compute(*lazy_computations) for model in batch_models]
 
     mode_model = compute_median_translation(models)
     model_list_to_file(model_path, [mode_model])
@@ -11,6 +11,7 @@ from toolz import curry
 from dexp.datasets import BaseDataset
 from dexp.datasets.stack_iterator import StackIterator
 from dexp.io.io import tiff_save
+from dexp.utils.config import set_thread_budget
 
 
 @curry
@@ -81,6 +82,7 @@ def dataset_tiff(
             _process = process(stacks=stacks, channel=channel)
 
             _workers = min(workers, len(stacks))
+            set_thread_budget(_workers)
             if _workers > 1:
                 Parallel(n_jobs=_workers, backend=workersbackend)(delayed(_process)(tp) for tp in range(len(stacks)))
             else:
@@ -114,6 +116,7 @@ def dataset_tiff(
             _process = _save_single_file(stacks=stacks, memmap_image=memmap_image, project=project)
 
             _workers = min(len(stacks), workers)
+            set_thread_budget(_workers)
             if _workers > 1:
                 Parallel(n_jobs=_workers, backend=workersbackend)(delayed(_process)(tp) for tp in range(len(stacks)))
 
@@ -70,10 +70,16 @@ def dataset_view(
         resolution = np.asarray(input_dataset.get_resolution(channel))
 
         if isinstance(input_dataset, ZDataset):
-            array = input_dataset.get_array(channel, wrap_with_tensorstore=True)
-            if scale != 1:
-                array = downsample(array, scale_array)
+            level = int(np.log2(scale)) if scale > 1 else 0
+            if channel not in labels and 2**level == scale and 0 < level <= input_dataset.pyramid_levels(channel):
+                # the downscaled level is already stored:
+                array = input_dataset.get_pyramid_array(channel, level, wrap_with_tensorstore=True)
                 resolution *= scale_array
+            else:
+                array = input_dataset.get_array(channel, wrap_with_tensorstore=True)
+                if scale != 1:
+                    array = downsample(array, scale_array)
+                    resolution *= scale_array
         else:
             array = input_dataset.get_array(channel, wrap_with_dask=True)
 
@@ -38,7 +38,11 @@ class StackIterator:
             slicing = self._time_points[index]
         else:
             slicing = (self._time_points[index],) + self._volume_slicing
-        return self._array[slicing]
+        array = self._array[slicing]
+        if hasattr(array, "read") and not isinstance(array, zarr.Array):
+            # tensorstore views are read asynchronously, chunks are fetched and decoded concurrently:
+            array = array.read().result()
+        return array
 
     def time(self, index: int) -> int:
         return self._time_points[index]
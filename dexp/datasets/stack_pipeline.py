@@ -0,0 +1,286 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Full, Queue
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy
+from arbol import aprint
+
+from dexp.datasets.stack_iterator import StackIterator
+
+if TYPE_CHECKING:
+    from dexp.datasets.zarr_dataset import ZDataset
+
+_DONE = object()
+
+
+def _nbytes(item: Any) -> int:
+    """Number of bytes of an array, or of the arrays of a dictionary (e.g. views), 0 otherwise."""
+    if isinstance(item, dict):
+        return sum(_nbytes(value) for value in item.values())
+    return getattr(item, "nbytes", 0)
+
+
+def pipelined_stack_processing(
+    time_points: Sequence[int],
+    load_func: Callable[[int], Any],
+    process_func: Callable[[int, Any], Any],
+    write_func: Callable[[int, Any], Any],
+    read_ahead: int = 1,
+    write_behind: int = 1,
+) -> List[Any]:
+    """
+    Processes a sequence of time points with a three-stage pipeline: loading, processing and writing.
+    Loading and writing are done in dedicated threads with bounded queues, so that loading (decompression)
+    of time point t+1 and writing (compression) of time point t-1 overlap with the processing of time point t.
+    Processing is done in the calling thread, and therefore within its backend context.
+
+    Parameters
+    ----------
+    time_points : time points to process, in order.
+    load_func : function that loads the stack of a given time point, e.g. lambda t: np.asarray(stacks[t])
+    process_func : function that processes the loaded stack of a given time point: process_func(t, stack)
+    write_func : function that writes the processed output of a given time point: write_func(t, output)
+    read_ahead : maximal number of loaded stacks waiting to be processed, if 0 each stack is loaded
+        in the calling thread when it is processed, without reading ahead.
+    write_behind : maximal number of processed outputs waiting to be written.
+
+    Returns
+    -------
+    List of values returned by write_func, in the order of the time points.
+    """
+    time_points = list(time_points)
+    read_queue = Queue(maxsize=max(1, read_ahead))
+    write_queue = Queue(maxsize=max(1, write_behind))
+    stop = threading.Event()
+    errors = []
+    results = {}
+    timings = {"load": 0.0, "process": 0.0, "write": 0.0}
+    nbytes = {"load": 0, "write": 0}
+
+    def _put(queue: Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _get(queue: Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                pass
+        return _DONE
+
+    def _load(time_point: int) -> Any:
+        start = time.time()
+        stack = load_func(time_point)
+        timings["load"] += time.time() - start
+        nbytes["load"] += _nbytes(stack)
+        return stack
+
+    def _reader() -> None:
+        try:
+            for time_point in time_points:
+                if not _put(read_queue, (time_point, _load(time_point))):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    def _writer() -> None:
+        try:
+            while True:
+                item = _get(write_queue)
+                if item is _DONE:
+                    return
+                time_point, output = item
+                start = time.time()
+                results[time_point] = write_func(time_point, output)
+                timings["write"] += time.time() - start
+                nbytes["write"] += _nbytes(output)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    def _raise_errors() -> None:
+        if errors:
+            raise errors[0]
+
+    reader = threading.Thread(target=_reader, name="stack-reader", daemon=True)
+    writer = threading.Thread(target=_writer, name="stack-writer", daemon=True)
+    if read_ahead > 0:
+        reader.start()
+    writer.start()
+
+    total_start = time.time()
+    try:
+        for time_point in time_points:
+            if read_ahead > 0:
+                item = _get(read_queue)
+                _raise_errors()
+                time_point, stack = item
+            else:
+                stack = _load(time_point)
+
+            start = time.time()
+            output = process_func(time_point, stack)
+            timings["process"] += time.time() - start
+            del stack
+
+            _put(write_queue, (time_point, output))
+            _raise_errors()
+
+        _put(write_queue, _DONE)
+        writer.join()
+        _raise_errors()
+    finally:
+        stop.set()
+        if reader.is_alive():
+            reader.join()
+        writer.join()
+
+    def _throughput(stage: str) -> str:
+        if nbytes[stage] == 0:
+            return ""
+        return f" ({nbytes[stage] / 1e6 / max(timings[stage], 1e-9):.1f} MB/s)"
+
+    aprint(
+        f"Pipelined {len(time_points)} time points in {time.time() - total_start:.2f}s, "
+        + f"loading: {timings['load']:.2f}s{_throughput('load')}, processing: {timings['process']:.2f}s, "
+        + f"writing: {timings['write']:.2f}s{_throughput('write')}"
+    )
+
+    return [results[time_point] for time_point in time_points]
+
+
+def process_stacks_to_dataset(
+    time_points: Sequence[int],
+    stacks: StackIterator,
+    process_func: Callable[[int, numpy.ndarray], numpy.ndarray],
+    out_dataset: "ZDataset",
+    channel: str,
+    read_ahead: int = 1,
+    write_behind: int = 1,
+) -> None:
+    """
+    Processes the given time points of a stack iterator and writes the results to a dataset channel,
+    using 'pipelined_stack_processing' so that reading and writing overlap with processing.
+
+    Parameters
+    ----------
+    time_points : time points to process, in order.
+    stacks : input stacks.
+    process_func : function that processes the stack of a given time point: process_func(t, stack),
+        must return a numpy array.
+    out_dataset : output dataset.
+    channel : output channel, must already exist in the output dataset.
+    read_ahead : maximal number of loaded stacks waiting to be processed.
+    write_behind : maximal number of processed stacks waiting to be written.
+    """
+
+    def _write(time_point: int, stack: numpy.ndarray) -> None:
+        out_dataset.write_stack(channel=channel, time_point=time_point, stack_array=stack)
+        aprint(f"Done processing time point: {time_point}/{len(stacks)} .")
+
+    pipelined_stack_processing(
+        time_points,
+        load_func=lambda time_point: numpy.asarray(stacks[time_point]),
+        process_func=process_func,
+        write_func=_write,
+        read_ahead=read_ahead,
+        write_behind=write_behind,
+    )
+
+
+def load_views(
+    views: Dict[str, StackIterator], time_point: int, workers: Optional[int] = None
+) -> Dict[str, numpy.ndarray]:
+    """
+    Loads the stacks of all views (e.g. cameras and light sheets) of a time point concurrently,
+    decompression releases the GIL, so the views are decompressed in parallel instead of one after another.
+
+    Parameters
+    ----------
+    views : views of the dataset, indexed by their name.
+    time_point : time point to load.
+    workers : number of threads, by default one per view.
+
+    Returns
+    -------
+    Stacks of the views at the given time point, indexed by their name, in the order of the views.
+    """
+    if workers is None:
+        workers = len(views)
+
+    if workers <= 1 or len(views) <= 1:
+        return {key: numpy.asarray(view[time_point]) for key, view in views.items()}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            key: executor.submit(lambda view: numpy.asarray(view[time_point]), view) for key, view in views.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+
+def split_time_points(time_points: Union[int, Sequence[int]], nb_batches: int, start: int = 0) -> List[List[int]]:
+    """
+    Splits time points into contiguous batches of (almost) equal length,
+    each batch can then be processed with 'pipelined_stack_processing' by a different worker.
+
+    Parameters
+    ----------
+    time_points : total number of time points, or sequence of time points
+        (e.g. the uninitialized time points of an output channel, see ZDataset.uninitialized_time_points).
+    nb_batches : number of batches, empty batches are dropped.
+    start : first time point, when time_points is a number of time points.
+
+    Returns
+    -------
+    List of batches of time points.
+    """
+    if isinstance(time_points, int):
+        time_points = range(start, start + time_points)
+    time_points = list(time_points)
+
+    nb_batches = max(1, min(nb_batches, len(time_points)))
+    size, remainder = divmod(len(time_points), nb_batches)
+    batches = []
+    start = 0
+    for i in range(nb_batches):
+        length = size + (1 if i < remainder else 0)
+        batches.append(time_points[start : start + length])
+        start += length
+    return [batch for batch in batches if len(batch) > 0]
+
+
+def split_time_points_for_workers(
+    time_points: Union[int, Sequence[int]],
+    nb_workers: int,
+    batches_per_worker: int = 4,
+    min_batch_length: int = 4,
+) -> List[List[int]]:
+    """
+    Splits time points into several contiguous batches per worker, to be submitted as separate tasks:
+    the scheduler balances the batches between workers (a slow worker, or a stretch of expensive time points,
+    does not hold up the others) and a failure only loses one batch, while batches remain long enough for
+    'pipelined_stack_processing' to overlap reading and writing with processing.
+
+    Parameters
+    ----------
+    time_points : total number of time points, or sequence of time points.
+    nb_workers : number of workers.
+    batches_per_worker : number of batches per worker, when there are enough time points.
+    min_batch_length : minimal number of time points per batch, unless there are fewer time points than workers.
+
+    Returns
+    -------
+    List of batches of time points.
+    """
+    nb_time_points = time_points if isinstance(time_points, int) else len(time_points)
+    nb_batches = min(nb_workers * batches_per_worker, max(nb_workers, nb_time_points // max(1, min_batch_length)))
+    return split_time_points(time_points, nb_batches)
@@ -1,8 +1,10 @@
 import math as m
 import os
-import re
 import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from os.path import exists, isdir, isfile, join
 from pathlib import Path
 from typing import Any, List, Optional, Sequence, Tuple, Union
@@ -16,9 +18,20 @@ from zarr import Blosc, CopyError, convenience, open_group
 
 from dexp.cli.defaults import DEFAULT_CLEVEL, DEFAULT_CODEC
 from dexp.datasets.base_dataset import BaseDataset
+from dexp.datasets.chunk_integrity import (
+    chunk_hash,
+    chunk_keys,
+    chunk_store_key,
+    load_manifest,
+    manifest_path,
+    missing_chunk_keys,
+    save_manifest,
+    verify_chunks,
+)
 from dexp.datasets.ome_dataset import create_coord_transform, default_omero_metadata
 from dexp.datasets.stack_iterator import StackIterator
-from dexp.utils import compress_dictionary_lists_length
+from dexp.processing.utils.max_projections import max_projections
+from dexp.utils import compress_dictionary_lists_length, xpArray
 from dexp.utils.backends import Backend, BestBackend
 from dexp.utils.config import config_blosc
 
@@ -35,6 +48,58 @@ except ImportError:
     DOWNSCALE_METHOD = "skimage.transform.downscale_local_mean"
 
 
+IO_ENGINES = ("zarr", "tensorstore")
+CHUNKINGS = ("stack", "subvolume")
+
+# Maximal size of sub-volume chunks:
+DEFAULT_CHUNK_SIZE = 2**24
+
+# Size of the chunk cache shared by all tensorstore arrays of the process:
+TENSORSTORE_CACHE_BYTES = 2**30
+
+_PROJECTION_EXECUTOR = None
+_TENSORSTORE_CONTEXT = None
+_TENSORSTORE_CONTEXT_LOCK = threading.Lock()
+
+
+def _projection_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all datasets of the process for writing projections."""
+    global _PROJECTION_EXECUTOR
+    if _PROJECTION_EXECUTOR is None:
+        _PROJECTION_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="projection-writer")
+    return _PROJECTION_EXECUTOR
+
+
+def _tensorstore_context() -> Any:
+    """Tensorstore context shared by all datasets of the process: chunk cache pool and I/O concurrency limits."""
+    global _TENSORSTORE_CONTEXT
+    with _TENSORSTORE_CONTEXT_LOCK:
+        if _TENSORSTORE_CONTEXT is None:
+            import tensorstore as ts
+
+            nb_cores = os.cpu_count() or 1
+            _TENSORSTORE_CONTEXT = ts.Context(
+                {
+                    "cache_pool": {"total_bytes_limit": TENSORSTORE_CACHE_BYTES},
+                    "data_copy_concurrency": {"limit": nb_cores},
+                    "file_io_concurrency": {"limit": max(8, 2 * nb_cores)},
+                }
+            )
+    return _TENSORSTORE_CONTEXT
+
+
+def _is_tensorstore(array: Any) -> bool:
+    return not isinstance(array, zarr.Array) and hasattr(array, "read") and hasattr(array, "write")
+
+
+def _to_numpy(array: xpArray) -> numpy.ndarray:
+    """Moves an array to the CPU independently of the current thread's backend."""
+    if hasattr(array, "get") and not isinstance(array, numpy.ndarray):
+        # cupy array, it is transferred from its own device:
+        return array.get()
+    return numpy.asarray(array)
+
+
 class ZDataset(BaseDataset):
     def __init__(
         self,
@@ -46,6 +111,10 @@ class ZDataset(BaseDataset):
         clevel: int = DEFAULT_CLEVEL,
         chunks: Optional[Sequence[int]] = None,
         parent: Optional[BaseDataset] = None,
+        io_engine: str = "zarr",
+        pyramid_levels: int = 0,
+        chunking: str = "stack",
+        resume: bool = False,
     ):
         """Instantiates a Zarr dataset (and opens it)
 
@@ -59,6 +128,16 @@ class ZDataset(BaseDataset):
             'w' means create (overwrite if exists);
             'w-' means create (fail if exists).
         store : type of store, can be 'dir', 'ndir', or 'zip'
+        io_engine : library used to read and write arrays, 'zarr' or 'tensorstore'.
+            With 'tensorstore', get_array returns tensorstore arrays and stacks are read and written
+            with tensorstore's concurrent chunk I/O, async writes and shared chunk cache.
+            Zip stores are read-only for tensorstore, writes to them always go through zarr.
+        pyramid_levels : default number of downscaled pyramid levels of the channels added to this dataset.
+        chunking : default chunking policy of the channels added to this dataset when chunks are not given,
+            'stack' (one chunk per stack) or 'subvolume' (sub-volume chunks of at most 16 MB).
+            With a nested directory store ('ndir') the chunks of each time point are grouped in one directory.
+        resume : if True, existing channels are reused by add_channel (instead of raising an error) so that operations
+            only process their uninitialized time points (see uninitialized_time_points), requires mode 'a' or 'r+'.
 
         Returns
         -------
@@ -68,12 +147,28 @@ class ZDataset(BaseDataset):
 
         super().__init__(dask_backed=False, path=path)
 
+        if io_engine not in IO_ENGINES:
+            raise ValueError(f"Invalid I/O engine '{io_engine}', must be one of {IO_ENGINES}.")
+
+        self._io_engine = io_engine
+        self._tensorstores = {}
+        self._writable = mode != "r"
+
         self._store = None
         self._root_group = None
 
         self._codec = codec
         self._clevel = clevel
         self._chunks = chunks
+        self._pyramid_levels = pyramid_levels
+
+        if chunking not in CHUNKINGS:
+            raise ValueError(f"Invalid chunking policy '{chunking}', must be one of {CHUNKINGS}.")
+        self._chunking = chunking
+
+        if resume and mode not in ("a", "r+"):
+            raise ValueError(f"Resuming requires mode 'a' or 'r+', not '{mode}'.")
+        self._resume = resume
 
         # Open remote store:
         if "http" in self._path:
@@ -173,13 +268,54 @@ class ZDataset(BaseDataset):
         if mode in ("a", "w", "w-"):
             self.append_cli_history(parent if isinstance(parent, ZDataset) else None)
 
+    def __getstate__(self):
+        # tensorstore handles are reopened lazily after unpickling:
+        state = self.__dict__.copy()
+        state["_tensorstores"] = {}
+        return state
+
+    @property
+    def io_engine(self) -> str:
+        return self._io_engine
+
     def chunk_shape(self, channel: str) -> Sequence[int]:
-        return self.get_array(channel).chunks
+        return self._get_zarr_array(channel).chunks
 
     @staticmethod
-    def _default_chunks(shape: Tuple[int], dtype: Union[str, numpy.dtype], max_size: int = 2147483647) -> Tuple[int]:
+    def _default_chunks(
+        shape: Tuple[int],
+        dtype: Union[str, numpy.dtype],
+        max_size: int = 2147483647,
+        chunking: str = "stack",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Tuple[int]:
+        """Returns the default chunks for an array of given shape and dtype.
+
+        Parameters
+        ----------
+        shape : array shape, time first.
+        dtype : array dtype.
+        max_size : maximal chunk size in bytes for the 'stack' policy.
+        chunking : chunking policy:
+            'stack' means one chunk per stack (split along z only beyond max_size);
+            'subvolume' means sub-volume chunks of at most chunk_size bytes, so that reading a slab, a tile
+            or a slice of a stack only decompresses the chunks it overlaps.
+        chunk_size : maximal chunk size in bytes for the 'subvolume' policy.
+        """
+        if chunking not in CHUNKINGS:
+            raise ValueError(f"Invalid chunking policy '{chunking}', must be one of {CHUNKINGS}.")
+
         if not isinstance(dtype, numpy.dtype):
             dtype = numpy.dtype(dtype)
+
+        if chunking == "subvolume":
+            # halving the largest spatial extent until the chunk is small enough keeps chunks close to cubes:
+            spatial = list(shape[-3:])
+            while numpy.prod(spatial, dtype=numpy.int64) * dtype.itemsize > chunk_size and max(spatial) > 1:
+                axis = spatial.index(max(spatial))
+                spatial[axis] = int(m.ceil(spatial[axis] / 2))
+            return (1,) * (len(shape) - len(spatial)) + tuple(spatial)
+
         width = shape[-1]
         height = shape[-2]
         depth = min(max_size // (dtype.itemsize * width * height), shape[-3])
@@ -194,31 +330,85 @@ class ZDataset(BaseDataset):
             except AttributeError:
                 pass
 
-    def check_integrity(self, channels: Sequence[str] = None) -> bool:
+    def check_integrity(
+        self,
+        channels: Sequence[str] = None,
+        verify: bool = False,
+        write_manifest: bool = False,
+        workers: Optional[int] = None,
+    ) -> bool:
+        """Checks the integrity of the dataset: lists the missing chunks of each array of the channels
+        (channel array, projections and pyramid levels), and optionally verifies the stored chunks.
+        Missing chunks of projections and pyramid levels are reported but, being derived data, are not failures.
+
+        Parameters
+        ----------
+        channels : channels to check, by default all channels.
+        verify : if True, every stored chunk is hashed (concurrently), and its hash compared to the manifest
+            of the dataset if it exists. Chunks that are new or changed relative to the manifest are also decompressed,
+            chunks matching the manifest were verified when it was written and are not.
+        write_manifest : if True, the chunk hashes are written to the manifest next to the dataset
+            (see chunk_integrity.manifest_path), so that later checks or copies can be verified against it.
+        workers : number of threads used for verification, by default the number of cores.
+
+        Returns
+        -------
+        True if no chunk of the channel arrays is missing and no chunk is corrupted.
+        """
         aprint("Checking integrity of zarr storage, might take some time.")
         if channels is None:
             channels = self.channels()
+
+        ok = True
+        arrays = {}
         for channel in channels:
             aprint(f"Checking integrity of channel '{channel}'...")
-            array = self.get_array(channel, wrap_with_dask=False)
-            if array.nchunks_initialized < array.nchunks:
-                aprint(f"WARNING! not all chunks initialised! (dtype={array.dtype})")
-                return False
-            else:
+            channel_ok = True
+            for name, array in self._root_group[channel].arrays():
+                arrays[array.path] = array
+                missing = missing_chunk_keys(array)
+                if len(missing) > 0:
+                    listed = ", ".join(missing[:8]) + (", ..." if len(missing) > 8 else "")
+                    if name == channel:
+                        channel_ok = False
+                        aprint(
+                            f"WARNING! not all chunks initialised! {len(missing)}/{array.nchunks} chunks missing "
+                            + f"in array '{name}' (dtype={array.dtype}): {listed}"
+                        )
+                    else:
+                        # projections and pyramid levels are derived from the channel array, e.g. not written
+                        # when writing directly into the zarr array:
+                        aprint(f"Note: {len(missing)}/{array.nchunks} chunks missing in derived array '{name}'.")
+            if channel_ok:
                 aprint(f"Channel '{channel}' seems ok!")
-                return True
+            ok &= channel_ok
+
+        if verify or write_manifest:
+            path = manifest_path(self._path)
+            manifest = load_manifest(path)
+            hashes, corrupted = verify_chunks(arrays, manifest=manifest if verify else None, workers=workers)
+            for array_path, keys in corrupted.items():
+                ok = False
+                listed = ", ".join(keys[:8]) + (", ..." if len(keys) > 8 else "")
+                aprint(f"WARNING! {len(keys)} corrupted chunks in array '{array_path}': {listed}")
+
+            if write_manifest:
+                manifest.update(hashes)
+                save_manifest(path, manifest)
+
+        return ok
 
     def channels(self) -> Sequence[str]:
         return list(self._root_group.keys())
 
     def nb_timepoints(self, channel: str) -> int:
-        return self.get_array(channel).shape[0]
+        return self._get_zarr_array(channel).shape[0]
 
     def shape(self, channel: str) -> Sequence[int]:
-        return self.get_array(channel).shape
+        return self._get_zarr_array(channel).shape
 
     def dtype(self, channel: str):
-        return self.get_array(channel).dtype
+        return self._get_zarr_array(channel).dtype
 
     def info(self, channel: str = None, cli_history: bool = True) -> str:
         info_str = ""
@@ -227,7 +417,7 @@ class ZDataset(BaseDataset):
                 f"Channel: '{channel}', nb time points: {self.shape(channel)[0]}, shape: {self.shape(channel)[1:]}"
             )
             info_str += ".\n"
-            info_str += str(self.get_array(channel).info)
+            info_str += str(self._get_zarr_array(channel).info)
             return info_str
         else:
             info_str += f"Dataset at location: {self._path} \n"
@@ -238,7 +428,7 @@ class ZDataset(BaseDataset):
             info_str += "Arrays: \n"
             for name in self.channels():
                 info_str += "  │ \n"
-                info_str += "  └──" + name + ":\n" + str(self.get_array(name).info) + "\n\n"
+                info_str += "  └──" + name + ":\n" + str(self._get_zarr_array(name).info) + "\n\n"
                 info_str += ".\n\n"
 
         info_str += ".\n\n"
@@ -284,38 +474,67 @@ class ZDataset(BaseDataset):
         cli_history.append(new_command)
         self._root_group.attrs[key] = cli_history
 
+    def _tensorstore_kvstore(self) -> Optional[dict]:
+        """Returns the tensorstore key-value store spec of this dataset, None if tensorstore can't open it."""
+        if isinstance(self._store, zarr.storage.ZipStore):
+            return {"driver": "zip", "base": {"driver": "file", "path": str(Path(self._path).resolve())}}
+        elif isinstance(self._store, zarr.storage.DirectoryStore):
+            # also covers nested directory stores, the dimension separator is read from the array metadata:
+            return {"driver": "file", "path": str(Path(self._path).resolve())}
+        return None
+
+    def _use_tensorstore(self, writing: bool = False) -> bool:
+        if self._io_engine != "tensorstore" or self._tensorstore_kvstore() is None:
+            return False
+        if writing:
+            # tensorstore can only read zip stores:
+            return not isinstance(self._store, zarr.storage.ZipStore)
+        return True
+
     def _load_tensorstore(self, array: zarr.Array):
         import tensorstore as ts
 
-        metadata = {
-            "dtype": array.dtype.str,
-            "order": array.order,
-            "shape": array.shape,
-        }
-        ts_spec = {
-            "driver": "zarr",
-            "kvstore": {
-                "driver": "file",
-                "path": str(Path(self.path).resolve()),
-            },
-            "path": array.path,
-            "metadata": metadata,
-        }
-        return ts.open(ts_spec, create=False, open=True).result()
+        kvstore = self._tensorstore_kvstore()
+        if kvstore is None:
+            raise ValueError(f"Dataset '{self._path}' can't be opened with tensorstore.")
+
+        writable = self._writable and kvstore["driver"] != "zip"
+        key = (array.path, writable)
+        if key not in self._tensorstores:
+            metadata = {
+                "dtype": array.dtype.str,
+                "order": array.order,
+                "shape": array.shape,
+            }
+            ts_spec = {
+                "driver": "zarr",
+                "kvstore": kvstore,
+                "path": array.path,
+                "metadata": metadata,
+            }
+            self._tensorstores[key] = ts.open(
+                ts_spec, read=True, write=writable, create=False, open=True, context=_tensorstore_context()
+            ).result()
+        return self._tensorstores[key]
+
+    def _get_zarr_array(self, channel: str) -> zarr.Array:
+        return self._root_group[channel].get(channel)
 
     def get_array(
         self, channel: str, per_z_slice: bool = False, wrap_with_dask: bool = False, wrap_with_tensorstore: bool = False
     ) -> Union[zarr.Array, Any]:
         assert (wrap_with_dask != wrap_with_tensorstore) or not wrap_with_dask
-        array = self._root_group[channel].get(channel)
+        array = self._get_zarr_array(channel)
         if wrap_with_dask:
             return dask.array.from_array(array, chunks=array.chunks)
-        elif wrap_with_tensorstore:
+        elif wrap_with_tensorstore or self._use_tensorstore():
             return self._load_tensorstore(array)
         return array
 
     def get_stack(self, channel: str, time_point: int, per_z_slice: bool = False, wrap_with_dask: bool = False):
         stack_array = self.get_array(channel, per_z_slice=per_z_slice, wrap_with_dask=wrap_with_dask)[time_point]
+        if _is_tensorstore(stack_array):
+            stack_array = stack_array.read().result()
         return stack_array
 
     def get_projection_array(
@@ -328,32 +547,130 @@ class ZDataset(BaseDataset):
 
         if wrap_with_dask:
             return dask.array.from_array(array, chunks=array.chunks)
-        elif wrap_with_tensorstore:
+        elif wrap_with_tensorstore or self._use_tensorstore():
             return self._load_tensorstore(array)
         return array
 
     def _projection_name(self, channel: str, axis: int):
         return f"{channel}_projection_{axis}"
 
-    def write_stack(self, channel: str, time_point: int, stack_array: numpy.ndarray):
-        array_in_zarr = self.get_array(channel=channel, wrap_with_dask=False)
-        array_in_zarr[time_point] = stack_array
+    def get_pyramid_array(
+        self, channel: str, level: int, wrap_with_dask: bool = False, wrap_with_tensorstore: bool = False
+    ) -> Optional[Union[zarr.Array, Any]]:
+        """Returns the array of a pyramid level of a channel, level 0 being the channel array itself
+        and level i its downscaling by a factor 2**i along the spatial axes. Returns None if the level does not exist.
+        """
+        assert (wrap_with_dask != wrap_with_tensorstore) or not wrap_with_dask
+        if level == 0:
+            return self.get_array(channel, wrap_with_dask=wrap_with_dask, wrap_with_tensorstore=wrap_with_tensorstore)
 
-        for axis in range(stack_array.ndim):
-            xp = Backend.get_xp_module()
-            projection = xp.max(stack_array, axis=axis)
-            projection_in_zarr = self.get_projection_array(channel=channel, axis=axis, wrap_with_dask=False)
-            projection_in_zarr[time_point] = projection
+        array = self._root_group[channel].get(self._pyramid_name(channel, level))
+        if array is None:
+            return None
 
-    def write_array(self, channel: str, array: numpy.ndarray):
-        array_in_zarr = self.get_array(channel=channel, wrap_with_dask=False)
-        array_in_zarr[...] = array
+        if wrap_with_dask:
+            return dask.array.from_array(array, chunks=array.chunks)
+        elif wrap_with_tensorstore or self._use_tensorstore():
+            return self._load_tensorstore(array)
+        return array
 
-        for axis in range(array.ndim - 1):
-            xp = Backend.get_xp_module()
-            projection = xp.max(array, axis=axis + 1)
-            projection_in_zarr = self.get_projection_array(channel=channel, axis=axis, wrap_with_dask=False)
-            projection_in_zarr[...] = projection
+    def pyramid_levels(self, channel: str) -> int:
+        """Returns the number of downscaled pyramid levels stored for a channel."""
+        level = 0
+        while self._pyramid_name(channel, level + 1) in self._root_group[channel]:
+            level += 1
+        return level
+
+    def _pyramid_name(self, channel: str, level: int):
+        return f"{channel}_pyramid_{level}"
+
+    def write_stack(self, channel: str, time_point: int, stack_array: xpArray):
+        """Writes a stack at a given time point and updates the channel projections.
+
+        Parameters
+        ----------
+        channel : channel to write to.
+        time_point : time point of the stack.
+        stack_array : stack to write, can be a numpy or cupy array. The projections and pyramid levels
+            are computed on the array's backend before moving it to the CPU,
+            and are written concurrently with the stack.
+        """
+        projections = self._compute_projections(channel, stack_array)
+        projections += self._compute_pyramid_levels(channel, stack_array)
+        stack_array = _to_numpy(stack_array)
+
+        if self._use_tensorstore(writing=True):
+            # all writes are issued asynchronously, tensorstore encodes and writes the chunks concurrently:
+            futures = [
+                self._load_tensorstore(projection_in_zarr)[time_point].write(_to_numpy(projection))
+                for projection_in_zarr, projection in projections
+            ]
+            futures.append(self._load_tensorstore(self._get_zarr_array(channel))[time_point].write(stack_array))
+        else:
+            # projections are small, they are written in the background while the stack is being written:
+            futures = [
+                _projection_executor().submit(projection_in_zarr.__setitem__, time_point, _to_numpy(projection))
+                for projection_in_zarr, projection in projections
+            ]
+            self._get_zarr_array(channel)[time_point] = stack_array
+
+        for future in futures:
+            future.result()
+
+    def write_array(self, channel: str, array: xpArray):
+        array_in_zarr = self._get_zarr_array(channel)
+        use_tensorstore = self._use_tensorstore(writing=True)
+
+        futures = []
+        if use_tensorstore:
+            futures.append(self._load_tensorstore(array_in_zarr).write(_to_numpy(array)))
+        else:
+            array_in_zarr[...] = _to_numpy(array)
+
+        for time_point in range(array.shape[0]):
+            projections = self._compute_projections(channel, array[time_point])
+            projections += self._compute_pyramid_levels(channel, array[time_point])
+            for projection_in_zarr, projection in projections:
+                if use_tensorstore:
+                    futures.append(self._load_tensorstore(projection_in_zarr)[time_point].write(_to_numpy(projection)))
+                else:
+                    projection_in_zarr[time_point] = _to_numpy(projection)
+
+        for future in futures:
+            future.result()
+
+    def _compute_projections(self, channel: str, stack_array: xpArray) -> List[Tuple[zarr.Array, xpArray]]:
+        """Returns the pairs of projection arrays of a channel and the corresponding projections of a stack."""
+        projection_arrays = list(
+            self._root_group[channel].get(self._projection_name(channel, axis)) for axis in range(stack_array.ndim)
+        )
+        if all(projection_array is None for projection_array in projection_arrays) or stack_array.ndim < 2:
+            return []
+
+        projections = max_projections(stack_array)
+        return list(
+            (projection_array, projection)
+            for projection_array, projection in zip(projection_arrays, projections)
+            if projection_array is not None
+        )
+
+    def _compute_pyramid_levels(self, channel: str, stack_array: xpArray) -> List[Tuple[zarr.Array, xpArray]]:
+        """Returns the pairs of pyramid level arrays of a channel and the corresponding downscaled stacks,
+        each level is computed from the previous one on the backend of the given stack."""
+        nb_levels = self.pyramid_levels(channel)
+        if nb_levels == 0:
+            return []
+
+        downscale_local_mean = Backend.get_skimage_submodule("transform", stack_array).downscale_local_mean
+        dtype = self._get_zarr_array(channel).dtype
+
+        levels = []
+        level_array = stack_array
+        for level in range(1, nb_levels + 1):
+            level_array = downscale_local_mean(level_array, (2,) * stack_array.ndim)
+            level_in_zarr = self._root_group[channel].get(self._pyramid_name(channel, level))
+            levels.append((level_in_zarr, level_array.astype(dtype, copy=False)))
+        return levels
 
     def add_channel(
         self,
@@ -365,6 +682,7 @@ class ZDataset(BaseDataset):
         codec: Optional[str] = None,
         clevel: Optional[int] = None,
         value: Optional[Any] = None,
+        pyramid_levels: Optional[int] = None,
     ) -> Any:
         """Adds a channel to this dataset
 
@@ -376,6 +694,8 @@ class ZDataset(BaseDataset):
         chunks: chunks shape.
         codec: Compression codec to be used ('zstd', 'blosclz', 'lz4', 'lz4hc', 'zlib' or 'snappy').
         clevel: An integer between 0 and 9 specifying the compression level.
+        pyramid_levels: number of downscaled levels (2x, 4x, 8x, ...) maintained by write_stack and write_array,
+            each level can then be read with get_pyramid_array.
 
         Returns
         -------
@@ -385,11 +705,21 @@ class ZDataset(BaseDataset):
         """
         # check if channel exists:
         if name in self.channels():
-            raise ValueError("Channel already exist!")
+            if not self._resume:
+                raise ValueError("Channel already exist!")
+            array = self._get_zarr_array(name)
+            if tuple(array.shape) != tuple(shape) or array.dtype != numpy.dtype(dtype):
+                raise ValueError(
+                    f"Cannot resume channel '{name}' of shape: {array.shape} and dtype: {array.dtype}, "
+                    + f"shape: {tuple(shape)} and dtype: {numpy.dtype(dtype)} were requested!"
+                )
+            nb_uninitialized = len(self.uninitialized_time_points(name))
+            aprint(f"Resuming channel: '{name}', {nb_uninitialized}/{shape[0]} time points left to write.")
+            return array
 
         if chunks is None:
             if self._chunks is None:
-                chunks = self._default_chunks(shape, dtype)
+                chunks = self._default_chunks(shape, dtype, chunking=self._chunking)
             else:
                 chunks = self._chunks
 
@@ -399,6 +729,9 @@ class ZDataset(BaseDataset):
         if codec is None:
             codec = self._codec
 
+        if pyramid_levels is None:
+            pyramid_levels = self._pyramid_levels
+
         aprint(f"chunks={chunks}")
 
         # Choosing the fill value to the largest value:
@@ -444,8 +777,148 @@ class ZDataset(BaseDataset):
                     fill_value=fill_value,
                 )
 
+        for level in range(1, pyramid_levels + 1):
+            factor = 2**level
+            level_shape = shape[:1] + tuple(int(m.ceil(s / factor)) for s in shape[1:])
+            level_chunks = tuple(min(c, s) for c, s in zip(array.chunks, level_shape))
+            channel_group.full(
+                name=self._pyramid_name(name, level),
+                shape=level_shape,
+                dtype=dtype,
+                chunks=level_chunks,
+                filters=filters,
+                compressor=compressor,
+                fill_value=fill_value,
+            )
+
         return array
 
+    def can_copy_chunks_from(self, source: BaseDataset, channel: str) -> bool:
+        """
+        Checks whether the compressed chunks of a channel of another dataset can be copied as they are into this one,
+        i.e. add_channel would create arrays with the same chunks, codec, compression level, fill value,
+        projections and pyramid levels.
+
+        Parameters
+        ----------
+        source : source dataset.
+        channel : channel to copy.
+        """
+        if not isinstance(source, ZDataset) or channel not in source:
+            return False
+        array = source._get_zarr_array(channel)
+        if self._chunks is None:
+            chunks = self._default_chunks(array.shape, array.dtype, chunking=self._chunking)
+        else:
+            chunks = self._chunks
+        compressor = Blosc(cname=self._codec, clevel=self._clevel, shuffle=Blosc.BITSHUFFLE)
+        source_group = source._root_group[channel]
+        return (
+            tuple(chunks) == tuple(array.chunks)
+            and array.compressor == compressor
+            and not array.filters
+            and array.fill_value == self._get_largest_dtype_value(array.dtype)
+            and source.pyramid_levels(channel) == self._pyramid_levels
+            and all(source._projection_name(channel, axis) in source_group for axis in range(array.ndim - 1))
+        )
+
+    def copy_chunks_from(
+        self,
+        source: "ZDataset",
+        channel: str,
+        time_points: Optional[Sequence[int]] = None,
+        workers: int = 8,
+    ) -> int:
+        """
+        Copies the compressed chunks of a channel (channel array, projections and pyramid levels)
+        from another dataset without decompressing them, e.g. between directory, nested and zip stores.
+        The channel must have been added to this dataset with identical arrays (see can_copy_chunks_from).
+        If the source dataset has a manifest of chunk hashes (see check_integrity), the copied chunks are checked
+        against it, and their hashes are added to the manifest of this dataset.
+
+        Parameters
+        ----------
+        source : source dataset.
+        channel : channel to copy.
+        time_points : time points to copy, by default all.
+        workers : number of threads copying chunks.
+
+        Returns
+        -------
+        Number of bytes copied.
+        """
+        source_group = source._root_group[channel]
+        dest_group = self._root_group[channel]
+        time_points = None if time_points is None else set(time_points)
+        source_manifest = load_manifest(manifest_path(source.path))
+
+        def _same_encoding(source_array: zarr.Array, dest_array: zarr.Array) -> bool:
+            return (
+                source_array.shape == dest_array.shape
+                and source_array.chunks == dest_array.chunks
+                and source_array.dtype == dest_array.dtype
+                and source_array.order == dest_array.order
+                and source_array.compressor == dest_array.compressor
+                and source_array.filters == dest_array.filters
+                and source_array.fill_value == dest_array.fill_value
+            )
+
+        tasks = []
+        for name, source_array in source_group.arrays():
+            dest_array = dest_group.get(name)
+            if dest_array is None or not _same_encoding(source_array, dest_array):
+                raise ValueError(f"Array '{name}' of channel '{channel}' can't be copied chunk by chunk!")
+            time_chunk_length = source_array.chunks[0]
+            for key in chunk_keys(source_array):
+                first_time_point = int(key.split(".", 1)[0]) * time_chunk_length
+                chunk_time_points = range(first_time_point, first_time_point + time_chunk_length)
+                if time_points is None or any(t in time_points for t in chunk_time_points):
+                    tasks.append((source_array, dest_array, key))
+
+        def _copy_chunk(task: Tuple[zarr.Array, zarr.Array, str]) -> Tuple[int, Optional[str], bool]:
+            source_array, dest_array, key = task
+            data = source_array.chunk_store[chunk_store_key(source_array, key)]
+            expected = source_manifest.get(source_array.path, {}).get(key)
+            hashed = None if expected is None else chunk_hash(data)
+            if hashed != expected:
+                # corrupted at the source, not copied:
+                return len(data), hashed, False
+            dest_array.chunk_store[chunk_store_key(dest_array, key)] = data
+            return len(data), hashed, True
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = list(executor.map(_copy_chunk, tasks))
+        elapsed = time.time() - start
+        nb_bytes = sum(size for size, _, _ in results)
+
+        aprint(
+            f"Copied {len(tasks)} compressed chunks of channel '{channel}' ({nb_bytes / 1e6:.1f} MB) "
+            + f"in {elapsed:.2f}s ({nb_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)."
+        )
+
+        corrupted = []
+        verified = {}
+        for (source_array, dest_array, key), (_, hashed, copied) in zip(tasks, results):
+            if not copied:
+                corrupted.append(f"{source_array.path}/{key}")
+            elif hashed is not None:
+                verified.setdefault(dest_array.path, {})[key] = hashed
+
+        if len(corrupted) > 0:
+            listed = ", ".join(corrupted[:8]) + (", ..." if len(corrupted) > 8 else "")
+            raise ValueError(f"{len(corrupted)} chunks differ from the manifest of the source dataset: {listed}")
+
+        # the hashes of the chunks verified against the source manifest hold for the copies:
+        if len(verified) > 0:
+            path = manifest_path(self._path)
+            manifest = load_manifest(path)
+            for array_path, hashes in verified.items():
+                manifest.setdefault(array_path, {}).update(hashes)
+            save_manifest(path, manifest)
+
+        return nb_bytes
+
     def add_channels_to(
         self,
         zdataset: Union[str, "ZDataset"],
@@ -477,7 +950,7 @@ class ZDataset(BaseDataset):
 
         for channel, new_name in zip(channels, rename):
             try:
-                array = self.get_array(channel, per_z_slice=False, wrap_with_dask=False)
+                array = self._get_zarr_array(channel)
                 source_group = self._root_group[channel]
                 source_arrays = source_group.items()
 
@@ -502,7 +975,7 @@ class ZDataset(BaseDataset):
                         if add_projections:
                             ndim = array.ndim - 1
                             for axis in range(ndim):
-                                proj_array = self.get_projection_array(channel=channel, axis=axis, wrap_with_dask=False)
+                                proj_array = source_group.get(self._projection_name(channel, axis))
                                 convenience.copy(
                                     source=proj_array,
                                     dest=dest_group,
@@ -510,6 +983,14 @@ class ZDataset(BaseDataset):
                                     if_exists="replace" if overwrite else "raise",
                                 )
 
+                        for level in range(1, self.pyramid_levels(channel) + 1):
+                            convenience.copy(
+                                source=source_group.get(self._pyramid_name(channel, level)),
+                                dest=dest_group,
+                                name=self._pyramid_name(new_name, level),
+                                if_exists="replace" if overwrite else "raise",
+                            )
+
             except (CopyError, NotImplementedError):
                 aprint("Channel already exists, set option '-w' to force overwriting! ")
 
@@ -561,7 +1042,7 @@ class ZDataset(BaseDataset):
             if path.exists():
                 raise ValueError(f"Path: {path} exists!")
 
-            array = self.get_array(channel)
+            array = self._get_zarr_array(channel)
             # ignoring time and reversing to fiji ordering
             resolution = self.get_resolution(channel)[1:][::-1]
             writer = npy2bdv.BdvWriter(str(path))
@@ -573,16 +1054,34 @@ class ZDataset(BaseDataset):
             writer.write_xml()
             writer.close()
 
+    def uninitialized_time_points(self, channel: str) -> List[int]:
+        """
+        Returns the time points of a channel that are not entirely written, i.e. with missing chunks in the channel
+        array or in its projection and pyramid arrays. Operations only process these time points,
+        so that they resume where an interrupted run stopped.
+        Chunks equal to the fill value are not stored by tensorstore, the corresponding time points are listed too.
+        """
+        group = self._root_group[channel]
+        nb_time_points = group[channel].shape[0]
+        initialized = numpy.ones(nb_time_points, dtype=bool)
+
+        for _, array in group.arrays():
+            # number of stored chunks per time chunk:
+            nb_chunks = numpy.zeros(array.cdata_shape[0], dtype=numpy.int64)
+            for key in chunk_keys(array):
+                nb_chunks[int(key.split(".", 1)[0])] += 1
+
+            initialized_chunks = nb_chunks >= numpy.prod(array.cdata_shape[1:], dtype=numpy.int64)
+            initialized &= numpy.repeat(initialized_chunks, array.chunks[0])[:nb_time_points]
+
+        return [int(time_point) for time_point in numpy.flatnonzero(~initialized)]
+
     def first_uninitialized_time_point(self, channel: str) -> int:
         """
         Returns the index of the first uninitialized time point or the last time point if it is fully initialized
         """
-        array = self.get_array(channel)
-        prog = re.compile(r"\.".join([r"\d+"] * min(1, array.ndim)))
-        initialized = {
-            int(k.split(".", 1)[0]) for k in zarr.storage.listdir(array.chunk_store, array._path) if prog.match(k)
-        }
-        return max(initialized)
+        uninitialized = self.uninitialized_time_points(channel)
+        return uninitialized[0] if len(uninitialized) > 0 else self.nb_timepoints(channel) - 1
 
     def to_ome_zarr(self, path: str, force_dtype: Optional[int] = None, n_scales: int = 3) -> None:
         ch = self.channels()[0]
@@ -632,6 +1131,10 @@ class ZDataset(BaseDataset):
                     arrays[0][t, c] = stack
                     stack = bkd.to_backend(stack)
                     for i in range(1, n_scales):
+                        if i <= self.pyramid_levels(channel):
+                            # reusing the pyramid levels maintained while writing:
+                            arrays[i][t, c] = numpy.asarray(self.get_pyramid_array(channel, i)[t])
+                            continue
                         factors = (2**i,) * stack.ndim
                         arrays[i][t, c] = bkd.to_numpy(downscale_local_mean(stack, factors))
 
@@ -658,7 +1161,13 @@ class ZDataset(BaseDataset):
         group.attrs["omero"] = default_omero_metadata(self._path, self.channels(), dtype)
 
     def __getitem__(self, channel: str) -> StackIterator:
-        return StackIterator(self.get_array(channel, wrap_with_tensorstore=True), self._slicing)
+        # stacks of directory stores are always read with tensorstore, zip stores need a tensorstore release
+        # with the zip key-value store, newer than the optional pinned one, so only when explicitly requested:
+        if isinstance(self._store, zarr.storage.DirectoryStore):
+            wrap_with_tensorstore = True
+        else:
+            wrap_with_tensorstore = self._use_tensorstore()
+        return StackIterator(self.get_array(channel, wrap_with_tensorstore=wrap_with_tensorstore), self._slicing)
 
     def __contains__(self, channel: str) -> bool:
         """Checks if channels exists, valid for when using multiple process."""
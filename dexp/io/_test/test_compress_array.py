@@ -1,6 +1,12 @@
 import numpy
 
-from dexp.io.compress_array import compress_array, decompress_array
+from dexp.io.compress_array import (
+    INDEX_MAGIC,
+    blosc_chunks,
+    compress_array,
+    decompress_array,
+    decompress_array_range,
+)
 
 
 def do_test(array_dc, array_uc, min_num_chunks=0):
@@ -41,3 +47,41 @@ def test_compress_many_chunks():
     array_uc = numpy.linspace(0, 1024, 1000).astype(numpy.uint16)
     array_dc = numpy.empty_like(array_uc)
     do_test(array_dc, array_uc, min_num_chunks=987)
+
+
+def test_decompress_array_parallel_and_range():
+    array_uc = numpy.random.randint(0, 1024, size=(16, 64, 64), dtype=numpy.uint16)
+    compressed_array = compress_array(array_uc, min_num_chunks=7)
+
+    array_dc = numpy.empty_like(array_uc)
+    decompress_array(memoryview(compressed_array), array_dc, num_threads=4)
+    assert (array_uc == array_dc).all()
+
+    # ranges of z planes, straddling chunk boundaries or not:
+    for z_start, z_stop in ((0, 1), (3, 9), (5, 6), (15, 16), (0, 16)):
+        array_range = numpy.empty_like(array_uc[z_start:z_stop])
+        decompress_array_range(compressed_array, array_range, offset=z_start * array_uc[0].nbytes, num_threads=2)
+        assert (array_range == array_uc[z_start:z_stop]).all()
+
+
+def test_parallel_compress_array():
+    array_uc = numpy.random.randint(0, 1024, size=(32, 128, 256), dtype=numpy.uint16)
+    compressed_array = compress_array(array_uc, num_threads=2)
+
+    # parallel mode splits the array in chunks and writes an index:
+    assert compressed_array.startswith(INDEX_MAGIC)
+    chunks = blosc_chunks(compressed_array)
+    assert len(chunks) == 2
+    assert sum(chunk[3] for chunk in chunks) == array_uc.nbytes
+
+    for num_threads in (1, 3):
+        array_dc = numpy.empty_like(array_uc)
+        decompress_array(compressed_array, array_dc, num_threads=num_threads)
+        assert (array_uc == array_dc).all()
+
+    array_range = numpy.empty_like(array_uc[10:20])
+    decompress_array_range(compressed_array, array_range, offset=10 * array_uc[0].nbytes, num_threads=2)
+    assert (array_range == array_uc[10:20]).all()
+
+    # small arrays are not split:
+    assert len(blosc_chunks(compress_array(array_uc[0], num_threads=4))) == 1
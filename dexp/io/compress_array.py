@@ -1,11 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
 from math import ceil
+from typing import List, Tuple
 
 import blosc
+import numpy
 from blosc import compress_ptr, decompress_ptr, get_cbuffer_sizes
 from numpy import ndarray
 
+# Magic bytes starting the chunk index of buffers compressed in parallel mode,
+# a Blosc header never starts with these bytes (the first byte is the Blosc format version):
+INDEX_MAGIC = b"DXPC"
 
-def compress_array(array: ndarray, clevel: int = 3, compressor: str = "lz4", min_num_chunks: int = 0) -> bytes:
+# Minimal length of the chunks an array is split into for parallel compression:
+MIN_PARALLEL_CHUNK_LENGTH = 2**20
+
+
+def compress_array(
+    array: ndarray, clevel: int = 3, compressor: str = "lz4", min_num_chunks: int = 0, num_threads: int = 1
+) -> bytes:
     """
     Compresses an arbitrary ndarray that supports the '__array_interface__' into a Blosc compressed buffer.
 
@@ -15,6 +27,9 @@ def compress_array(array: ndarray, clevel: int = 3, compressor: str = "lz4", min
     clevel: Compression level
     compressor: compressor (any supported by Blosc)
     min_num_chunks: Minimum number of chunks to split array into before compression.
+    num_threads: If larger than one, parallel mode: the array is split into at least num_threads chunks
+        (of at least 1MB) that are compressed concurrently, and the buffer starts with an index of the chunks
+        so that they can be located without scanning and decompressed concurrently.
 
     Returns
     -------
@@ -32,6 +47,8 @@ def compress_array(array: ndarray, clevel: int = 3, compressor: str = "lz4", min
     # Let's avoid small trailing chunks and make them all about teh same size:
     number_of_chunks = max(2, ceil(array_length / max_chunk_length)) if array_length > max_chunk_length else 1
     number_of_chunks = max(min_num_chunks, number_of_chunks)
+    if num_threads > 1:
+        number_of_chunks = max(number_of_chunks, min(num_threads, array_length // MIN_PARALLEL_CHUNK_LENGTH))
     approx_chunk_length_in_bytes = array_length // number_of_chunks
 
     # Let's make sure that the chunks are aligned to the data type:
@@ -40,16 +57,17 @@ def compress_array(array: ndarray, clevel: int = 3, compressor: str = "lz4", min
     # Let' make the chunks large enough that we are garanteed to cover the whole array:
     approx_chunk_length_in_bytes += number_of_chunks * itemsize
 
-    # this will hold the compressed data:
-    compressed_buffer = bytearray()
-
-    # we start reading the array data here:
+    # We list the chunks, starting to read the array data here:
+    chunks = []
     chunk_address = array_address
-
-    # We loop through each chunk:
     while chunk_address < end_address:
         chunk_length_in_bytes = min(approx_chunk_length_in_bytes, end_address - chunk_address)
-        compressed_chunk = compress_ptr(
+        chunks.append((chunk_address, chunk_length_in_bytes))
+        chunk_address += chunk_length_in_bytes
+
+    def _compress_chunk(chunk: Tuple[int, int]) -> bytes:
+        chunk_address, chunk_length_in_bytes = chunk
+        return compress_ptr(
             address=chunk_address,
             items=chunk_length_in_bytes // itemsize,
             typesize=itemsize,
@@ -57,56 +75,147 @@ def compress_array(array: ndarray, clevel: int = 3, compressor: str = "lz4", min
             shuffle=blosc.BITSHUFFLE,
             cname=compressor,
         )
-        if number_of_chunks == 1:
+
+    if num_threads <= 1:
+        compressed_chunks = [_compress_chunk(chunk) for chunk in chunks]
+        if len(compressed_chunks) == 1:
             # If there is only one chunk, let's not be complicated about it:
-            compressed_buffer = compressed_chunk
-        else:
-            # If not, so bit it:
-            compressed_buffer.extend(compressed_chunk)
-        chunk_address += chunk_length_in_bytes
+            return compressed_chunks[0]
+        # chunks are copied once, in a buffer allocated at its final size:
+        return b"".join(compressed_chunks)
+
+    # Blosc releases the GIL during compression, so that chunks are compressed concurrently:
+    blosc.set_releasegil(True)
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        compressed_chunks = list(executor.map(_compress_chunk, chunks))
+
+    # Index: magic bytes, number of chunks, then compressed and decompressed length of each chunk:
+    index = numpy.asarray(
+        [(len(compressed_chunk), length) for compressed_chunk, (_, length) in zip(compressed_chunks, chunks)],
+        dtype="<u8",
+    )
+    header = INDEX_MAGIC + numpy.asarray([len(chunks)], dtype="<u4").tobytes() + index.tobytes()
+
+    return b"".join([header] + compressed_chunks)
+
+
+def blosc_chunks(compressed_bytes) -> List[Tuple[int, int, int, int]]:
+    """
+    Lists the Blosc chunks of a buffer compressed with the 'compress_array' function.
+    The chunks are read from the index of buffers compressed in parallel mode, otherwise only the 16 bytes
+    header of each chunk is read, which makes this cheap for memory-mapped files.
+
+    Parameters
+    ----------
+    compressed_bytes: buffer containing compressed data (bytes, memoryview, mmap, ...)
+
+    Returns
+    -------
+    List of tuples: (compressed offset, compressed length, decompressed offset, decompressed length)
+
+    """
+    if bytes(compressed_bytes[: len(INDEX_MAGIC)]) == INDEX_MAGIC:
+        offset_index = len(INDEX_MAGIC)
+        num_chunks = int(numpy.frombuffer(bytes(compressed_bytes[offset_index : offset_index + 4]), dtype="<u4")[0])
+        offset_index += 4
+        index = numpy.frombuffer(bytes(compressed_bytes[offset_index : offset_index + 16 * num_chunks]), dtype="<u8")
+        index = index.reshape(num_chunks, 2).astype(numpy.int64)
+        offsets_compressed = offset_index + 16 * num_chunks + numpy.cumsum(index[:, 0]) - index[:, 0]
+        offsets_decompressed = numpy.cumsum(index[:, 1]) - index[:, 1]
+        return [
+            (int(oc), int(nc), int(od), int(nd))
+            for oc, (nc, nd), od in zip(offsets_compressed, index, offsets_decompressed)
+        ]
+
+    chunks = []
+    num_of_compressed_bytes = len(compressed_bytes)
+    offset_compressed = 0
+    offset_decompressed = 0
+
+    while num_of_compressed_bytes - offset_compressed > 32:
+        # This is the BLOSC header:
+        blosc_header = bytes(compressed_bytes[offset_compressed : offset_compressed + 16])
+        num_decompressed_bytes, num_compressed_bytes, _ = get_cbuffer_sizes(blosc_header)
+        chunks.append((offset_compressed, num_compressed_bytes, offset_decompressed, num_decompressed_bytes))
+        offset_compressed += num_compressed_bytes
+        offset_decompressed += num_decompressed_bytes
 
-    return bytes(compressed_buffer)
+    return chunks
 
 
-def decompress_array(compressed_bytes, out_array: ndarray = None) -> ndarray:
+def decompress_array(compressed_bytes, out_array: ndarray = None, num_threads: int = 1) -> ndarray:
     """
     Decompresses an array compressed with the 'compress_array' function.
 
     Parameters
     ----------
-    compressed_bytes: buffer containing compressed data
+    compressed_bytes: buffer containing compressed data, any object supporting the buffer protocol,
+        for example a memory-mapped file, in which case no intermediate copy of the compressed data is made.
     out_array: array of _correct_ size to put the decompressed daat in.
+    num_threads: number of threads decompressing independent Blosc chunks in parallel.
 
     Returns
     -------
     Same array as passed as 'out_array'
 
     """
+    return decompress_array_range(compressed_bytes, out_array, offset=0, num_threads=num_threads)
 
-    # get the array pointer and length in bytes:
-    array_address = out_array.__array_interface__["data"][0]
 
-    # prepare the basics:
-    num_of_compressed_bytes = len(compressed_bytes)
-    offset_compressed = 0
-    address_decompressed = array_address
+def decompress_array_range(compressed_bytes, out_array: ndarray, offset: int = 0, num_threads: int = 1) -> ndarray:
+    """
+    Decompresses a contiguous range of bytes of an array compressed with the 'compress_array' function,
+    for example a range of z planes of a stack. Only the Blosc chunks overlapping the range are decompressed:
+    chunks entirely within the range are decompressed directly into the output array,
+    chunks straddling the range boundaries go through a temporary buffer.
 
-    while num_of_compressed_bytes - offset_compressed > 32:
+    Parameters
+    ----------
+    compressed_bytes: buffer containing compressed data (bytes, memoryview, mmap, ...)
+    out_array: contiguous array receiving the decompressed bytes [offset, offset + out_array.nbytes)
+    offset: offset in bytes of the range within the decompressed array.
+    num_threads: number of threads decompressing independent Blosc chunks in parallel.
 
-        # This is the BLOSC header:
-        blosc_header = bytes(compressed_bytes[offset_compressed : offset_compressed + 32])
+    Returns
+    -------
+    Same array as passed as 'out_array'
 
-        # we check how large is the first chunk available:
-        num_decompressed_bytes, num_compressed_bytes, _ = get_cbuffer_sizes(blosc_header)
+    """
+    if not out_array.flags.c_contiguous:
+        raise ValueError("Output array must be C-contiguous!")
 
-        # we prepare the corresponding region of the array:
-        compressed_chunk = compressed_bytes[offset_compressed : offset_compressed + num_compressed_bytes]
+    compressed_bytes = memoryview(compressed_bytes).cast("B")
 
-        # do the actual decompression:
-        decompress_ptr(compressed_chunk, address_decompressed)
+    # get the array pointer and length in bytes:
+    array_address = out_array.__array_interface__["data"][0]
+    start, stop = offset, offset + out_array.nbytes
 
-        # we move the pointers forward:
-        offset_compressed += num_compressed_bytes
-        address_decompressed += num_decompressed_bytes
+    # chunks overlapping the requested range:
+    chunks = [chunk for chunk in blosc_chunks(compressed_bytes) if chunk[2] < stop and chunk[2] + chunk[3] > start]
+
+    def _decompress_chunk(chunk: Tuple[int, int, int, int]) -> None:
+        offset_compressed, num_compressed_bytes, offset_decompressed, num_decompressed_bytes = chunk
+        compressed_chunk = compressed_bytes[offset_compressed : offset_compressed + num_compressed_bytes]
+
+        if start <= offset_decompressed and offset_decompressed + num_decompressed_bytes <= stop:
+            # do the actual decompression, directly into the output array:
+            decompress_ptr(compressed_chunk, array_address + offset_decompressed - start)
+        else:
+            # partial chunk, decompressed in a temporary buffer:
+            buffer = numpy.empty(num_decompressed_bytes, dtype=numpy.uint8)
+            decompress_ptr(compressed_chunk, buffer.__array_interface__["data"][0])
+            begin = max(start, offset_decompressed)
+            end = min(stop, offset_decompressed + num_decompressed_bytes)
+            out_bytes = out_array.reshape(-1).view(numpy.uint8)
+            out_bytes[begin - start : end - start] = buffer[begin - offset_decompressed : end - offset_decompressed]
+
+    if num_threads > 1 and len(chunks) > 1:
+        # Blosc releases the GIL during decompression, so that chunks are decompressed concurrently:
+        blosc.set_releasegil(True)
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(_decompress_chunk, chunks))
+    else:
+        for chunk in chunks:
+            _decompress_chunk(chunk)
 
     return out_array
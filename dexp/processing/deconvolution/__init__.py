@@ -1,5 +1,6 @@
 from dexp.processing.deconvolution.admm_deconvolution import admm_deconvolution
 from dexp.processing.deconvolution.blind_deconvolution import blind_deconvolution
+from dexp.processing.deconvolution.deconvolution_plan import DeconvolutionPlan
 from dexp.processing.deconvolution.inversion_deconvolution import (
     inversion_deconvolution,
 )
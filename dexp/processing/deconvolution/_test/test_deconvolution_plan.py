@@ -0,0 +1,58 @@
+import pickle
+
+import numpy
+from skimage.data import camera
+
+from dexp.processing.deconvolution import DeconvolutionPlan
+from dexp.processing.deconvolution.lr_deconvolution import lucy_richardson_deconvolution
+from dexp.processing.filters.fft_convolve import fft_convolve
+from dexp.processing.filters.kernels.gaussian import gaussian_kernel_nd
+from dexp.utils.backends import Backend
+from dexp.utils.testing.testing import execute_both_backends
+
+
+@execute_both_backends
+def test_deconvolution_plan_convolution():
+    xp = Backend.get_xp_module()
+    rng = numpy.random.default_rng(0)
+
+    psf = gaussian_kernel_nd(size=9, ndim=3, sigma=2, dtype=numpy.float32)
+    plan = DeconvolutionPlan(psf)
+
+    psf_backend = Backend.to_backend(psf)
+    back_projector = xp.flip(psf_backend).copy()
+
+    for shape in ((32, 48, 40), (17, 33, 21), (32, 48, 40)):
+        image = Backend.to_backend(rng.random(shape, dtype=numpy.float32))
+        expected = fft_convolve(image, psf_backend, in_place=False)
+        assert xp.allclose(plan.convolve_psf(image), expected, atol=1e-5)
+        expected = fft_convolve(image, back_projector, in_place=False)
+        assert xp.allclose(plan.back_project(image), expected, atol=1e-5)
+
+    # spectra are computed once per shape:
+    assert len(plan._spectra) == 2
+
+    # plans can be sent to other processes, without their cached spectra:
+    unpickled = pickle.loads(pickle.dumps(plan))
+    assert len(unpickled._spectra) == 0
+    assert numpy.all(unpickled.psf == plan.psf)
+
+
+@execute_both_backends
+def test_lr_deconvolution_with_plan():
+    xp = Backend.get_xp_module()
+
+    image = Backend.to_backend(camera().astype(numpy.float32)[:256, :256] / 255)
+    psf = gaussian_kernel_nd(size=9, ndim=2, sigma=2, dtype=numpy.float32)
+    blurry = fft_convolve(image, Backend.to_backend(psf))
+
+    plan = DeconvolutionPlan(psf, back_projection="wb", blind_spot=3)
+    kwargs = dict(num_iterations=5, back_projection="wb", blind_spot=3)
+
+    deconvolved = lucy_richardson_deconvolution(blurry, psf, **kwargs)
+    deconvolved_with_plan = lucy_richardson_deconvolution(blurry, psf, plan=plan, **kwargs)
+    # second call reuses the cached spectra:
+    deconvolved_with_plan_again = lucy_richardson_deconvolution(blurry, psf, plan=plan, **kwargs)
+
+    assert xp.allclose(deconvolved, deconvolved_with_plan)
+    assert xp.allclose(deconvolved_with_plan, deconvolved_with_plan_again)
@@ -6,6 +6,7 @@ from dexp.processing.deconvolution.lr_deconvolution import lucy_richardson_decon
 from dexp.processing.filters.fft_convolve import fft_convolve
 from dexp.processing.filters.kernels.gaussian import gaussian_kernel_nd
 from dexp.utils.backends import Backend, CupyBackend, NumpyBackend
+from dexp.utils.testing.testing import execute_both_backends
 
 
 def test_lr_deconvolution_numpy():
@@ -43,3 +44,28 @@ def _test_lr_deconvolution():
     print(f"Error = {error}")
 
     assert error < 0.001
+
+
+@execute_both_backends
+def test_accelerated_lr_deconvolution():
+    xp = Backend.get_xp_module()
+
+    image = camera().astype(numpy.float32) / 255
+    psf = gaussian_kernel_nd(size=15, ndim=2, sigma=3, dtype=numpy.float32)
+
+    image = Backend.to_backend(image)
+    psf = Backend.to_backend(psf)
+    blurry = fft_convolve(image, psf)
+
+    def residual(deconvolved):
+        return float(xp.mean(xp.abs(fft_convolve(deconvolved, psf) - blurry)))
+
+    plain = lucy_richardson_deconvolution(blurry, psf, num_iterations=20)
+    accelerated = lucy_richardson_deconvolution(blurry, psf, num_iterations=10, acceleration="biggs")
+
+    # half the iterations reach a lower residual:
+    assert residual(accelerated) < residual(plain)
+
+    # early stopping:
+    stopped = lucy_richardson_deconvolution(blurry, psf, num_iterations=100, acceleration="biggs", tolerance=0.01)
+    assert residual(stopped) > residual(accelerated)
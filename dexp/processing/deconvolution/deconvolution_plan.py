@@ -0,0 +1,214 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+import numpy
+import scipy.fftpack
+
+from dexp.processing.filters.kernels.gaussian import gaussian_kernel_nd
+from dexp.processing.filters.kernels.wiener_butterworth import wiener_butterworth_kernel
+from dexp.utils import xpArray
+from dexp.utils.backends import Backend, NumpyBackend
+
+
+class DeconvolutionPlan:
+    def __init__(
+        self,
+        psf: xpArray,
+        back_projection: Optional[str] = None,
+        wb_cutoffs: Union[float, Tuple[float, ...], None] = 0.9,
+        wb_beta: float = 0.05,
+        wb_order: int = 2,
+        blind_spot: int = 0,
+        blind_spot_mode: str = "median+uniform",
+        blind_spot_axis_exclusion: Optional[Tuple[int, ...]] = None,
+        mode: str = "reflect",
+        internal_dtype=numpy.float32,
+        max_cached_shapes: int = 8,
+    ):
+        """
+        Precomputed 'plan' for Lucy-Richardson deconvolution with a given point-spread-function:
+        the blind-spot kernels, the (blind-spot) PSF and the back projector are built once,
+        and their spectra are computed once per padded image shape and per device, so that they can be reused
+        across iterations, tiles and time points. Convolutions then only need one forward and one inverse FFT.
+
+        Parameters
+        ----------
+        psf : point-spread-function.
+        back_projection : back projection operator to use: 'tpsf' or 'wb'.
+        wb_cutoffs : Wiener-Butterworth cutoffs for wb back projection.
+        wb_beta : Wiener-Butterworth backprojection beta parameter.
+        wb_order : Wiener-Butterworth backprojection order parameter.
+        blind_spot : If zero, blind-spot is disabled, otherwise the blind-spot kernel support (odd integer).
+        blind_spot_mode : blind-spot mode, can be 'mean' or 'median'
+        blind_spot_axis_exclusion : axis along which the blind-spot support kernel is clipped.
+        mode : padding mode used for convolutions (see numpy/cupy pad function), 'wrap' disables padding.
+        internal_dtype : dtype used for convolutions.
+        max_cached_shapes : maximal number of image shapes for which kernel spectra are kept.
+        """
+        if blind_spot > 0 and 2 * (blind_spot // 2) == blind_spot:
+            raise ValueError(f"Blind spot size must be an odd integer, blind_spot={blind_spot} is not!")
+
+        self.back_projection = "tpsf" if back_projection is None else back_projection
+        if self.back_projection not in ("tpsf", "wb"):
+            raise ValueError(f"back projection mode: {back_projection} not supported.")
+
+        self.blind_spot = blind_spot
+        self.blind_spot_mode = blind_spot_mode
+        self.mode = mode
+        self.internal_dtype = internal_dtype
+        self.max_cached_shapes = max_cached_shapes
+
+        # kernels are kept in host memory and moved to the device they are used on:
+        with NumpyBackend():
+            sp = Backend.get_sp_module()
+            psf = Backend.to_numpy(psf, dtype=internal_dtype, force_copy=True)
+            ndim = psf.ndim
+
+            self.full_kernel = None
+            self.donut_kernel = None
+            if blind_spot > 0:
+                if "gaussian" in blind_spot_mode:
+                    full_kernel = gaussian_kernel_nd(ndim=ndim, size=blind_spot, sigma=max(1, blind_spot // 2))
+                    full_kernel = full_kernel.astype(internal_dtype)
+                else:
+                    full_kernel = numpy.ones(shape=(blind_spot,) * ndim, dtype=internal_dtype)
+
+                if blind_spot_axis_exclusion is not None:
+                    c = blind_spot // 2
+                    slicing_n = [slice(None, None, None)] * ndim
+                    slicing_p = [slice(None, None, None)] * ndim
+                    for axis in blind_spot_axis_exclusion:
+                        slicing_n[axis] = slice(0, c, None)
+                        slicing_p[axis] = slice(c + 1, blind_spot, None)
+
+                    full_kernel[tuple(slicing_n)] = 0
+                    full_kernel[tuple(slicing_p)] = 0
+
+                full_kernel /= full_kernel.sum()
+                donut_kernel = full_kernel.copy()
+                donut_kernel[(slice(blind_spot // 2, blind_spot // 2 + 1, None),) * ndim] = 0
+                donut_kernel /= donut_kernel.sum()
+                psf = sp.ndimage.convolve(psf, donut_kernel)
+                psf /= psf.sum()
+
+                self.full_kernel = full_kernel
+                self.donut_kernel = donut_kernel
+
+            if self.back_projection == "tpsf":
+                back_projector = numpy.flip(psf).copy()
+            else:
+                back_projector = wiener_butterworth_kernel(
+                    kernel=numpy.flip(psf), cutoffs=wb_cutoffs, beta=wb_beta, order=wb_order, dtype=numpy.float64
+                )
+                back_projector = back_projector.astype(internal_dtype)
+
+        self.psf = psf
+        self.back_projector = back_projector
+
+        self._spectra = OrderedDict()
+        self._kernels = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ndim(self) -> int:
+        return self.psf.ndim
+
+    def __getstate__(self):
+        # spectra and device kernels are recomputed where the plan is used:
+        state = self.__dict__.copy()
+        state["_spectra"] = OrderedDict()
+        state["_kernels"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _device_key() -> Tuple:
+        backend = Backend.current()
+        return type(backend).__name__, getattr(backend, "device_id", None)
+
+    def kernels(self) -> Tuple[xpArray, xpArray]:
+        """Returns the PSF and back projector on the current backend."""
+        key = self._device_key()
+        with self._lock:
+            if key not in self._kernels:
+                self._kernels[key] = (
+                    Backend.to_backend(self.psf, dtype=self.internal_dtype),
+                    Backend.to_backend(self.back_projector, dtype=self.internal_dtype),
+                )
+            return self._kernels[key]
+
+    def _fft_shape(self, shape: Tuple[int, ...]) -> Tuple[Tuple[int, ...], Tuple[slice, ...], Tuple]:
+        """Returns the FFT shape, the slicing of the convolved image and the padding for an image shape."""
+        kernel_shape = self.psf.shape
+        if self.mode != "wrap":
+            pad_width = tuple((s // 2, s // 2) for s in kernel_shape)
+            padded_shape = tuple(s + 2 * (k // 2) for s, k in zip(shape, kernel_shape))
+            offsets = tuple((k - 1) // 2 + k // 2 for k in kernel_shape)
+        else:
+            pad_width = None
+            padded_shape = shape
+            offsets = tuple((k - 1) // 2 for k in kernel_shape)
+
+        full_shape = tuple(s + k - 1 for s, k in zip(padded_shape, kernel_shape))
+        fsize = tuple(scipy.fftpack.next_fast_len(s) for s in full_shape)
+        slicing = tuple(slice(o, o + s) for o, s in zip(offsets, shape))
+        return fsize, slicing, pad_width
+
+    def spectra(self, shape: Tuple[int, ...]) -> Tuple[xpArray, xpArray]:
+        """Returns the spectra of the PSF and back projector for images of a given shape, on the current backend."""
+        key = (tuple(shape),) + self._device_key()
+        with self._lock:
+            if key in self._spectra:
+                self._spectra.move_to_end(key)
+                return self._spectra[key]
+
+        sp = Backend.get_sp_module()
+        psf, back_projector = self.kernels()
+        fsize, _, _ = self._fft_shape(shape)
+        spectra = (sp.fft.rfftn(psf, fsize), sp.fft.rfftn(back_projector, fsize))
+
+        with self._lock:
+            self._spectra[key] = spectra
+            while len(self._spectra) > self.max_cached_shapes:
+                self._spectra.popitem(last=False)
+        return spectra
+
+    def _convolve(self, image: xpArray, spectrum: xpArray) -> xpArray:
+        xp = Backend.get_xp_module()
+        sp = Backend.get_sp_module()
+
+        fsize, slicing, pad_width = self._fft_shape(image.shape)
+        if pad_width is not None:
+            image = xp.pad(image, pad_width=pad_width, mode=self.mode)
+
+        image_fft = sp.fft.rfftn(image, fsize, overwrite_x=pad_width is not None)
+        image_fft *= spectrum
+        result = sp.fft.irfftn(image_fft, fsize, overwrite_x=True)
+        return result[slicing]
+
+    def convolve_psf(self, image: xpArray) -> xpArray:
+        """Convolves an image with the PSF."""
+        return self._convolve(image, self.spectra(image.shape)[0])
+
+    def back_project(self, image: xpArray) -> xpArray:
+        """Convolves an image with the back projector."""
+        return self._convolve(image, self.spectra(image.shape)[1])
+
+    def blind_spot_filter(self, image: xpArray) -> xpArray:
+        """Applies the blind-spot filtering to an image, returns the image unchanged if blind-spot is disabled."""
+        if self.blind_spot <= 0:
+            return image
+
+        sp = Backend.get_sp_module()
+        if "median" in self.blind_spot_mode:
+            full_kernel = Backend.to_backend(self.full_kernel)
+            return sp.ndimage.median_filter(image, footprint=full_kernel)
+        elif "mean" in self.blind_spot_mode:
+            donut_kernel = Backend.to_backend(self.donut_kernel, dtype=image.dtype)
+            return sp.ndimage.convolve(image, donut_kernel)
+        return image
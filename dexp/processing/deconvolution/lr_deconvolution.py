@@ -2,10 +2,10 @@ import math
 from typing import Optional, Tuple, Union
 
 import numpy
+from arbol import aprint
 
+from dexp.processing.deconvolution.deconvolution_plan import DeconvolutionPlan
 from dexp.processing.filters.fft_convolve import fft_convolve
-from dexp.processing.filters.kernels.gaussian import gaussian_kernel_nd
-from dexp.processing.filters.kernels.wiener_butterworth import wiener_butterworth_kernel
 from dexp.processing.utils.nan_to_zero import nan_to_zero
 from dexp.processing.utils.normalise import Normalise
 from dexp.utils import xpArray
@@ -33,6 +33,10 @@ def lucy_richardson_deconvolution(
     eps: float = 1e-12,
     convolve_method=fft_convolve,
     internal_dtype=None,
+    plan: Optional[DeconvolutionPlan] = None,
+    acceleration: Optional[str] = None,
+    max_acceleration: float = 0.999,
+    tolerance: Optional[float] = None,
 ):
     """
     Deconvolves an nD image given a point-spread-function.
@@ -62,8 +66,16 @@ def lucy_richardson_deconvolution(
         For example for a 3D stack where the sampling along z (first axis) is poor,
         use: (0,) so that blind-spot kernel does not extend in z.
     eps: epsilon to avoid dividing by zero
-    convolve_method : convolution method to use
+    convolve_method : convolution method to use, by default FFT convolutions with the cached kernel spectra of the plan.
     internal_dtype : dtype to use internally for computation.
+    plan : precomputed deconvolution plan (PSF, back projector, blind-spot kernels and their spectra),
+        to be reused across tiles and time points. If given, psf, back_projection, wb_* and blind_spot* are ignored.
+    acceleration : If None, plain LR iterations. If 'biggs', each iteration is applied to an extrapolation
+        of the current estimate along the last step (Biggs-Andrews vector extrapolation),
+        which reaches the same residual in far fewer iterations.
+    max_acceleration : maximal extrapolation factor for accelerated iterations, within [0, 1).
+    tolerance : If not None, the relative change of the estimate is reported after each iteration,
+        and iterations stop once it falls below this tolerance.
 
     Returns
     -------
@@ -71,9 +83,21 @@ def lucy_richardson_deconvolution(
 
     """
     xp = Backend.get_xp_module()
-    sp = Backend.get_sp_module()
 
-    if image.ndim != psf.ndim:
+    if plan is None:
+        plan = DeconvolutionPlan(
+            psf,
+            back_projection=back_projection,
+            wb_cutoffs=wb_cutoffs,
+            wb_beta=wb_beta,
+            wb_order=wb_order,
+            blind_spot=blind_spot,
+            blind_spot_mode=blind_spot_mode,
+            blind_spot_axis_exclusion=blind_spot_axis_exclusion,
+            internal_dtype=numpy.float32 if internal_dtype is None else internal_dtype,
+        )
+
+    if image.ndim != plan.ndim:
         raise ValueError("The image and PSF must have same number of dimensions!")
 
     if internal_dtype is None:
@@ -84,92 +108,29 @@ def lucy_richardson_deconvolution(
 
     original_dtype = image.dtype
     image = Backend.to_backend(image, dtype=internal_dtype)
-    psf = Backend.to_backend(psf, dtype=internal_dtype)
 
-    if blind_spot > 0:
-        if 2 * (blind_spot // 2) == blind_spot:
-            raise ValueError(f"Blind spot size must be an odd integer, blind_spot={blind_spot} is not!")
+    # Blind-spot filtering of the input image:
+    image = plan.blind_spot_filter(image)
 
-        if "gaussian" in blind_spot_mode:
-            full_kernel = gaussian_kernel_nd(ndim=image.ndim, size=blind_spot, sigma=max(1, blind_spot // 2))
-        else:
-            full_kernel = xp.ones(shape=(blind_spot,) * image.ndim, dtype=internal_dtype)
-
-        if blind_spot_axis_exclusion is not None:
-            c = blind_spot // 2
-
-            slicing_n = [
-                slice(None, None, None),
-            ] * image.ndim
-            slicing_p = [
-                slice(None, None, None),
-            ] * image.ndim
-            for axis in blind_spot_axis_exclusion:
-                slicing_n[axis] = slice(0, c, None)
-                slicing_p[axis] = slice(c + 1, blind_spot, None)
-
-            full_kernel[slicing_n] = 0
-            full_kernel[slicing_p] = 0
-
-        full_kernel /= full_kernel.sum()
-        donut_kernel = full_kernel.copy()
-        donut_kernel[(slice(blind_spot // 2, blind_spot // 2 + 1, None),) * image.ndim] = 0
-        donut_kernel /= donut_kernel.sum()
-        # psf_original = psf.copy()
-        psf = sp.ndimage.convolve(psf, donut_kernel)
-        psf /= psf.sum()
-
-        if "median" in blind_spot_mode:
-            image = sp.ndimage.median_filter(image, footprint=full_kernel)
-        elif "mean" in blind_spot_mode:
-            image = sp.ndimage.convolve(image, donut_kernel)
-
-        # from napari import Viewer, gui_qt
-        # with gui_qt():
-        #     def _c(array):
-        #         return backend.to_numpy(array)
-        #
-        #     viewer = Viewer()
-        #     #viewer.add_image(_c(image), name='image')
-        #     viewer.add_image(_c(psf_original), name='psf_original')
-        #     viewer.add_image(_c(donut_kernel), name='donut_kernel', color=False)
-        #     viewer.add_image(_c(psf), name='psf')
-        #     viewer.add_image(_c(sp.ndimage.convolve(psf, full_kernel)), name='psf_for_backproj')
-        #     viewer.add_image(_c(back_projector), name='psf')
-
-    # Default back projection:
-    back_projection = "tpsf" if back_projection is None else back_projection
-
-    # Back projection setting:
-    if back_projection == "tpsf":
-        back_projector = xp.flip(psf)
-    elif back_projection == "wb":
-        back_projector = wiener_butterworth_kernel(
-            kernel=xp.flip(psf), cutoffs=wb_cutoffs, beta=wb_beta, order=wb_order, dtype=xp.float64
-        )
-        back_projector = back_projector.astype(psf.dtype)
+    # The default convolution uses the cached kernel spectra of the plan:
+    if convolve_method is fft_convolve:
+        convolve_psf, back_project = plan.convolve_psf, plan.back_project
     else:
-        raise ValueError(f"back projection mode: {back_projection} not supported.")
+        psf, back_projector = plan.kernels()
+
+        def convolve_psf(array: xpArray) -> xpArray:
+            return convolve_method(array, psf)
+
+        def back_project(array: xpArray) -> xpArray:
+            return convolve_method(array, back_projector)
 
     # Default number of iterations:
     if num_iterations is None:
-        if back_projection == "tpsf":
+        if plan.back_projection == "tpsf":
             num_iterations = 20
-        elif back_projection == "wb":
+        elif plan.back_projection == "wb":
             num_iterations = 3
 
-    # from napari import Viewer, gui_qt
-    # with gui_qt():
-    #     def _c(array):
-    #         return backend.to_numpy(array)
-    #     psf_f = xp.log1p(xp.absolute(xp.fft.fftshift(xp.fft.fftn(psf))))
-    #     back_projector_f = xp.log1p(xp.absolute(xp.fft.fftshift(xp.fft.fftn(back_projector))))
-    #     viewer = Viewer()
-    #     viewer.add_image(_c(psf), name='psf')
-    #     viewer.add_image(_c(back_projector), name='back_projector')
-    #     viewer.add_image(_c(psf_f), name='psf_f', colormap='viridis')
-    #     viewer.add_image(_c(back_projector_f), name='back_projector_f', colormap='viridis')
-
     # Normalisation:
     normalise = Normalise(
         image, minmax=normalise_minmax, do_normalise=normalise_input, clip=False, dtype=internal_dtype
@@ -184,40 +145,80 @@ def lucy_richardson_deconvolution(
     # Result array:
     result = xp.full(image.shape, float(xp.mean(image)), dtype=internal_dtype)
 
-    # LR iterations:
-    for i in range(num_iterations):
-        # print(f"LR iteration: {i}")
+    # Image offset by epsilon, computed once:
+    image_eps = image + eps
+
+    def _multiplicative_correction(estimate: xpArray, i: int) -> xpArray:
         # Convolution with PSF:
-        convolved = convolve_method(
-            result,
-            psf,
-        )
-        # convolved = xp.clip(convolved, a_min=0, a_max=None, out=convolved)
-        # Computes relative blur:
-        relative_blur = (image + eps) / (convolved + eps)
+        convolved = convolve_psf(estimate)
+        # Computes relative blur, in-place in the convolved image:
+        convolved += eps
+        relative_blur = xp.divide(image_eps, convolved, out=convolved)
         # replace Nans with zeros, and +inf with very large values:
         relative_blur = nan_to_zero(relative_blur, copy=False)
         # Limits max correction:
         if max_correction is not None:
-            relative_blur[relative_blur > max_correction] = max_correction
-            relative_blur[relative_blur < 1 / max_correction] = 1 / max_correction
+            relative_blur = xp.clip(relative_blur, 1 / max_correction, max_correction, out=relative_blur)
 
         # Back-projection:
-        multiplicative_correction = convolve_method(
-            relative_blur,
-            back_projector,
-        )
+        multiplicative_correction = back_project(relative_blur)
 
         # Multiplicative correction can be optionally elevated to a power:
         if power != 1.0:
             multiplicative_correction = xp.clip(multiplicative_correction, 0, None, out=multiplicative_correction)
             multiplicative_correction **= 1 + (power - 1) / (math.sqrt(1 + i))
 
-        # Apply multiplicative correction:
-        result *= multiplicative_correction
+        return multiplicative_correction
+
+    if acceleration not in (None, "biggs"):
+        raise ValueError(f"acceleration mode: {acceleration} not supported.")
+
+    # Previous estimate and last two update vectors for Biggs-Andrews acceleration:
+    previous = None
+    update = None
+    previous_update = None
+
+    # LR iterations:
+    for i in range(num_iterations):
+        if acceleration is None:
+            multiplicative_correction = _multiplicative_correction(result, i)
+            if tolerance is not None:
+                change = float(xp.linalg.norm(result * (multiplicative_correction - 1)))
+            # Apply multiplicative correction:
+            result *= multiplicative_correction
+            del multiplicative_correction
+        else:
+            # Extrapolates along the direction of the last step, the step length is estimated
+            # from the correlation between the last two updates (Biggs & Andrews, Applied Optics 1997):
+            if previous is None:
+                estimate = result.copy()
+            else:
+                alpha = 0.0
+                if previous_update is not None:
+                    alpha = float(xp.sum(update * previous_update) / (xp.sum(previous_update * previous_update) + eps))
+                    alpha = min(max(alpha, 0.0), max_acceleration)
+                estimate = result + alpha * (result - previous)
+                estimate = xp.clip(estimate, 0, None, out=estimate)
+
+            new_result = _multiplicative_correction(estimate, i)
+            new_result *= estimate
+            previous_update, update = update, new_result - estimate
+            del estimate
+
+            if tolerance is not None:
+                change = float(xp.linalg.norm(new_result - result))
+            previous, result = result, new_result
+
+        if tolerance is not None:
+            # Relative change of the estimate:
+            change /= float(xp.linalg.norm(result)) + eps
+            aprint(f"LR iteration {i}: relative change = {change:.6f}")
+            if change < tolerance:
+                aprint(f"LR converged after {i + 1} iterations (tolerance: {tolerance}).")
+                break
 
     # Delete intermediates:
-    del multiplicative_correction, relative_blur, back_projector, convolved, psf
+    del previous, update, previous_update
 
     # Clips output:
     if clip_output:
@@ -1,7 +1,117 @@
+from functools import partial
+
+import numpy
+import pytest
+from skimage import data
+from skimage.color import rgb2gray
+
+from dexp.processing.denoising.butterworth import (
+    _apply_butterworth,
+    _apply_butterworth_batch,
+    _setup_butterworth_denoiser,
+    calibrate_denoise_butterworth,
+)
 from dexp.processing.denoising.demo.demo_2D_butterworth import _demo_butterworth
+from dexp.processing.denoising.j_invariance import calibrate_denoiser
+from dexp.processing.denoising.metrics import psnr
+from dexp.processing.denoising.noise import add_noise
+from dexp.utils.backends import NumpyBackend
 from dexp.utils.testing.testing import execute_both_backends
 
 
 @execute_both_backends
 def test_butterworth():
     assert _demo_butterworth(display=False) >= 0.608 - 0.03
+
+
+def test_butterworth_warm_start():
+    with NumpyBackend():
+        image = rgb2gray(data.astronaut())[::2, ::2]
+        noisy = add_noise(image)
+
+        initial_parameters = dict(freq_cutoff=(0.4, 0.4), order=2.0)
+        function, parameters = calibrate_denoise_butterworth(
+            noisy, optimiser="lbfgs", max_evaluations=200, initial_parameters=initial_parameters
+        )
+        assert len(parameters["freq_cutoff"]) == 2
+        assert all(0.001 <= fc <= 1.0 for fc in parameters["freq_cutoff"])
+        assert 0.5 <= parameters["order"] <= 6.0
+
+        # the local search from the starting point improves over the noisy image:
+        assert psnr(image, numpy.clip(function(noisy, **parameters), 0, 1)) > psnr(image, numpy.clip(noisy, 0, 1))
+
+
+def test_butterworth_batched_calibration():
+    with NumpyBackend():
+        image = rgb2gray(data.astronaut())[::4, ::4].astype(numpy.float32)
+        noisy = add_noise(image).astype(numpy.float32)
+        spectrum = _setup_butterworth_denoiser(noisy, axes=None, padding=8)
+
+        freq_cutoffs = [(0.2, 0.3), (0.5, 0.5), (0.9, 0.1)]
+        orders = [1.0, 2.5, 4.0]
+        batch = _apply_butterworth_batch(spectrum, None, freq_cutoffs, orders, noisy.shape)
+        assert batch.shape == (3,) + noisy.shape
+        for denoised, freq_cutoff, order in zip(batch, freq_cutoffs, orders):
+            expected = _apply_butterworth(spectrum, None, freq_cutoff, order, noisy.shape)
+            assert numpy.allclose(denoised, expected, atol=1e-5)
+
+        def _denoise(data, freq_cutoff, order):
+            return _apply_butterworth(data, None, (freq_cutoff, freq_cutoff), order, noisy.shape)
+
+        def _batch_denoise(data, parameters):
+            return _apply_butterworth_batch(
+                data, None, [(p["freq_cutoff"],) * 2 for p in parameters], [p["order"] for p in parameters], noisy.shape
+            )
+
+        ranges = {"freq_cutoff": (0.1, 1.0, 0.1), "order": (1.0, 5.0, 1.0)}
+        setup = partial(_setup_butterworth_denoiser, axes=None, padding=8)
+        for mode in ("bruteforce", "shgo+lbfgs"):
+            parameters = calibrate_denoiser(noisy, _denoise, ranges, setup, mode=mode, max_evaluations=64)
+            batched_parameters = calibrate_denoiser(
+                noisy, _denoise, ranges, setup, mode=mode, max_evaluations=64, batch_denoise_function=_batch_denoise
+            )
+            for name in ranges:
+                assert batched_parameters[name] == pytest.approx(parameters[name], abs=0.05)
+
+
+def test_batched_calibration_without_shgo_workers(monkeypatch):
+    from dexp.processing.denoising import j_invariance
+
+    shgo = j_invariance.shgo
+
+    # scipy < 1.11: shgo has no 'workers' argument
+    def _shgo(
+        func,
+        bounds,
+        args=(),
+        constraints=None,
+        n=100,
+        iters=1,
+        callback=None,
+        minimizer_kwargs=None,
+        options=None,
+        sampling_method="simplicial",
+    ):
+        return shgo(func, bounds, n=n, iters=iters, options=options, sampling_method=sampling_method)
+
+    monkeypatch.setattr(j_invariance, "shgo", _shgo)
+
+    with NumpyBackend():
+        image = rgb2gray(data.astronaut())[::4, ::4].astype(numpy.float32)
+        noisy = add_noise(image).astype(numpy.float32)
+
+        def _denoise(data, freq_cutoff, order):
+            return _apply_butterworth(data, None, (freq_cutoff, freq_cutoff), order, noisy.shape)
+
+        def _batch_denoise(data, parameters):
+            return _apply_butterworth_batch(
+                data, None, [(p["freq_cutoff"],) * 2 for p in parameters], [p["order"] for p in parameters], noisy.shape
+            )
+
+        ranges = {"freq_cutoff": (0.1, 1.0, 0.1), "order": (1.0, 5.0, 1.0)}
+        setup = partial(_setup_butterworth_denoiser, axes=None, padding=8)
+        parameters = calibrate_denoiser(
+            noisy, _denoise, ranges, setup, mode="shgo", max_evaluations=64, batch_denoise_function=_batch_denoise
+        )
+        assert 0.1 <= parameters["freq_cutoff"] <= 1.0
+        assert 1.0 <= parameters["order"] <= 5.0
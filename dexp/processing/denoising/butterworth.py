@@ -10,6 +10,9 @@ from dexp.utils import dict_or, xpArray
 from dexp.utils.backends import Backend, CupyBackend
 from dexp.utils.backends.cupy_backend import is_cupy_available
 
+# Memory used by the batched spectra when calibrating, in bytes:
+_BATCH_MEMORY = 2**30
+
 try:
     import cupyx
 
@@ -33,6 +36,10 @@ def calibrate_denoise_butterworth(
     max_order: float = 6.0,
     num_order: int = 32,
     crop_size_in_voxels: Optional[int] = 256**3,
+    optimiser: str = "shgo+lbfgs",
+    max_evaluations: int = 1000,
+    initial_parameters: Optional[dict] = None,
+    max_batch_size: int = 16,
     display: bool = False,
     **other_fixed_parameters,
 ):
@@ -87,6 +94,25 @@ def calibrate_denoise_butterworth(
         Number of voxels for crop used to calibrate denoiser.
         (advanced)
 
+    optimiser: str
+        Optimisation mode of the calibration, see 'calibrate_denoiser', e.g. 'lbfgs'
+        for a local search warm-started from initial_parameters.
+        (advanced)
+
+    max_evaluations: int
+        Maximum number of evaluations of the J-invariance loss per optimiser.
+        (advanced)
+
+    initial_parameters: Optional[dict]
+        Starting point of the calibration, as returned by a previous calibration
+        (e.g. of the previous time point), by default the middle of the parameter ranges.
+        (advanced)
+
+    max_batch_size: int
+        Maximal number of parameter sets whose J-invariance loss is evaluated at once,
+        with one batched inverse FFT. Also bounded by memory.
+        (advanced)
+
     display_images: bool
         When True the denoised images encountered during optimisation are shown.
         (advanced)
@@ -128,24 +154,19 @@ def calibrate_denoise_butterworth(
     )
 
     if mode == "isotropic":
-        # Partial function:
-        _denoise_butterworth = partial(_apply_butterworth, **other_fixed_parameters, out_shape=crop.shape)
+        # Parameter impedance match:
+        def _freq_cutoff(kwargs):
+            return (kwargs.pop("freq_cutoff"),) * image.ndim
 
         # Parameters to test when calibrating the denoising algorithm
         parameter_ranges = {"freq_cutoff": freq_cutoff_range, "order": order_range}
 
     elif mode == "xy-z" and image.ndim == 3:
-        # Partial function with parameter impedance match:
-        def _denoise_butterworth(*args, **kwargs):
+        # Parameter impedance match:
+        def _freq_cutoff(kwargs):
             freq_cutoff_xy = kwargs.pop("freq_cutoff_xy")
             freq_cutoff_z = kwargs.pop("freq_cutoff_z")
-            _freq_cutoff = (freq_cutoff_xy, freq_cutoff_xy, freq_cutoff_z)
-            return _apply_butterworth(
-                *args,
-                freq_cutoff=_freq_cutoff,
-                out_shape=crop.shape,
-                **dict_or(kwargs, other_fixed_parameters),
-            )
+            return (freq_cutoff_xy, freq_cutoff_xy, freq_cutoff_z)
 
         # Parameters to test when calibrating the denoising algorithm
         parameter_ranges = {
@@ -155,15 +176,9 @@ def calibrate_denoise_butterworth(
         }
 
     elif mode == "full":
-        # Partial function with parameter impedance match:
-        def _denoise_butterworth(*args, **kwargs):
-            _freq_cutoff = tuple(kwargs.pop(f"freq_cutoff_{i}") for i in range(image.ndim))
-            return _apply_butterworth(
-                *args,
-                out_shape=crop.shape,
-                freq_cutoff=_freq_cutoff,
-                **dict_or(kwargs, other_fixed_parameters),
-            )
+        # Parameter impedance match:
+        def _freq_cutoff(kwargs):
+            return tuple(kwargs.pop(f"freq_cutoff_{i}") for i in range(image.ndim))
 
         # Parameters to test when calibrating the denoising algorithm
         parameter_ranges = {f"freq_cutoff_{i}": freq_cutoff_range for i in range(image.ndim)}
@@ -172,6 +187,35 @@ def calibrate_denoise_butterworth(
     else:
         raise ValueError(f"Unsupported denoising mode: {mode}")
 
+    def _denoise_butterworth(*args, **kwargs):
+        _freq_cutoff_ = _freq_cutoff(kwargs)
+        return _apply_butterworth(
+            *args,
+            out_shape=crop.shape,
+            freq_cutoff=_freq_cutoff_,
+            **dict_or(kwargs, other_fixed_parameters),
+        )
+
+    # Batched version, all parameter sets are filtered from the same spectrum and transformed back at once:
+    def _batch_denoise_butterworth(data, parameters):
+        parameters = [dict(kwargs) for kwargs in parameters]
+        freq_cutoffs = [_freq_cutoff(kwargs) for kwargs in parameters]
+        return _apply_butterworth_batch(
+            data,
+            freq_cutoffs=freq_cutoffs,
+            orders=[kwargs.pop("order") for kwargs in parameters],
+            out_shape=crop.shape,
+            **other_fixed_parameters,
+        )
+
+    # Number of parameter sets per batch, bounded by the memory of the batched spectra:
+    padded_shape = [s + (2 * padding if axes is None or a in axes else 0) for a, s in enumerate(crop.shape)]
+    padded_size = int(np.prod(padded_shape, dtype=np.int64))
+    batch_size = int(min(max_batch_size, max(1, _BATCH_MEMORY // (padded_size * 16))))
+
+    if initial_parameters is not None:
+        initial_parameters = _to_search_parameters(initial_parameters, mode, image.ndim)
+
     # Calibrate denoiser
     best_parameters = dict_or(
         calibrate_denoiser(
@@ -179,9 +223,12 @@ def calibrate_denoise_butterworth(
             _denoise_butterworth,
             denoise_parameters=parameter_ranges,
             setup_function=partial(_setup_butterworth_denoiser, axes=axes, padding=padding),
-            mode="shgo+lbfgs",
-            max_evaluations=1000,
+            mode=optimiser,
+            max_evaluations=max_evaluations,
             display=display,
+            initial_parameters=initial_parameters,
+            batch_denoise_function=_batch_denoise_butterworth,
+            batch_size=batch_size,
         ),
         other_fixed_parameters,
     )
@@ -207,6 +254,21 @@ def calibrate_denoise_butterworth(
     return denoise_butterworth, best_parameters
 
 
+def _to_search_parameters(parameters: dict, mode: str, ndim: int) -> dict:
+    """Converts parameters returned by 'calibrate_denoise_butterworth' to the parameters searched in a given mode."""
+    freq_cutoff = parameters["freq_cutoff"]
+    if mode == "isotropic":
+        search_parameters = {"freq_cutoff": float(np.mean(freq_cutoff))}
+    elif mode == "xy-z":
+        search_parameters = {"freq_cutoff_xy": freq_cutoff[1], "freq_cutoff_z": freq_cutoff[0]}
+    else:
+        if not isinstance(freq_cutoff, Iterable):
+            freq_cutoff = (freq_cutoff,) * ndim
+        search_parameters = {f"freq_cutoff_{i}": fc for i, fc in enumerate(freq_cutoff)}
+    search_parameters["order"] = parameters["order"]
+    return search_parameters
+
+
 def denoise_butterworth(
     image,
     axes: Optional[Tuple[int, ...]] = None,
@@ -309,6 +371,63 @@ def _apply_butterworth(
     return denoised
 
 
+def _apply_butterworth_batch(
+    data: Tuple[xpArray, Sequence[xpArray]],
+    axes: Optional[Sequence[int]],
+    freq_cutoffs: Sequence[Tuple[float]],
+    orders: Sequence[float],
+    out_shape: Tuple[int],
+) -> xpArray:
+    """
+    Applies several butterworth filters to the same pre computed image in the freq. domain,
+    the filtered images are transformed back to real space with a single batched inverse FFT.
+
+    Parameters
+    ----------
+    data : Tuple[xpArray, Sequence[xpArray]]
+        Image in the freq. domain and a grid for each axes.
+    axes : Optional[Sequence[int]]
+        Axes selected for filtering
+    freq_cutoffs : Sequence[Tuple[float]]
+        Freq. cutoff parameter of each filter.
+    orders : Sequence[float]
+        Butterworth order parameter of each filter.
+    out_shape : Tuple[int]
+        Original image input shape, used to crop the data after the inverse FFT.
+
+    Returns
+    -------
+    xpArray
+        Butterworth filtered images, stacked along a first batch axis.
+    """
+    image_f, grid = data
+    xp = Backend.get_xp_module(image_f)
+
+    if axes is None:
+        axes = tuple(range(image_f.ndim))
+    batch_axes = tuple(a + 1 for a in axes)
+
+    # Squared distances scaled by each cutoff, evaluated on the grid for the whole batch:
+    freq_cutoffs = xp.asarray(freq_cutoffs, dtype=xp.float32).reshape((len(freq_cutoffs), -1) + (1,) * image_f.ndim)
+    dist = xp.zeros((len(orders),) + image_f.shape, dtype=xp.float32)
+    for i, axis in enumerate(grid):
+        dist += xp.square(axis[xp.newaxis] / freq_cutoffs[:, i])
+
+    # Apply filters:
+    orders = xp.asarray(orders, dtype=xp.float32).reshape((len(orders),) + (1,) * image_f.ndim)
+    images_f = _butterworth_filter(image_f[xp.newaxis], dist, orders)
+    del dist
+
+    # Shift back:
+    images_f = np.fft.ifftshift(images_f, axes=batch_axes)
+
+    # Back in real space, one batched transform:
+    denoised = np.real(np.fft.ifftn(images_f, axes=batch_axes))
+
+    # Crop to remove padding:
+    return _centered(denoised, (len(orders),) + tuple(out_shape))
+
+
 def _setup_butterworth_denoiser(
     image: xpArray, axes: Optional[Tuple[int, ...]], padding: int
 ) -> Tuple[xpArray, xpArray]:
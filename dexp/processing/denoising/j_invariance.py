@@ -1,7 +1,8 @@
+import inspect
 import itertools
 import math
 from functools import partial
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 
 import numpy as np
 from arbol import aprint, asection
@@ -22,6 +23,9 @@ def calibrate_denoiser(
     stride: int = 4,
     loss_function: Callable = mean_squared_error,
     display: bool = False,
+    initial_parameters: Optional[Dict[str, float]] = None,
+    batch_denoise_function: Optional[Callable[[Any, List[Dict[str, Any]]], Sequence[xpArray]]] = None,
+    batch_size: int = 16,
     **other_fixed_parameters,
 ):
     """
@@ -59,6 +63,15 @@ def calibrate_denoiser(
     display_images: bool
         If True the denoised images for each parameter tested are displayed.
         this _will_ be slow.
+    initial_parameters: dict, optional
+        Starting point of the 'shgo' and 'lbfgs' searches, e.g. the optimum found for a similar image,
+        by default the middle of the parameter ranges.
+    batch_denoise_function: Callable, optional
+        Batched version of the denoising function: takes the denoising input and a list of parameter dictionaries,
+        and returns the denoised images of all parameter sets at once (e.g. from a shared spectrum).
+        When given, the brute-force grid, the SHGO samples and the L-BFGS finite differences are evaluated in batches.
+    batch_size: int
+        Maximal number of parameter sets per call of the batched denoising function.
     other_fixed_parameters: dict
         Other fixed parameters to pass to the denoiser function.
 
@@ -77,6 +90,8 @@ def calibrate_denoiser(
 
     # Pass fixed parameters:
     denoise_function = partial(denoise_function, **other_fixed_parameters)
+    if batch_denoise_function is not None:
+        batch_denoise_function = partial(batch_denoise_function, **other_fixed_parameters)
 
     with asection(f"Calibrating denoiser with method: {mode}"):
         best_parameters = _calibrate_denoiser_search(
@@ -89,6 +104,9 @@ def calibrate_denoiser(
             stride=stride,
             loss_function=loss_function,
             display_images=display,
+            initial_parameters=initial_parameters,
+            batch_denoise_function=batch_denoise_function,
+            batch_size=batch_size,
         )
 
     aprint(f"Best parameters are: {best_parameters}")
@@ -153,6 +171,9 @@ def _calibrate_denoiser_search(
     stride=4,
     loss_function: Callable = mean_squared_error,  # _structural_loss, #
     display_images: bool = False,
+    initial_parameters: Optional[Dict[str, float]] = None,
+    batch_denoise_function: Optional[Callable[[Any, List[Dict[str, Any]]], Sequence[xpArray]]] = None,
+    batch_size: int = 16,
 ):
     """Return a parameter search history with losses for a denoise function.
 
@@ -177,6 +198,12 @@ def _calibrate_denoiser_search(
         Loss function to use
     display : bool
         When True the resulting images are displayed with napari
+    initial_parameters : dict, optional
+        Starting point of the 'shgo' and 'lbfgs' searches, by default the middle of the parameter ranges.
+    batch_denoise_function : Callable, optional
+        Batched version of `denoise_function`, see `calibrate_denoiser`.
+    batch_size : int
+        Maximal number of parameter sets per call of `batch_denoise_function`.
 
     Returns
     -------
@@ -201,8 +228,8 @@ def _calibrate_denoiser_search(
     # Parameter names:
     parameter_names = list(denoise_parameters.keys())
 
-    # Best parameters (to be found):
-    best_parameters = None
+    # Best parameters (to be found), possibly warm-started:
+    best_parameters = None if initial_parameters is None else dict(initial_parameters)
 
     # Setting up denoising
     if setup_function is not None:
@@ -210,10 +237,7 @@ def _calibrate_denoiser_search(
     else:
         denoising_input = masked_image
 
-    # Function to optimise:
-    def _loss_func(**_denoiser_kwargs):
-        # We compute the J-inv loss:
-        denoised = denoise_function(denoising_input, **_denoiser_kwargs)
+    def _j_inv_loss(denoised: xpArray) -> float:
         loss = loss_function(denoised[mask], image[mask])
 
         if math.isnan(loss) or math.isinf(loss):
@@ -221,7 +245,13 @@ def _calibrate_denoiser_search(
 
         aprint(f"J-inv loss is: {loss}")
 
-        loss = Backend.to_numpy(loss)
+        return Backend.to_numpy(loss)
+
+    # Function to optimise:
+    def _loss_func(**_denoiser_kwargs):
+        # We compute the J-inv loss:
+        denoised = denoise_function(denoising_input, **_denoiser_kwargs)
+        loss = _j_inv_loss(denoised)
 
         if display_images and not (math.isnan(loss) or math.isinf(loss)):
             denoised = denoise_function(image, **_denoiser_kwargs)
@@ -229,7 +259,17 @@ def _calibrate_denoiser_search(
 
         return -float(loss)
 
-    best_parameters = None
+    # Batched evaluation of the function to optimise, when a batched denoising function is available:
+    batched = batch_denoise_function is not None and not display_images
+
+    def _loss_funcs(denoiser_kwargs_list: List[Dict[str, Any]]) -> List[float]:
+        if not batched:
+            return [_loss_func(**denoiser_kwargs) for denoiser_kwargs in denoiser_kwargs_list]
+        losses = []
+        for start in range(0, len(denoiser_kwargs_list), batch_size):
+            batch = denoiser_kwargs_list[start : start + batch_size]
+            losses += [-float(_j_inv_loss(denoised)) for denoised in batch_denoise_function(denoising_input, batch)]
+        return losses
 
     if "bruteforce" in mode:
         with asection(f"Searching by brute-force for the best denoising parameters among: {denoise_parameters}"):
@@ -241,12 +281,12 @@ def _calibrate_denoiser_search(
                 expanded_denoise_parameters = {n: np.arange(*r) for (n, r) in denoise_parameters.items()}
                 # Generate all possible combinations:
                 cartesian_product_of_parameters = list(_product_from_dict(expanded_denoise_parameters))
-                for denoiser_kwargs in cartesian_product_of_parameters:
-                    with asection(f"computing J-inv loss for: {denoiser_kwargs}"):
-                        loss = _loss_func(**denoiser_kwargs)
-                        if loss > best_loss:
-                            best_loss = loss
-                            best_parameters = denoiser_kwargs
+                with asection(f"computing J-inv loss for {len(cartesian_product_of_parameters)} parameter sets"):
+                    losses = _loss_funcs(cartesian_product_of_parameters)
+                for denoiser_kwargs, loss in zip(cartesian_product_of_parameters, losses):
+                    if loss > best_loss:
+                        best_loss = loss
+                        best_parameters = denoiser_kwargs
 
     if "shgo" in mode:
         with asection(
@@ -266,7 +306,24 @@ def _calibrate_denoiser_search(
                 value = -_loss_func(**param_dict)
                 return value
 
-            result = shgo(_func, bounds, sampling_method="sobol", options={"maxev": max_evaluations})
+            # The points sampled by SHGO are evaluated in batches through its 'workers' map (scipy>=1.11),
+            # older versions of scipy evaluate them sequentially:
+            def _map(_, points):
+                points = list(points)
+                param_dicts = [{n: v for (n, v) in zip(parameter_names, tuple(x))} for x in points]
+                return [-loss for loss in _loss_funcs(param_dicts)]
+
+            shgo_kwargs = {}
+            if batched and "workers" in inspect.signature(shgo).parameters:
+                shgo_kwargs["workers"] = _map
+
+            result = shgo(
+                _func,
+                bounds,
+                sampling_method="sobol",
+                options={"maxev": max_evaluations},
+                **shgo_kwargs,
+            )
             aprint(result)
             best_parameters = dict({n: v for (n, v) in zip(parameter_names, result.x)})
 
@@ -286,13 +343,33 @@ def _calibrate_denoiser_search(
                 value = -_loss_func(**param_dict)
                 return value
 
-            result = minimize(
-                fun=_func,
-                x0=x0,
-                method="L-BFGS-B",
-                bounds=bounds,
-                options=dict(maxfun=max_evaluations, eps=1e-2, ftol=1e-9, gtol=1e-9),
-            )
+            eps = 1e-2
+
+            # Value and forward-difference gradient evaluated in one batch, steps are reversed at upper bounds:
+            def _func_and_grad(x):
+                steps = np.array([eps if x_i + eps <= b[1] else -eps for x_i, b in zip(x, bounds)])
+                points = [x] + [x + step * unit for step, unit in zip(steps, np.eye(len(x)))]
+                param_dicts = [{n: v for (n, v) in zip(parameter_names, tuple(p))} for p in points]
+                values = -np.asarray(_loss_funcs(param_dicts))
+                return values[0], (values[1:] - values[0]) / steps
+
+            if batched:
+                result = minimize(
+                    fun=_func_and_grad,
+                    x0=x0,
+                    jac=True,
+                    method="L-BFGS-B",
+                    bounds=bounds,
+                    options=dict(maxfun=max(1, max_evaluations // (len(x0) + 1)), ftol=1e-9, gtol=1e-9),
+                )
+            else:
+                result = minimize(
+                    fun=_func,
+                    x0=x0,
+                    method="L-BFGS-B",
+                    bounds=bounds,
+                    options=dict(maxfun=max_evaluations, eps=eps, ftol=1e-9, gtol=1e-9),
+                )
             aprint(result)
             best_parameters = dict({n: v for (n, v) in zip(parameter_names, result.x)})
 
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy
+from scipy.ndimage import map_coordinates, spline_filter
+
+from dexp.utils.config import inner_threads
+
+# Address modes of the warp function, and the equivalent scipy.ndimage modes (linear interpolation included):
+_MODES = {"clamp": "nearest", "border": "grid-constant", "wrap": "grid-wrap", "mirror": "reflect"}
+
+
+def _vector_field_coordinates(length: int, field_length: int, upsampling: int) -> numpy.ndarray:
+    """
+    Returns the coordinates in the (not upsampled) vector field of each voxel along one axis.
+    They match sampling the upsampled vector field as a normalised-coordinates linear texture clamped at its edges,
+    as done by the CUDA kernels, composed with the coordinate mapping of 'scipy.ndimage.zoom'.
+    """
+    upsampled_length = int(round(field_length * upsampling))
+    coordinates = numpy.arange(length, dtype=numpy.float32) * (upsampled_length / length) - 0.5
+    coordinates = numpy.clip(coordinates, 0, upsampled_length - 1)
+    if upsampled_length > 1:
+        coordinates *= (field_length - 1) / (upsampled_length - 1)
+    return coordinates
+
+
+def _warp_nd_numpy(
+    image: numpy.ndarray,
+    vector_field: numpy.ndarray,
+    mode: str,
+    vector_field_upsampling: int = 1,
+    vector_field_upsampling_order: int = 1,
+    nb_threads: Optional[int] = None,
+    tile_size: int = 2**20,
+) -> numpy.ndarray:
+    """
+    Warps an image with linear interpolation on the CPU, for any dimension.
+    The image is processed by tiles (slabs along the first axis) in a pool of threads, scipy releases the GIL.
+    The vector field is upsampled on the fly within each tile, the upsampled vector field is never materialized.
+
+    Parameters
+    ----------
+    image : image to warp.
+    vector_field : vector field, of shape (..., image.ndim), or of one dimension for 1D images.
+    mode : address mode: 'clamp', 'border', 'wrap', or 'mirror'.
+    vector_field_upsampling : upsampling factor of the vector field.
+    vector_field_upsampling_order : interpolation order of the vector field upsampling.
+    nb_threads : number of threads, by default the number of threads of the thread budget.
+    tile_size : approximate number of voxels per tile.
+
+    Returns
+    -------
+    Warped image
+    """
+    if mode not in _MODES:
+        raise ValueError(f"Address mode '{mode}' is not supported")
+
+    if vector_field.ndim == image.ndim:
+        vector_field = vector_field[..., numpy.newaxis]
+    if vector_field.ndim != image.ndim + 1 or vector_field.shape[-1] != image.ndim:
+        raise ValueError("image or vector field has wrong number of dimensions!")
+
+    if nb_threads is None:
+        nb_threads = inner_threads()
+
+    order = vector_field_upsampling_order if vector_field_upsampling != 1 else 1
+    field_coordinates = [
+        _vector_field_coordinates(length, field_length, vector_field_upsampling)
+        for length, field_length in zip(image.shape, vector_field.shape[:-1])
+    ]
+    # spline coefficients of each vector component are computed once, and not for each tile:
+    if order > 1:
+        vector_components = [spline_filter(vector_field[..., i], order=order, mode="mirror") for i in range(image.ndim)]
+    else:
+        vector_components = [vector_field[..., i] for i in range(image.ndim)]
+
+    warped_image = numpy.empty_like(image)
+
+    slab_size = max(1, int(numpy.prod(image.shape[1:], dtype=numpy.int64)))
+    tile_length = max(1, tile_size // slab_size)
+
+    def _warp_tile(start: int) -> None:
+        stop = min(start + tile_length, image.shape[0])
+        tile_field_coordinates = [field_coordinates[0][start:stop]] + field_coordinates[1:]
+        grid = numpy.meshgrid(*tile_field_coordinates, indexing="ij")
+        indices = numpy.meshgrid(
+            numpy.arange(start, stop, dtype=numpy.float32),
+            *(numpy.arange(length, dtype=numpy.float32) for length in image.shape[1:]),
+            indexing="ij",
+        )
+
+        # coordinates of the source voxels: voxel coordinates minus the interpolated vectors
+        coordinates = numpy.empty((image.ndim,) + indices[0].shape, dtype=numpy.float32)
+        for i, component in enumerate(vector_components):
+            map_coordinates(component, grid, output=coordinates[i], order=order, mode="mirror", prefilter=False)
+            numpy.subtract(indices[i], coordinates[i], out=coordinates[i])
+        del grid, indices
+
+        map_coordinates(
+            image, coordinates, output=warped_image[start:stop], order=1, mode=_MODES[mode], cval=0, prefilter=False
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executor:
+        list(executor.map(_warp_tile, range(0, image.shape[0], tile_length)))
+
+    return warped_image
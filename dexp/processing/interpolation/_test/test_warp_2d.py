@@ -1,13 +1,15 @@
 import numpy
+from scipy.ndimage import zoom
 from skimage.data import camera
 
 from dexp.processing.interpolation.warp import warp
-from dexp.utils.backends import Backend, CupyBackend
+from dexp.utils.backends import Backend, CupyBackend, NumpyBackend
 from dexp.utils.timeit import timeit
 
-# def test_warp_2d_numpy():
-#     backend = NumpyBackend()
-#     _test_warp_2d(backend)
+
+def test_warp_2d_numpy():
+    with NumpyBackend():
+        _test_warp_2d()
 
 
 def test_warp_2d_cupy():
@@ -48,3 +50,27 @@ def _test_warp_2d(grid_size=8):
     #     viewer.add_image(_c(dewarped), name='dewarped')
 
     assert error < 0.03
+
+
+def test_warp_2d_numpy_modes():
+    image = numpy.random.uniform(size=(64, 48)).astype(numpy.float32)
+    vector_field = numpy.asarray([3, -5], dtype=numpy.float32)[numpy.newaxis, numpy.newaxis]
+
+    with NumpyBackend():
+        shifted = warp(image, vector_field, mode="wrap")
+        assert numpy.allclose(shifted, numpy.roll(image, (3, -5), axis=(0, 1)))
+
+        shifted = warp(image, vector_field, mode="clamp")
+        assert numpy.allclose(shifted[3:, :-5], image[:-3, 5:])
+        assert numpy.allclose(shifted[:3, :-5], image[:1, 5:])
+
+        shifted = warp(image, vector_field, mode="border")
+        assert numpy.allclose(shifted[3:, :-5], image[:-3, 5:])
+        assert numpy.all(shifted[:3] == 0) and numpy.all(shifted[:, -5:] == 0)
+
+        # the vector field upsampled on the fly matches the materialized upsampled vector field:
+        vector_field = numpy.random.uniform(low=-3, high=3, size=(6, 5, 2)).astype(numpy.float32)
+        upsampled = zoom(vector_field, zoom=(4, 4, 1), order=3)
+        warped = warp(image, vector_field, vector_field_upsampling=4, vector_field_upsampling_order=3)
+        warped_upsampled = warp(image, upsampled, vector_field_upsampling=1)
+        assert numpy.mean(numpy.abs(warped - warped_upsampled)) < 0.02
@@ -2,10 +2,15 @@ import numpy
 
 from dexp.datasets.synthetic_datasets import generate_nuclei_background_data
 from dexp.processing.interpolation.warp import warp
-from dexp.utils.backends import Backend, CupyBackend
+from dexp.utils.backends import Backend, CupyBackend, NumpyBackend
 from dexp.utils.timeit import timeit
 
 
+def test_warp_3d_numpy():
+    with NumpyBackend():
+        _test_warp_3d(length_xy=96)
+
+
 def test_warp_3d_cupy():
     try:
         with CupyBackend():
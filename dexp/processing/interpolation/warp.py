@@ -29,7 +29,8 @@ def warp(
 
     vector_field_upsampling : upsampling factor for teh vector field (best use a power of two)
 
-    vector_field_upsampling_order : upsampling order: 0-> nearest, 1->linear, 2->quadratic, ... (uses scipy zoom)
+    vector_field_upsampling_order : upsampling order: 0-> nearest, 1->linear, 2->quadratic, ... (uses scipy zoom,
+        the numpy backend upsamples the vector field on the fly instead)
 
     mode : How to handle warping that reaches outside of the image bounds,
         can be: 'clamp', 'border', 'wrap', 'mirror'
@@ -56,6 +57,21 @@ def warp(
 
     original_dtype = image.dtype
 
+    if type(Backend.current()) is NumpyBackend:
+        # multithreaded CPU engine, the vector field is upsampled on the fly:
+        from dexp.processing.interpolation._numpy.warp_nd import _warp_nd_numpy
+
+        image = Backend.to_numpy(image).astype(dtype=internal_dtype, copy=False)
+        vector_field = Backend.to_numpy(vector_field, dtype=internal_dtype)
+        result = _warp_nd_numpy(
+            image,
+            vector_field,
+            mode,
+            vector_field_upsampling=vector_field_upsampling,
+            vector_field_upsampling_order=vector_field_upsampling_order,
+        )
+        return result.astype(original_dtype, copy=False)
+
     if vector_field_upsampling != 1:
         # Note: unfortunately numpy does support float16 zooming, and cupy does not support high-order zooming...
         vector_field = Backend.to_numpy(vector_field, dtype=numpy.float32)
@@ -74,10 +90,7 @@ def warp(
 
     from dexp.utils.backends import CupyBackend
 
-    if type(Backend.current()) is NumpyBackend:
-        raise NotImplementedError("Warping not yet implemented for the Numpy backend.")
-
-    elif type(Backend.current()) is CupyBackend:
+    if type(Backend.current()) is CupyBackend:
 
         params = (image, vector_field, mode)
         if image.ndim == 1:
@@ -20,6 +20,7 @@ from dexp.processing.registration.translation_nd_proj import (
 from dexp.processing.remove_beads import remove_beads_by_threshold
 from dexp.processing.restoration.clean_dark_regions import clean_dark_regions
 from dexp.processing.restoration.dehazing import dehaze
+from dexp.processing.utils.subtract_and_clip import subtract_and_clip
 from dexp.utils import xpArray
 from dexp.utils.backends import Backend
 
@@ -84,22 +85,27 @@ class SimViewFusion(BaseFusion):
     def _preprocess_single_view(self, view: xpArray, camera: int, lightsheet: int, flip: bool) -> xpArray:
         xp = Backend.get_xp_module()
 
-        with asection(
-            f"Moving C{camera}L{lightsheet} and to backend storage and converting to {self._internal_dtype} ..."
-        ):
-            view = Backend.to_backend(view, dtype=self._internal_dtype, force_copy=False)
+        with asection(f"Moving C{camera}L{lightsheet} to backend storage ..."):
+            view = Backend.to_backend(view, force_copy=False)
 
-        if self._zero_level != 0:
-            view = xp.clip(view, self._zero_level, None)
-            view -= self._zero_level
+        # the per-voxel operations are fused in single passes, and so is the flip when no filter follows it:
+        max_level = self._clip_too_high if self._clip_too_high > 0 else None
+        filtered = (self._dehaze_size > 0 and self._dehaze_before_fusion) or self._white_top_hat_size > 0
+        flip_axis = -1 if flip and not filtered else None
 
         if self._remove_beads:
+            view = subtract_and_clip(view, self._zero_level, dtype=self._internal_dtype)
             with asection(f"Removing beads of C{camera}L{lightsheet}"):
                 view = remove_beads_by_threshold(view)
-
-        if self._clip_too_high > 0:
-            with asection(f"Clipping intensities above {self._clip_too_high} for C{camera}L{lightsheet}"):
-                xp.clip(view, a_min=0, a_max=self._clip_too_high, out=view)
+            view = subtract_and_clip(view, max_level=max_level, flip_axis=flip_axis)
+        else:
+            with asection(
+                f"Converting C{camera}L{lightsheet} to {self._internal_dtype}, removing zero level {self._zero_level}"
+                + f" and clipping intensities above {max_level} ..."
+            ):
+                view = subtract_and_clip(
+                    view, self._zero_level, max_level=max_level, dtype=self._internal_dtype, flip_axis=flip_axis
+                )
 
         if self._dehaze_size > 0 and self._dehaze_before_fusion:
             with asection(f"Dehaze C{camera}L{lightsheet} ..."):
@@ -109,8 +115,8 @@ class SimViewFusion(BaseFusion):
             with asection(f"Filtering with White Top Hat transform C{camera}L{lightsheet} ..."):
                 view = self._filtered_white_top_hat(view)
 
-        if flip:
-            view = xp.flip(view, -1).copy()
+        if flip and filtered:
+            view = xp.ascontiguousarray(xp.flip(view, -1))
 
         return view
 
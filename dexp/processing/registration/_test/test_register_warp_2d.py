@@ -1,10 +1,10 @@
 from dexp.processing.registration.demo.demo_warp_2d import _register_warp_2d
-from dexp.utils.backends import Backend, CupyBackend
+from dexp.utils.backends import Backend, CupyBackend, NumpyBackend
 
-# TODO: implement numpy version of warp.
-# def test_register_warp_nD_numpy():
-#     backend = NumpyBackend()
-#     register_warp_nD(backend)
+
+def test_register_warp_2d_numpy():
+    with NumpyBackend():
+        register_warp_2d()
 
 
 def test_register_warp_2d_cupy():
@@ -1,12 +1,12 @@
 from arbol import aprint
 
 from dexp.processing.registration.demo.demo_warp_3d import _register_warp_3d
-from dexp.utils.backends import Backend, CupyBackend
+from dexp.utils.backends import Backend, CupyBackend, NumpyBackend
 
-# TODO: implement numpy version of warp.
-# def test_register_warp_nD_numpy():
-#     backend = NumpyBackend()
-#     register_warp_nD(backend)
+
+def test_register_warp_3d_numpy():
+    with NumpyBackend():
+        register_warp_3d()
 
 
 def test_register_warp_3d_cupy():
@@ -0,0 +1,32 @@
+import pytest
+
+from dexp.processing.registration.translation_nd_proj import (
+    register_translation_proj_nd,
+    register_translation_proj_nd_spectra,
+    registration_spectra_proj_nd,
+)
+from dexp.utils.backends import Backend
+from dexp.utils.testing.testing import execute_both_backends
+
+
+@execute_both_backends
+@pytest.mark.parametrize("shape, shift", [((96, 81), (3, -5)), ((48, 64, 57), (2, -4, 5))])
+def test_register_translation_spectra(shape, shift):
+    xp = Backend.get_xp_module()
+    sp = Backend.get_sp_module()
+
+    xp.random.seed(0)
+    image_a = sp.ndimage.gaussian_filter(xp.random.uniform(0, 1, size=shape).astype(xp.float32), sigma=3)
+    image_b = sp.ndimage.shift(image_a, shift=shift)
+
+    kwargs = dict(sigma=3, edge_filter=False, denoise_input_sigma=1)
+
+    model = register_translation_proj_nd(image_a.copy(), image_b.copy(), **kwargs)
+
+    spectra_a = registration_spectra_proj_nd(image_a, **kwargs)
+    spectra_b = registration_spectra_proj_nd(image_b, **kwargs)
+    spectra_model = register_translation_proj_nd_spectra(spectra_a, spectra_b, **kwargs)
+
+    assert len(spectra_a) == (1 if len(shape) == 2 else 3)
+    assert xp.allclose(model.shift_vector, spectra_model.shift_vector)
+    assert model.confidence == pytest.approx(spectra_model.confidence)
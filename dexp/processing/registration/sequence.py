@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import dask
 import numpy
@@ -12,13 +12,17 @@ from dexp.processing.registration.model.sequence_registration_model import (
 from dexp.processing.registration.model.translation_registration_model import (
     TranslationRegistrationModel,
 )
+from dexp.processing.registration.translation_2d import register_translation_2d_dexp
 from dexp.processing.registration.translation_nd_proj import (
     register_translation_proj_nd,
+    register_translation_proj_nd_spectra,
+    registration_spectra_proj_nd,
 )
 from dexp.processing.utils.center_of_mass import center_of_mass
 from dexp.processing.utils.linear_solver import linsolve
 from dexp.utils import xpArray
 from dexp.utils.backends import Backend, NumpyBackend
+from dexp.utils.cache import LRUCache
 
 
 def image_stabilisation(
@@ -39,6 +43,7 @@ def image_stabilisation(
     debug_output: str = None,
     workers: int = 1,
     internal_dtype=None,
+    cache_size: int = int(2e9),
     **kwargs,
 ) -> SequenceRegistrationModel:
     """
@@ -61,6 +66,8 @@ def image_stabilisation(
     alpha_reg: multiplicative coefficient for regularisation term.
     detrend: removes linear detrend from stabilized image.
     internal_dtype : internal dtype for computation
+    cache_size: memory budget, in bytes, for caching the preprocessed spectra of each image across pairwise
+        registrations, set to zero to disable.
     **kwargs: argument passthrough to the pairwise registration method, see 'register_translation_nd'.
 
     Returns
@@ -106,35 +113,58 @@ def image_stabilisation(
 
         with asection(f"Computing pairwise registrations for {len(uv_set)} (u,v) pairs..."):
 
-            def _compute_model(pair: Tuple[int, int]) -> Optional[TranslationRegistrationModel]:
-                u, v = pair
+            def _get_image(index: int) -> xpArray:
                 if image_sequence:
-                    image_u = image_sequence[u]
-                    image_v = image_sequence[v]
+                    return image_sequence[index]
                 elif isinstance(image, Array):
-                    image_u = dask.array.take(image, u, axis=axis)
-                    image_v = dask.array.take(image, v, axis=axis)
+                    return dask.array.take(image, index, axis=axis)
                 else:
-                    image_u = xp.take(image, u, axis=axis)
-                    image_v = xp.take(image, v, axis=axis)
+                    return xp.take(image, index, axis=axis)
+
+            # The preprocessing and forward FFTs only depend on each image, so when using the default
+            # registration method we cache the spectra of each image and reuse them across pairs:
+            get_spectra = None
+            register_translation_2d = kwargs.get("register_translation_2d", register_translation_2d_dexp)
+            if mode == "translation" and cache_size > 0 and register_translation_2d is register_translation_2d_dexp:
+                cache = LRUCache(max_nbytes=cache_size)
+
+                def _get_cached_spectra(index: int) -> List[xpArray]:
+                    return cache.get_or_compute(
+                        index,
+                        lambda: registration_spectra_proj_nd(
+                            Backend.to_backend(_get_image(index), dtype=internal_dtype), **kwargs
+                        ),
+                    )
+
+                get_spectra = _get_cached_spectra
+
+            def _compute_model(pair: Tuple[int, int]) -> Optional[TranslationRegistrationModel]:
+                u, v = pair
                 model = _pairwise_registration(
                     u,
                     v,
-                    image_u,
-                    image_v,
+                    _get_image,
                     mode,
                     min_confidence,
                     enable_com,
                     quantile,
                     bounding_box,
                     internal_dtype,
+                    get_spectra=get_spectra,
                     **kwargs,
                 )
                 return model
 
-            pairwise_models = Parallel(n_jobs=workers)(delayed(_compute_model)(pair) for pair in uv_set)
+            # Pairs are sorted by their last time point so that images are accessed within a sliding window:
+            uv_list = sorted(uv_set, key=lambda pair: (pair[1], pair[0]))
+            pairwise_models = Parallel(n_jobs=workers, backend="threading")(
+                delayed(_compute_model)(pair) for pair in uv_list
+            )
             pairwise_models = [model for model in pairwise_models if model is not None]
 
+            if get_spectra is not None:
+                aprint(f"Spectra cache: {cache}")
+
         nb_models = len(pairwise_models)
         aprint(f"Number of models obtained: {nb_models} for a sequence of length:{length}")
 
@@ -172,56 +202,69 @@ def image_stabilisation(
                     for model in translation_models:
                         model.count = 0
 
-                    for d in range(ndim):
+                    # Each pairwise registration defines a constraint: x[u] - x[v] = shift[u, v],
+                    # and the last row forces the solution to have no displacement for the first time point.
+                    # The system is assembled directly in sparse (COO) format, with two non-zeros per row,
+                    # since all dimensions share the same matrix we only build it once:
+                    rows = numpy.empty((2 * nb_models + 1,), dtype=numpy.int64)
+                    cols = numpy.empty((2 * nb_models + 1,), dtype=numpy.int64)
+                    values = numpy.empty((2 * nb_models + 1,), dtype=numpy.float32)
+                    shift_vectors = numpy.zeros((nb_models + 1, ndim), dtype=numpy.float32)
+
+                    for tp, model in enumerate(pairwise_models):
+                        u = model.u
+                        v = model.v
+                        confidence = model.overall_confidence()
+
+                        rows[2 * tp : 2 * tp + 2] = tp
+                        cols[2 * tp] = u
+                        cols[2 * tp + 1] = v
+                        values[2 * tp] = +1
+                        values[2 * tp + 1] = -1
+                        shift_vectors[tp] = model.shift_vector
+
+                        # For each time point we collect the average confidence of all the pairwise_registrations:
+                        translation_models[u].confidence += confidence
+                        translation_models[u].count += 1
+                        translation_models[v].confidence += confidence
+                        translation_models[v].count += 1
+
+                    rows[-1] = nb_models
+                    cols[-1] = 0
+                    values[-1] = 1
+
+                    # we make sure that all shifts are relative to the first pairwise registration:
+                    if nb_models > 0:
+                        shift_vectors[:nb_models] -= shift_vectors[0]
+
+                    a = sp.sparse.coo_matrix((values, (rows, cols)), shape=(nb_models + 1, length)).tocsr()
+
+                    # average confidences:
+                    for tp in range(length):
+                        translation_models[tp].confidence /= translation_models[tp].count
 
-                        # instantiates system to solve with zeros:
-                        a = xp.zeros((nb_models + 1, length), dtype=xp.float32)
-                        y = xp.zeros((nb_models + 1,), dtype=xp.float32)
-
-                        # iterates through all pairwise registrations:
-                        zero_vector = None
-                        for tp, model in enumerate(pairwise_models):
-                            u = model.u
-                            v = model.v
-                            confidence = model.overall_confidence()
-
-                            if tp == 0:
-                                # we make sure that all shifts are relative to the first timepoint:
-                                zero_vector = model.shift_vector[d].copy()
-
-                            vector = model.shift_vector[d] - zero_vector
-
-                            # Each pairwise registration defines a constraint that is added to the matrix:
-                            y[tp] = vector.copy()
-                            a[tp, u] = +1
-                            a[tp, v] = -1
-
-                            # For each time point we collect the average confidence of all the pairwise_registrations:
-                            translation_models[u].confidence += confidence
-                            translation_models[u].count += 1
-                            translation_models[v].confidence += confidence
-                            translation_models[v].count += 1
-
-                        # Forces solution to have no displacement for first time point:
-                        y[-1] = 0
-                        a[-1, 0] = 1
+                    for d in range(ndim):
 
-                        # move matrix to sparse domain (much faster!):
-                        a = sp.sparse.coo_matrix(a)
+                        y = shift_vectors[:, d]
 
                         # solve system:
                         x_opt = linsolve(
-                            a, y, tolerance=tolerance, order_error=order_error, order_reg=order_reg, alpha_reg=alpha_reg
+                            a,
+                            y,
+                            tolerance=tolerance,
+                            order_error=order_error,
+                            order_reg=order_reg,
+                            alpha_reg=alpha_reg,
+                            l2_init=order_error == 2,
                         )
 
                         # detrend:
                         if detrend:
                             x_opt = sp.signal.detrend(x_opt)
 
-                        # sets the shift vectors for the resulting sequence reg model, and compute average confidences:
+                        # sets the shift vectors for the resulting sequence reg model:
                         for tp in range(length):
                             translation_models[tp].shift_vector[d] = -x_opt[tp]
-                            translation_models[tp].confidence /= translation_models[tp].count
 
                     model = SequenceRegistrationModel(model_list=translation_models)
 
@@ -248,19 +291,33 @@ def image_stabilisation(
 
 
 def _pairwise_registration(
-    u, v, image_u, image_v, mode, min_confidence, enable_com, quantile, bounding_box, internal_dtype, **kwargs
+    u: int,
+    v: int,
+    get_image: Callable[[int], xpArray],
+    mode: str,
+    min_confidence: float,
+    enable_com: bool,
+    quantile: float,
+    bounding_box: bool,
+    internal_dtype,
+    get_spectra: Optional[Callable[[int], List[xpArray]]] = None,
+    **kwargs,
 ):
-    image_u = Backend.to_backend(image_u, dtype=internal_dtype)
-    image_v = Backend.to_backend(image_v, dtype=internal_dtype)
-
     if mode == "translation":
-        model = register_translation_proj_nd(image_u, image_v, _display_phase_correlation=False, **kwargs)
+        if get_spectra is None:
+            image_u = Backend.to_backend(get_image(u), dtype=internal_dtype)
+            image_v = Backend.to_backend(get_image(v), dtype=internal_dtype)
+            model = register_translation_proj_nd(image_u, image_v, _display_phase_correlation=False, **kwargs)
+        else:
+            model = register_translation_proj_nd_spectra(get_spectra(u), get_spectra(v), **kwargs)
         model.u = u
         model.v = v
         confidence = model.overall_confidence()
 
         if confidence < min_confidence:
             if enable_com:
+                image_u = Backend.to_backend(get_image(u), dtype=internal_dtype)
+                image_v = Backend.to_backend(get_image(v), dtype=internal_dtype)
                 offset_mode = f"p={quantile * 100}"
                 com_u = center_of_mass(
                     image_u, mode="full", projection_type="max-min", offset_mode=offset_mode, bounding_box=bounding_box
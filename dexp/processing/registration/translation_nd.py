@@ -1,4 +1,5 @@
 from functools import reduce
+from typing import Tuple
 
 import numpy
 from arbol import aprint
@@ -57,7 +58,6 @@ def register_translation_nd(
 
     """
     xp = Backend.get_xp_module()
-    sp = Backend.get_sp_module()
 
     if not image_a.dtype == image_b.dtype:
         raise ValueError("Arrays must have the same dtype")
@@ -68,28 +68,154 @@ def register_translation_nd(
     if type(Backend.current()) is NumpyBackend:
         internal_dtype = xp.float32
 
-    image_a = Backend.to_backend(image_a, dtype=internal_dtype)
-    image_b = Backend.to_backend(image_b, dtype=internal_dtype)
+    image_a = _preprocess_image(image_a, denoise_input_sigma, gamma, log_compression, edge_filter, internal_dtype)
+    image_b = _preprocess_image(image_b, denoise_input_sigma, gamma, log_compression, edge_filter, internal_dtype)
+
+    # Compute the phase correlation:
+    raw_correlation = _phase_correlation(image_a, image_b, internal_dtype)
+
+    shift_vector, confidence, correlation, masked_correlation = _find_correlation_peak(
+        raw_correlation, max_range_ratio=max_range_ratio, decimate=decimate, quantile=quantile, sigma=sigma
+    )
+
+    if _display_phase_correlation:
+        # DO NOT DELETE, INSTRUMENTATION CODE FOR DEBUGGING
+        from napari import Viewer, gui_qt
+
+        with gui_qt():
+            aprint(f"shift = {shift_vector}, confidence = {confidence} ")
+
+            def _c(array):
+                return Backend.to_numpy(array)
+
+            viewer = Viewer()
+            viewer.add_image(_c(image_a), name="image_a")
+            viewer.add_image(_c(image_b), name="image_b")
+            viewer.add_image(_c(raw_correlation), name="raw_correlation", colormap="viridis")
+            viewer.add_image(_c(correlation), name="correlation", colormap="viridis")
+            viewer.add_image(
+                _c(masked_correlation), name="masked_correlation", colormap="bop orange", blending="additive"
+            )
+            viewer.grid.enabled = True
+            viewer.grid.shape = (2, 3)
+
+    return TranslationRegistrationModel(shift_vector=shift_vector, confidence=confidence, force_numpy=force_numpy)
+
+
+def registration_spectrum_nd(
+    image: xpArray,
+    denoise_input_sigma: float = 1.5,
+    gamma: float = 1,
+    log_compression: bool = True,
+    edge_filter: bool = True,
+    internal_dtype=None,
+    **kwargs,
+) -> xpArray:
+    """
+    Preprocesses an image and computes its Fourier spectrum exactly as done by 'register_translation_nd'.
+    The spectrum only depends on the image itself, it can therefore be computed once
+    and reused for several pairwise registrations with 'register_translation_spectra_nd'.
+
+    Parameters
+    ----------
+    image : Image to compute the spectrum of
+    denoise_input_sigma : Uses a Gaussian filter to denoise input image.
+    gamma : gamma correction as a preprocessing before phase correlation.
+    log_compression : Applies the function log1p to the image to compress high-intensities.
+    edge_filter : apply sobel edge filter to input image.
+    internal_dtype : internal dtype for computation
+    kwargs : registration parameters that are not relevant for preprocessing, ignored.
+
+    Returns
+    -------
+    Complex spectrum of preprocessed image
+    """
+    xp = Backend.get_xp_module()
+
+    if internal_dtype is None:
+        internal_dtype = image.dtype
+
+    if type(Backend.current()) is NumpyBackend:
+        internal_dtype = xp.float32
+
+    image = _preprocess_image(image, denoise_input_sigma, gamma, log_compression, edge_filter, internal_dtype)
+
+    return _spectrum(image)
+
+
+def register_translation_spectra_nd(
+    spectrum_a: xpArray,
+    spectrum_b: xpArray,
+    max_range_ratio: float = 0.9,
+    decimate: int = 16,
+    quantile: float = 0.999,
+    sigma: float = 1.5,
+    force_numpy: bool = False,
+    internal_dtype=None,
+    **kwargs,
+) -> TranslationRegistrationModel:
+    """
+    Registers two nD images given their spectra as computed by 'registration_spectrum_nd'.
+    This gives the same result as 'register_translation_nd' but only requires one inverse FFT per pair.
+
+    Parameters
+    ----------
+    spectrum_a : Spectrum of first image to register
+    spectrum_b : Spectrum of second image to register
+    max_range_ratio : maximal range for correlation.
+    decimate : How much to decimate when computing floor level
+    quantile : Quantile to use for robust min and max
+    sigma : sigma for Gaussian smoothing of phase correlogram
+    force_numpy : Forces output model to be allocated with numpy arrays.
+    internal_dtype : internal dtype for computation
+    kwargs : preprocessing parameters already applied when computing the spectra, ignored.
+
+    Returns
+    -------
+    Translation-only registration model
+    """
+    xp = Backend.get_xp_module()
+
+    if internal_dtype is None or type(Backend.current()) is NumpyBackend:
+        internal_dtype = xp.float32
+
+    raw_correlation = _phase_correlation_spectra(spectrum_a, spectrum_b, internal_dtype)
+
+    shift_vector, confidence, _, _ = _find_correlation_peak(
+        raw_correlation, max_range_ratio=max_range_ratio, decimate=decimate, quantile=quantile, sigma=sigma
+    )
+
+    return TranslationRegistrationModel(shift_vector=shift_vector, confidence=confidence, force_numpy=force_numpy)
+
+
+def _preprocess_image(
+    image: xpArray, denoise_input_sigma: float, gamma: float, log_compression: bool, edge_filter: bool, internal_dtype
+) -> xpArray:
+    xp = Backend.get_xp_module()
+    sp = Backend.get_sp_module()
+
+    image = Backend.to_backend(image, dtype=internal_dtype)
 
     if denoise_input_sigma is not None and denoise_input_sigma > 0:
-        image_a = sp.ndimage.gaussian_filter(image_a, sigma=denoise_input_sigma)
-        image_b = sp.ndimage.gaussian_filter(image_b, sigma=denoise_input_sigma)
+        image = sp.ndimage.gaussian_filter(image, sigma=denoise_input_sigma)
 
     if log_compression is not None and log_compression:
-        image_a = xp.log1p(image_a)
-        image_b = xp.log1p(image_b)
+        image = xp.log1p(image)
 
     if gamma is not None and gamma != 1:
-        image_a **= gamma
-        image_b **= gamma
+        image **= gamma
 
     if edge_filter is not None and edge_filter:
-        image_a = sobel_filter(image_a, exponent=1, normalise_input=False)
-        image_b = sobel_filter(image_b, exponent=1, normalise_input=False)
+        image = sobel_filter(image, exponent=1, normalise_input=False)
+
+    return image
 
-    # Compute the phase correlation:
-    raw_correlation = _phase_correlation(image_a, image_b, internal_dtype)
-    correlation = raw_correlation
+
+def _find_correlation_peak(
+    correlation: xpArray, max_range_ratio: float, decimate: int, quantile: float, sigma: float
+) -> Tuple[xpArray, xpArray, xpArray, xpArray]:
+    xp = Backend.get_xp_module()
+    sp = Backend.get_sp_module()
 
     # Max range is computed from max_range_ratio:
     max_ranges = tuple(int(0.5 * max_range_ratio * s) for s in correlation.shape)
@@ -132,28 +258,7 @@ def register_translation_nd(
     epsilon = 1e-6
     confidence = (max_correlation - background_correlation_max) / (epsilon + max_correlation)
 
-    if _display_phase_correlation:
-        # DO NOT DELETE, INSTRUMENTATION CODE FOR DEBUGGING
-        from napari import Viewer, gui_qt
-
-        with gui_qt():
-            aprint(f"shift = {shift_vector}, confidence = {confidence} ")
-
-            def _c(array):
-                return Backend.to_numpy(array)
-
-            viewer = Viewer()
-            viewer.add_image(_c(image_a), name="image_a")
-            viewer.add_image(_c(image_b), name="image_b")
-            viewer.add_image(_c(raw_correlation), name="raw_correlation", colormap="viridis")
-            viewer.add_image(_c(correlation), name="correlation", colormap="viridis")
-            viewer.add_image(
-                _c(masked_correlation), name="masked_correlation", colormap="bop orange", blending="additive"
-            )
-            viewer.grid.enabled = True
-            viewer.grid.shape = (2, 3)
-
-    return TranslationRegistrationModel(shift_vector=shift_vector, confidence=confidence, force_numpy=force_numpy)
+    return shift_vector, confidence, correlation, masked_correlation
 
 
 def _center_of_mass(image):
@@ -182,18 +287,26 @@ def _center_of_mass(image):
 
 
 def _phase_correlation(image_a, image_b, internal_dtype=numpy.float32, epsilon: float = 1e-6, window: float = 0.5):
-    xp = Backend.get_xp_module(image_a)
+    G_a = _spectrum(image_a, window=window)
+    G_b = _spectrum(image_b, window=window)
+    return _phase_correlation_spectra(G_a, G_b, internal_dtype=internal_dtype, epsilon=epsilon)
+
+
+def _spectrum(image, window: float = 0.5):
+    xp = Backend.get_xp_module(image)
 
     if window > 0:
-        window_axis = tuple(xp.hanning(s) ** window for s in image_a.shape)
+        window_axis = tuple(xp.hanning(s) ** window for s in image.shape)
         window = reduce(xp.multiply, xp.ix_(*window_axis))
-        image_a *= window
-        image_b *= window
+        image *= window
+
+    return xp.fft.fftn(image).astype(numpy.complex64, copy=False)
+
+
+def _phase_correlation_spectra(G_a, G_b, internal_dtype=numpy.float32, epsilon: float = 1e-6):
+    xp = Backend.get_xp_module(G_a)
 
-    G_a = xp.fft.fftn(image_a).astype(numpy.complex64, copy=False)
-    G_b = xp.fft.fftn(image_b).astype(numpy.complex64, copy=False)
-    conj_b = xp.conj(G_b)
-    R = G_a * conj_b
+    R = G_a * xp.conj(G_b)
     R /= xp.absolute(R) + epsilon
     r = xp.fft.ifftn(R).real.astype(internal_dtype, copy=False)
     r = xp.fft.fftshift(r)
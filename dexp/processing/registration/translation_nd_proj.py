@@ -1,9 +1,13 @@
-from typing import Callable
+from typing import Callable, List, Sequence, Tuple
 
 from dexp.processing.registration.model.translation_registration_model import (
     TranslationRegistrationModel,
 )
 from dexp.processing.registration.translation_2d import register_translation_2d_dexp
+from dexp.processing.registration.translation_nd import (
+    register_translation_spectra_nd,
+    registration_spectrum_nd,
+)
 from dexp.utils import xpArray
 from dexp.utils.backends import Backend
 
@@ -75,32 +79,9 @@ def register_translation_proj_nd(
             iap2, ibp2, force_numpy=force_numpy, internal_dtype=internal_dtype, **kwargs
         ).get_shift_and_confidence()
 
-        # print(shifts_p0)
-        # print(shifts_p1)
-        # print(shifts_p2)
-
-        if drop_worse:
-            worse_index = xp.argmin(xp.asarray([confidence_p0, confidence_p1, confidence_p2]))
-
-            if worse_index == 0:
-                shifts = xp.asarray([0.5 * (shifts_p1[0] + shifts_p2[0]), shifts_p2[1], shifts_p1[1]])
-                confidence = (confidence_p1 * confidence_p2) ** 0.5
-            elif worse_index == 1:
-                shifts = xp.asarray([shifts_p2[0], 0.5 * (shifts_p0[0] + shifts_p2[1]), shifts_p0[1]])
-                confidence = (confidence_p0 * confidence_p2) ** 0.5
-            elif worse_index == 2:
-                shifts = xp.asarray([shifts_p1[0], shifts_p0[0], 0.5 * (shifts_p0[1] + shifts_p1[1])])
-                confidence = (confidence_p0 * confidence_p1) ** 0.5
-
-        else:
-            shifts_p0 = xp.asarray([0, shifts_p0[0], shifts_p0[1]])
-            shifts_p1 = xp.asarray([shifts_p1[0], 0, shifts_p1[1]])
-            shifts_p2 = xp.asarray([shifts_p2[0], shifts_p2[1], 0])
-            shifts = (shifts_p0 + shifts_p1 + shifts_p2) / 2
-            confidence = (confidence_p0 * confidence_p1 * confidence_p2) ** 0.33
-
-        # if confidence>0.1:
-        #     print(f"shift={shifts}, confidence={confidence}")
+        shifts, confidence = _combine_projection_shifts(
+            (shifts_p0, confidence_p0), (shifts_p1, confidence_p1), (shifts_p2, confidence_p2), drop_worse=drop_worse
+        )
 
         # from napari import Viewer, gui_qt
         # with gui_qt():
@@ -122,6 +103,122 @@ def register_translation_proj_nd(
     return model
 
 
+def registration_spectra_proj_nd(image: xpArray, internal_dtype=None, **kwargs) -> List[xpArray]:
+    """
+    Computes the spectra of the preprocessed projections of an image, exactly as done by 'register_translation_proj_nd'
+    with the default 2D registration method. The spectra only depend on the image itself, they can therefore be
+    computed once and reused for several pairwise registrations with 'register_translation_proj_nd_spectra'.
+
+    Parameters
+    ----------
+    image : Image to compute the projection spectra of
+    internal_dtype : Internal dtype for computation
+    kwargs : argument passthrough to 'registration_spectrum_nd'
+
+    Returns
+    -------
+    List of spectra, one for 2D images and one per projection axis for 3D images.
+    """
+    xp = Backend.get_xp_module()
+
+    image = Backend.to_backend(image)
+
+    if image.ndim == 2:
+        images = (_preprocess_image(image, in_place=False, dtype=internal_dtype),)
+    elif image.ndim == 3:
+        images = tuple(_project_preprocess_image(image, axis=axis, dtype=xp.float32) for axis in range(3))
+    else:
+        raise ValueError(f"Unsupported number of dimensions ({image.ndim}) for registration.")
+
+    return list(registration_spectrum_nd(image, internal_dtype=internal_dtype, **kwargs) for image in images)
+
+
+def register_translation_proj_nd_spectra(
+    spectra_a: Sequence[xpArray],
+    spectra_b: Sequence[xpArray],
+    drop_worse: bool = True,
+    force_numpy: bool = False,
+    internal_dtype=None,
+    **kwargs,
+) -> TranslationRegistrationModel:
+    """
+    Registers two nD (n=2 or 3) images given their projection spectra as computed by 'registration_spectra_proj_nd'.
+    This gives the same result as 'register_translation_proj_nd' with the default 2D registration method.
+
+    Parameters
+    ----------
+    spectra_a : Projection spectra of first image to register
+    spectra_b : Projection spectra of second image to register
+    drop_worse: drops the worst 2D registrations before combining the projection
+        registration vectors to a full nD registration vector.
+    force_numpy : Forces output model to be allocated with numpy arrays.
+    internal_dtype : Internal dtype for computation
+    kwargs : argument passthrough to 'register_translation_spectra_nd'
+
+    Returns
+    -------
+    Translation-only registration model
+    """
+    if len(spectra_a) != len(spectra_b):
+        raise ValueError("Images must have the same number of dimensions")
+
+    results = tuple(
+        register_translation_spectra_nd(
+            spectrum_a, spectrum_b, force_numpy=force_numpy, internal_dtype=internal_dtype, **kwargs
+        ).get_shift_and_confidence()
+        for spectrum_a, spectrum_b in zip(spectra_a, spectra_b)
+    )
+
+    if len(results) == 1:
+        shifts, confidence = results[0]
+    else:
+        shifts, confidence = _combine_projection_shifts(*results, drop_worse=drop_worse)
+
+    return TranslationRegistrationModel(shift_vector=shifts, confidence=confidence, force_numpy=force_numpy)
+
+
+def _combine_projection_shifts(
+    result_p0: Tuple[xpArray, float],
+    result_p1: Tuple[xpArray, float],
+    result_p2: Tuple[xpArray, float],
+    drop_worse: bool,
+) -> Tuple[xpArray, float]:
+    xp = Backend.get_xp_module()
+
+    shifts_p0, confidence_p0 = result_p0
+    shifts_p1, confidence_p1 = result_p1
+    shifts_p2, confidence_p2 = result_p2
+
+    # print(shifts_p0)
+    # print(shifts_p1)
+    # print(shifts_p2)
+
+    if drop_worse:
+        worse_index = xp.argmin(xp.asarray([confidence_p0, confidence_p1, confidence_p2]))
+
+        if worse_index == 0:
+            shifts = xp.asarray([0.5 * (shifts_p1[0] + shifts_p2[0]), shifts_p2[1], shifts_p1[1]])
+            confidence = (confidence_p1 * confidence_p2) ** 0.5
+        elif worse_index == 1:
+            shifts = xp.asarray([shifts_p2[0], 0.5 * (shifts_p0[0] + shifts_p2[1]), shifts_p0[1]])
+            confidence = (confidence_p0 * confidence_p2) ** 0.5
+        elif worse_index == 2:
+            shifts = xp.asarray([shifts_p1[0], shifts_p0[0], 0.5 * (shifts_p0[1] + shifts_p1[1])])
+            confidence = (confidence_p0 * confidence_p1) ** 0.5
+
+    else:
+        shifts_p0 = xp.asarray([0, shifts_p0[0], shifts_p0[1]])
+        shifts_p1 = xp.asarray([shifts_p1[0], 0, shifts_p1[1]])
+        shifts_p2 = xp.asarray([shifts_p2[0], shifts_p2[1], 0])
+        shifts = (shifts_p0 + shifts_p1 + shifts_p2) / 2
+        confidence = (confidence_p0 * confidence_p1 * confidence_p2) ** 0.33
+
+    # if confidence>0.1:
+    #     print(f"shift={shifts}, confidence={confidence}")
+
+    return shifts, confidence
+
+
 def _project_preprocess_image(
     image, axis: int, smoothing: float = 0, quantile: int = None, gamma: float = 1, dtype=None
 ):
@@ -35,3 +35,54 @@ def _run_solver(w=37, h=41, noise=1e-2, **kwargs):
     aprint(f"error : {xp.absolute(x - x_gt)} ")
 
     return mean_abs_error
+
+
+@execute_both_backends
+def test_linear_solver_sparse_l2() -> None:
+    xp = Backend.get_xp_module()
+    sp = Backend.get_sp_module()
+
+    xp.random.seed(42)
+
+    # chain of pairwise differences anchored at zero, as in sequence stabilisation:
+    length = 1000
+    x_gt = xp.cumsum(xp.random.rand(length) - 0.5)
+    x_gt -= x_gt[0]
+    rows = xp.concatenate([xp.arange(length - 1), xp.arange(length - 1), xp.asarray([length - 1])])
+    cols = xp.concatenate([xp.arange(length - 1), xp.arange(1, length), xp.asarray([0])])
+    values = xp.concatenate([xp.ones(length - 1), -xp.ones(length - 1), xp.ones(1)])
+    a = sp.sparse.coo_matrix((values, (rows, cols)), shape=(length, length)).tocsr()
+    y_obs = a @ x_gt
+
+    x = linsolve(a, y_obs, order_error=2, alpha_reg=0, tolerance=1e-9)
+    error = xp.mean(xp.absolute(x - x_gt)).item()
+
+    aprint(f"Error = {error}")
+    assert error < 1e-3
+
+
+@execute_both_backends
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("l2_init", [False, True])
+def test_linear_solver_overdetermined_l2(sparse: bool, l2_init: bool) -> None:
+    xp = Backend.get_xp_module()
+    sp = Backend.get_sp_module()
+
+    xp.random.seed(42)
+
+    # more equations than unknowns, as in sequence stabilisation with l2_init:
+    a = xp.random.rand(60, 20)
+    a *= xp.random.rand(60, 20) > 0.5
+    x_gt = xp.random.rand(20)
+    y_obs = a @ x_gt
+    if sparse:
+        a = sp.sparse.csr_matrix(a)
+
+    if l2_init:
+        x = linsolve(a, y_obs, order_error=1, alpha_reg=0, l2_init=True, tolerance=1e-9)
+    else:
+        x = linsolve(a, y_obs, order_error=2, alpha_reg=0, tolerance=1e-9)
+    error = xp.mean(xp.absolute(x - x_gt)).item()
+
+    aprint(f"Error = {error}")
+    assert error < 1e-3
@@ -0,0 +1,21 @@
+import pytest
+
+from dexp.processing.utils.max_projections import max_projections
+from dexp.utils.backends import Backend
+from dexp.utils.testing.testing import execute_both_backends
+
+
+@execute_both_backends
+@pytest.mark.parametrize("shape, workers", [((37, 41, 43), 1), ((37, 41, 43), 3), ((12, 14, 17, 19), 2), ((5, 6), 1)])
+def test_max_projections(shape, workers):
+    xp = Backend.get_xp_module()
+
+    image = xp.random.rand(*shape).astype(xp.float32)
+
+    # small slabs to make sure that the array is split into many of them:
+    projections = max_projections(image, slab_nbytes=image[0].nbytes * 2, workers=workers)
+
+    assert len(projections) == image.ndim
+    for axis, projection in enumerate(projections):
+        assert projection.dtype == image.dtype
+        assert xp.all(projection == xp.max(image, axis=axis))
@@ -2,8 +2,8 @@ import numpy as np
 from arbol import aprint
 
 from dexp.processing.utils.scatter_gather_i2i import scatter_gather_i2i
-from dexp.utils.backends import Backend
-from dexp.utils.testing.testing import execute_both_backends
+from dexp.utils.backends import Backend, NumpyBackend
+from dexp.utils.testing.testing import cupy_only, execute_both_backends
 from dexp.utils.timeit import timeit
 
 
@@ -35,3 +35,46 @@ def test_scatter_gather_i2i(ndim=3, length_xy=128, splits=4, filter_size=7):
     aprint(f"Error = {error}")
 
     assert error < 0.0001
+
+
+@execute_both_backends
+def test_scatter_gather_i2i_batched(ndim=3, length_xy=96, tile=40, filter_size=5):
+    sp = Backend.get_sp_module()
+    rng = np.random.default_rng()
+
+    image = rng.uniform(0, 1, size=(length_xy,) * ndim).astype(np.float32)
+
+    def f(x):
+        return sp.ndimage.uniform_filter(x, size=filter_size)
+
+    def batched_f(x):
+        # filtering each tile of the batch independently:
+        return sp.ndimage.uniform_filter(x, size=(1,) + (filter_size,) * ndim)
+
+    result_ref = scatter_gather_i2i(image, f, tiles=tile, margins=filter_size // 2)
+    result = scatter_gather_i2i(image, batched_f, tiles=tile, margins=filter_size // 2, batch_size=4)
+
+    assert np.allclose(Backend.to_numpy(result), Backend.to_numpy(result_ref), atol=1e-5)
+
+
+@cupy_only
+def test_scatter_gather_i2i_multi_device(ndim=3, length_xy=96, tile=32, filter_size=5):
+    from dexp.utils.backends import CupyBackend
+
+    devices = list(range(len(CupyBackend.available_devices())))
+    # devices are reused if there is only one, exercising the threaded path anyway:
+    devices = (devices * 2)[:2]
+
+    rng = np.random.default_rng()
+    image = rng.uniform(0, 1, size=(length_xy,) * ndim).astype(np.float32)
+
+    def f(x):
+        sp = Backend.get_sp_module()
+        return sp.ndimage.uniform_filter(x, size=filter_size)
+
+    with NumpyBackend():
+        result_ref = scatter_gather_i2i(image, f, tiles=tile, margins=filter_size // 2)
+
+    result = scatter_gather_i2i(image, f, tiles=tile, margins=filter_size // 2, devices=devices)
+
+    assert np.allclose(result, result_ref, atol=1e-5)
@@ -0,0 +1,38 @@
+import numpy
+import pytest
+
+from dexp.processing.utils.subtract_and_clip import subtract_and_clip
+from dexp.utils.backends import Backend
+from dexp.utils.testing import execute_both_backends
+
+
+@execute_both_backends
+@pytest.mark.parametrize(
+    "zero_level, max_level, dtype, flip_axis",
+    [
+        (100, 3000, numpy.float16, -1),
+        (100, None, numpy.float32, None),
+        (0, 3000, numpy.float16, 0),
+        (0, None, None, 1),
+        (100.0, 3000.0, numpy.uint16, None),
+        (100.0, None, None, -1),
+    ],
+)
+def test_subtract_and_clip(zero_level, max_level, dtype, flip_axis) -> None:
+    xp = Backend.get_xp_module()
+    array = numpy.random.randint(0, 4096, size=(13, 37, 21), dtype=numpy.uint16)
+
+    # reference: the sequence of operations computed in the output dtype
+    expected = array.astype(array.dtype if dtype is None else dtype)
+    if zero_level != 0:
+        expected = numpy.clip(expected, expected.dtype.type(zero_level), None)
+        expected -= expected.dtype.type(zero_level)
+    if max_level is not None:
+        numpy.clip(expected, 0, expected.dtype.type(max_level), out=expected)
+    if flip_axis is not None:
+        expected = numpy.flip(expected, flip_axis)
+
+    result = subtract_and_clip(xp.asarray(array), zero_level, max_level, dtype=dtype, flip_axis=flip_axis, tile_size=64)
+
+    assert result.dtype == expected.dtype
+    assert numpy.array_equal(Backend.to_numpy(result), expected)
@@ -2,6 +2,8 @@ import warnings
 from typing import Optional, Sequence, Tuple
 
 import numpy
+import scipy.sparse
+import scipy.sparse.linalg
 from arbol import aprint
 from scipy.optimize import minimize
 
@@ -24,16 +26,51 @@ def linsolve(
     limited: bool = True,
     verbose: bool = False,
 ) -> xpArray:
+    """
+    Solves the (possibly over-determined) linear system a @ x = y by minimising:
+    beta * ||a @ x - y||_order_error + alpha_reg * alpha * ||x||_order_reg
+
+    The gradient of the objective is computed analytically, which avoids the finite-difference
+    evaluations (one per unknown) that would otherwise dominate for large systems.
+    In the pure least-squares case (order_error=2 and alpha_reg=0) the system is solved directly
+    with a sparse least-squares solver.
+
+    Parameters
+    ----------
+    a : system matrix, can be dense or sparse (scipy.sparse or cupyx.scipy.sparse).
+    y : observation vector.
+    x0 : initial solution, if None the zero vector is used (or the least-squares solution if l2_init is True).
+    maxiter : maximal number of iterations.
+    maxfun : maximal number of function evaluations.
+    tolerance : tolerance for termination.
+    order_error : order of the norm used for the error term.
+    order_reg : order of the norm used for the regularisation term.
+    alpha_reg : multiplicative coefficient for the regularisation term.
+    l2_init : if True, the least-squares solution is used as initial solution.
+    bounds : bounds on the solution, only used when 'limited' is True.
+    limited : if True uses L-BFGS-B, otherwise BFGS.
+    verbose : if True the optimiser displays convergence messages.
+
+    Returns
+    -------
+    Solution vector x
+    """
     xp = Backend.get_xp_module()
 
     a = Backend.to_backend(a)
     y = Backend.to_backend(y)
 
+    if order_error == 2 and alpha_reg == 0 and bounds is None:
+        # plain least-squares problem, no need for iterative minimisation:
+        return _lsqr(a, y, x0=x0, tolerance=tolerance, maxiter=maxiter)
+
     if x0 is None:
         if l2_init:
-            x0 = linsolve(a, y, x0=x0, maxiter=maxiter, tolerance=tolerance, order_error=2, alpha_reg=0, l2_init=False)
+            x0 = Backend.to_numpy(_lsqr(a, y, tolerance=tolerance, maxiter=maxiter))
         else:
             x0 = numpy.zeros(a.shape[1])
+    else:
+        x0 = Backend.to_numpy(x0)
 
     beta = (1.0 / y.shape[0]) ** (1.0 / order_error)
     alpha = (1.0 / x0.shape[0]) ** (1.0 / order_reg)
@@ -50,9 +87,25 @@ def linsolve(
             objective += regularisation_term
         return objective
 
+    def fun_and_grad(x):
+        x = Backend.to_backend(x)
+        residual = a @ x - y
+        norm, grad = _norm_and_grad(residual, order_error)
+        objective = beta * norm
+        gradient = beta * (a.T @ grad)
+        if alpha_reg != 0:
+            norm, grad = _norm_and_grad(x, order_reg)
+            objective += (alpha_reg * alpha) * norm
+            gradient += (alpha_reg * alpha) * grad
+        return objective, Backend.to_numpy(gradient, dtype=numpy.float64)
+
+    # Analytic gradient only for finite norms with order >= 1, otherwise falls back to finite differences:
+    analytic_gradient = all(1 <= order < numpy.inf for order in (order_error, order_reg))
+
     result = minimize(
-        fun,
+        fun_and_grad if analytic_gradient else fun,
         x0,
+        jac=analytic_gradient,
         method="L-BFGS-B" if limited else "BFGS",
         tol=tolerance,
         bounds=bounds if limited else None,
@@ -76,3 +129,40 @@ def linsolve(
         return Backend.to_backend(x0)
 
     return Backend.to_backend(result.x)
+
+
+def _norm_and_grad(vector: xpArray, order: float) -> Tuple[float, xpArray]:
+    """
+    Returns the p-norm of a vector and its gradient: sign(v) * |v|^(p-1) / ||v||_p^(p-1)
+    """
+    xp = Backend.get_xp_module()
+    norm = float(xp.linalg.norm(vector, ord=order))
+    if order == 1:
+        return norm, xp.sign(vector)
+    if norm == 0:
+        return norm, xp.zeros_like(vector)
+    if order == 2:
+        return norm, vector / norm
+    return norm, xp.sign(vector) * (xp.absolute(vector) / norm) ** (order - 1)
+
+
+def _lsqr(
+    a: xpArray, y: xpArray, x0: Optional[xpArray] = None, tolerance: float = 1e-6, maxiter: int = 1e12
+) -> xpArray:
+    """
+    Solves the least-squares problem min ||a @ x - y||_2 with a (sparse) iterative solver.
+    The system is always solved on the CPU with scipy: cupy's lsqr is a direct solver limited to square systems,
+    that ignores tolerances, iteration limits and initial guesses.
+    """
+    if not (isinstance(a, numpy.ndarray) or scipy.sparse.issparse(a)):
+        # cupy arrays and cupyx.scipy.sparse matrices:
+        a = a.get()
+    y = Backend.to_numpy(y)
+    if x0 is not None:
+        x0 = Backend.to_numpy(x0)
+
+    result = scipy.sparse.linalg.lsqr(
+        a, y, atol=tolerance, btol=tolerance, iter_lim=int(min(maxiter, 10 * a.shape[1])), x0=x0
+    )
+
+    return Backend.to_backend(result[0])
@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy
+
+from dexp.utils import xpArray
+from dexp.utils.backends import Backend
+
+
+def max_projections(
+    array: xpArray, slab_nbytes: int = 2**22, workers: Optional[int] = None, internal_dtype=None
+) -> List[xpArray]:
+    """
+    Computes the maximum projections of an array along each of its axes, the i-th projection
+    being the maximum along axis i. The projections are computed with the backend of the given array,
+    so that a stack already on the GPU does not need to be moved to the CPU first.
+
+    For numpy arrays all projections are computed in a single pass over the array: the array is
+    processed in slabs along the first axis small enough to stay in the CPU cache,
+    and slabs are distributed over several threads.
+
+    Parameters
+    ----------
+    array : nD array (n >= 2)
+    slab_nbytes : approximate size in bytes of the slabs processed at once (numpy only).
+    workers : number of threads used for numpy arrays, by default half the number of cores (at most 8).
+    internal_dtype : dtype of the projections, by default the array dtype.
+
+    Returns
+    -------
+    List of projections, one per axis.
+    """
+    xp = Backend.get_xp_module(array)
+
+    if array.ndim < 2:
+        raise ValueError(f"Max projections require at least two dimensions, got {array.ndim}.")
+
+    if internal_dtype is None:
+        internal_dtype = array.dtype
+
+    if xp is not numpy:
+        # On the GPU the memory bandwidth is high enough for each projection to be computed separately:
+        return [xp.max(array, axis=axis).astype(internal_dtype, copy=False) for axis in range(array.ndim)]
+
+    array = numpy.asarray(array)
+    length = array.shape[0]
+    slice_nbytes = max(1, array[0].nbytes)
+    slab_length = max(1, min(length, slab_nbytes // slice_nbytes))
+    slabs = list((start, min(start + slab_length, length)) for start in range(0, length, slab_length))
+
+    if workers is None:
+        workers = max(1, min(8, (os.cpu_count() or 1) // 2))
+    workers = max(1, min(workers, len(slabs)))
+
+    projections = [None] + [
+        numpy.empty(array.shape[:axis] + array.shape[axis + 1 :], dtype=internal_dtype) for axis in range(1, array.ndim)
+    ]
+
+    def _project_slabs(worker: int) -> numpy.ndarray:
+        # maximum along the first axis is accumulated per worker, other projections are written in place:
+        first_axis_max = None
+        for start, stop in slabs[worker::workers]:
+            slab = array[start:stop]
+            for axis in range(1, array.ndim):
+                numpy.max(slab, axis=axis, out=projections[axis][start:stop])
+            if first_axis_max is None:
+                first_axis_max = slab[0].copy()
+            for index in range(slab.shape[0]):
+                numpy.maximum(first_axis_max, slab[index], out=first_axis_max)
+        return first_axis_max
+
+    if workers == 1:
+        partial_maxima = [_project_slabs(0)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            partial_maxima = list(executor.map(_project_slabs, range(workers)))
+
+    first_axis_max = partial_maxima[0]
+    for partial_max in partial_maxima[1:]:
+        numpy.maximum(first_axis_max, partial_max, out=first_axis_max)
+    projections[0] = first_axis_max.astype(internal_dtype, copy=False)
+
+    return projections
@@ -1,11 +1,13 @@
-from typing import Callable, Optional, Sequence, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy
+from arbol import aprint
 
 from dexp.processing.utils.nd_slice import nd_split_slices, remove_margin_slice
 from dexp.processing.utils.normalise import Normalise
 from dexp.utils import xpArray
-from dexp.utils.backends import Backend
+from dexp.utils.backends import Backend, NumpyBackend
 
 
 def scatter_gather_i2i(
@@ -17,6 +19,8 @@ def scatter_gather_i2i(
     clip: bool = False,
     to_numpy: bool = True,
     internal_dtype: Optional[numpy.dtype] = None,
+    batch_size: int = 1,
+    devices: Optional[Sequence[int]] = None,
 ) -> xpArray:
     """
     Image-2-image scatter-gather.
@@ -38,6 +42,14 @@ def scatter_gather_i2i(
     to_numpy : should the result be a numpy array? Very usefull when the compute backend
         cannot hold the whole input and output images in memory.
     internal_dtype : internal dtype for computation
+    batch_size : number of tiles of same shape that are stacked along a new leading axis and processed
+        with a single call to the function, which must then support a leading batch axis.
+        With a cupy backend and a numpy input image, batches are transferred through pinned host buffers
+        and CUDA streams so that host-device transfers overlap with compute.
+    devices : CUDA device ids (e.g. as returned by 'parse_devices') to distribute the tiles on,
+        one worker thread per device, each within its own CupyBackend context and memory pool.
+        The input is kept in host memory and the result is gathered into a numpy array, thus to_numpy must be True.
+        If None, all tiles are processed with the current backend.
 
     Returns
     -------
@@ -60,13 +72,22 @@ def scatter_gather_i2i(
     if type(margins) == int:
         margins = (margins,) * image.ndim
 
+    if devices is not None and not to_numpy:
+        raise ValueError("Multi-device scatter-gather requires to_numpy=True.")
+
     if to_numpy:
         result = numpy.empty(shape=image.shape, dtype=internal_dtype)
     else:
         result = Backend.get_xp_module(image).empty_like(image, dtype=internal_dtype)
 
     # Normalise:
-    norm = Normalise(Backend.to_backend(image), do_normalise=normalise, clip=clip, quantile=0.005)
+    if devices is None:
+        norm = Normalise(Backend.to_backend(image), do_normalise=normalise, clip=clip, quantile=0.005)
+    else:
+        # the image may not fit on a single device, normalisation parameters are computed on the CPU:
+        image = Backend.to_numpy(image)
+        with NumpyBackend():
+            norm = Normalise(image, do_normalise=normalise, clip=clip, quantile=0.005)
 
     # image shape:
     shape = image.shape
@@ -81,7 +102,11 @@ def scatter_gather_i2i(
     # Number of tiles:
     number_of_tiles = len(tile_slices)
 
-    if number_of_tiles == 1:
+    if devices is not None:
+        _multi_device_scatter_gather(
+            norm, function, image, internal_dtype, result, shape, list(slices), batch_size, devices
+        )
+    elif number_of_tiles == 1:
         # If there is only one tile, let's not be complicated about it:
         result = norm.backward(function(norm.forward(image)))
         if to_numpy:
@@ -90,7 +115,7 @@ def scatter_gather_i2i(
             result = Backend.to_backend(result, dtype=internal_dtype)
     else:
         _scatter_gather_loop(
-            norm.backward, function, image, internal_dtype, norm.forward, result, shape, slices, to_numpy
+            norm.backward, function, image, internal_dtype, norm.forward, result, shape, slices, to_numpy, batch_size
         )
 
     return result
@@ -106,8 +131,17 @@ def _scatter_gather_loop(
     shape: Tuple[int, ...],
     slices: Sequence[Tuple[slice, ...]],
     to_numpy: bool,
+    batch_size: int = 1,
 ) -> None:
 
+    if batch_size > 1:
+        batches = _batch_slices(slices, batch_size)
+        if to_numpy and isinstance(image, numpy.ndarray) and _is_cupy_backend():
+            _streamed_batch_loop(denorm_fun, function, image, internal_dtype, norm_fun, result, shape, batches)
+        else:
+            _batch_loop(denorm_fun, function, image, internal_dtype, norm_fun, result, shape, batches, to_numpy)
+        return
+
     for tile_slice, tile_slice_no_margins in slices:
         image_tile = image[tile_slice]
         image_tile = Backend.to_backend(image_tile, dtype=internal_dtype)
@@ -123,6 +157,207 @@ def _scatter_gather_loop(
         result[tile_slice_no_margins] = image_tile
 
 
+def _multi_device_scatter_gather(
+    norm: Normalise,
+    function: Callable,
+    image: numpy.ndarray,
+    internal_dtype: numpy.dtype,
+    result: numpy.ndarray,
+    shape: Tuple[int, ...],
+    slices: Sequence[Tuple[Tuple[slice, ...], Tuple[slice, ...]]],
+    batch_size: int,
+    devices: Sequence[int],
+) -> None:
+    """
+    Distributes the tiles over several CUDA devices, tiles are interleaved so that each device gets
+    the same number of tiles of each shape. Each worker writes into disjoint regions of the shared numpy result.
+    """
+    from dexp.utils.backends import CupyBackend
+
+    devices = list(devices)[: len(slices)]
+    aprint(f"Scatter-gather of {len(slices)} tiles over devices: {devices}")
+
+    def _worker(index: int) -> None:
+        with CupyBackend(devices[index]):
+            # normalisation parameters must live on the worker's device:
+            device_norm = Normalise(
+                image,
+                do_normalise=norm.do_normalise,
+                clip=norm.clip,
+                minmax=None if not norm.do_normalise else (float(norm.min_value), float(norm.max_value)),
+            )
+            _scatter_gather_loop(
+                device_norm.backward,
+                function,
+                image,
+                internal_dtype,
+                device_norm.forward,
+                result,
+                shape,
+                slices[index :: len(devices)],
+                True,
+                batch_size,
+            )
+
+    with ThreadPoolExecutor(max_workers=len(devices), thread_name_prefix="scatter-gather") as executor:
+        for future in [executor.submit(_worker, index) for index in range(len(devices))]:
+            future.result()
+
+
+def _is_cupy_backend() -> bool:
+    try:
+        from dexp.utils.backends import CupyBackend
+
+        return isinstance(Backend.current(), CupyBackend)
+    except ImportError:
+        return False
+
+
+def _slice_shape(tile_slice: Tuple[slice, ...]) -> Tuple[int, ...]:
+    return tuple(s.stop - s.start for s in tile_slice)
+
+
+def _batch_slices(
+    slices: Sequence[Tuple[Tuple[slice, ...], Tuple[slice, ...]]], batch_size: int
+) -> List[List[Tuple[Tuple[slice, ...], Tuple[slice, ...]]]]:
+    """Groups tiles of same shape (with margins) into batches of at most 'batch_size' tiles."""
+    groups: Dict[Tuple[int, ...], List] = {}
+    for tile_slice, tile_slice_no_margins in slices:
+        groups.setdefault(_slice_shape(tile_slice), []).append((tile_slice, tile_slice_no_margins))
+
+    batches = []
+    for group in groups.values():
+        batches += [group[i : i + batch_size] for i in range(0, len(group), batch_size)]
+    return batches
+
+
+def _gather_batch(result: xpArray, result_batch: xpArray, batch: Sequence, shape: Tuple[int, ...]) -> None:
+    for result_tile, (tile_slice, tile_slice_no_margins) in zip(result_batch, batch):
+        remove_margin_slice_tuple = remove_margin_slice(shape, tile_slice, tile_slice_no_margins)
+        result[tile_slice_no_margins] = result_tile[remove_margin_slice_tuple]
+
+
+def _batch_loop(
+    denorm_fun: Callable,
+    function: Callable,
+    image: xpArray,
+    internal_dtype: numpy.dtype,
+    norm_fun: Callable,
+    result: xpArray,
+    shape: Tuple[int, ...],
+    batches: Sequence[Sequence],
+    to_numpy: bool,
+) -> None:
+    xp = Backend.get_xp_module()
+
+    for batch in batches:
+        image_batch = xp.stack(
+            [Backend.to_backend(image[tile_slice], dtype=internal_dtype) for tile_slice, _ in batch], axis=0
+        )
+        result_batch = denorm_fun(function(norm_fun(image_batch)))
+        if to_numpy:
+            result_batch = Backend.to_numpy(result_batch, dtype=internal_dtype)
+        else:
+            result_batch = Backend.to_backend(result_batch, dtype=internal_dtype)
+
+        _gather_batch(result, result_batch, batch, shape)
+
+
+def _streamed_batch_loop(
+    denorm_fun: Callable,
+    function: Callable,
+    image: numpy.ndarray,
+    internal_dtype: numpy.dtype,
+    norm_fun: Callable,
+    result: numpy.ndarray,
+    shape: Tuple[int, ...],
+    batches: Sequence[Sequence],
+) -> None:
+    """
+    Batched loop for the cupy backend: the next batch is gathered into a pinned host buffer and uploaded
+    on a copy stream while the current batch is computed on a compute stream, and the result of the current batch
+    is downloaded on the copy stream while the previous result is scattered into the output.
+    Two pinned and device buffers are used alternately per batch shape (double buffering).
+    """
+    import cupy
+    import cupyx
+
+    copy_stream = cupy.cuda.Stream(non_blocking=True)
+    compute_stream = cupy.cuda.Stream(non_blocking=True)
+
+    # (pinned input, device input, upload event, compute event) per batch shape and parity:
+    input_buffers = {}
+    # pinned output per batch shape and parity:
+    output_buffers = {}
+
+    def _upload(index: int):
+        batch = batches[index]
+        key = ((len(batch),) + _slice_shape(batch[0][0]), index % 2)
+        if key not in input_buffers:
+            input_buffers[key] = (
+                cupyx.empty_pinned(key[0], dtype=internal_dtype),
+                cupy.empty(key[0], dtype=internal_dtype),
+                None,
+                None,
+            )
+        pinned, device, upload_event, compute_event = input_buffers[key]
+
+        # the pinned buffer can be refilled once its previous upload is done:
+        if upload_event is not None:
+            upload_event.synchronize()
+        for i, (tile_slice, _) in enumerate(batch):
+            pinned[i] = image[tile_slice]
+
+        # the device buffer can be overwritten once its previous batch is computed:
+        if compute_event is not None:
+            copy_stream.wait_event(compute_event)
+        device.set(pinned, stream=copy_stream)
+        input_buffers[key] = (pinned, device, copy_stream.record(), compute_event)
+        return key
+
+    def _gather(pending) -> None:
+        # the device output is kept alive until its download is done:
+        batch, pinned_output, download_event, _ = pending
+        download_event.synchronize()
+        _gather_batch(result, pinned_output, batch, shape)
+
+    pending = None
+    key = _upload(0)
+    for index, batch in enumerate(batches):
+        pinned, device, upload_event, _ = input_buffers[key]
+
+        compute_stream.wait_event(upload_event)
+        with compute_stream:
+            output = denorm_fun(function(norm_fun(device)))
+            output = cupy.asarray(output, dtype=internal_dtype)
+        compute_event = compute_stream.record()
+        input_buffers[key] = (pinned, device, upload_event, compute_event)
+
+        # uploading the next batch while the current one is being computed:
+        if index + 1 < len(batches):
+            key = _upload(index + 1)
+
+        output_key = (output.shape, index % 2)
+        if output_key not in output_buffers:
+            output_buffers[output_key] = cupyx.empty_pinned(output.shape, dtype=internal_dtype)
+        pinned_output = output_buffers[output_key]
+
+        copy_stream.wait_event(compute_event)
+        output.get(stream=copy_stream, out=pinned_output)
+        download_event = copy_stream.record()
+
+        # scattering the previous batch while the current one is being downloaded:
+        if pending is not None:
+            _gather(pending)
+        pending = (batch, pinned_output, download_event, output)
+
+    if pending is not None:
+        _gather(pending)
+
+    copy_stream.synchronize()
+    compute_stream.synchronize()
+
+
 # Dask turned out not too work great here, HUGE overhead compared to the light approach above.
 # def scatter_gather_dask(backend: Backend,
 #                         function,
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+import numpy
+
+from dexp.utils import xpArray
+from dexp.utils.backends import Backend, CupyBackend
+from dexp.utils.config import inner_threads
+
+
+def subtract_and_clip(
+    array: xpArray,
+    zero_level: float = 0,
+    max_level: Optional[float] = None,
+    dtype: Optional[numpy.dtype] = None,
+    flip_axis: Optional[int] = None,
+    tile_size: int = 2**18,
+) -> xpArray:
+    """
+    Applies in a single pass over the array the per-voxel chain: conversion to a given dtype,
+    clipping of the intensities below the zero level and subtraction of the zero level,
+    clipping of the intensities above a maximal level, and optionally flipping along an axis.
+    The flip is free: the flipped view of the array is read, and the result written in order.
+    On GPUs the chain is a single elementwise kernel. On CPUs it is evaluated by tiles (slabs along the first axis)
+    small enough to stay in cache, in a pool of threads, without any full size temporary array.
+
+    The result is identical to the sequence: conversion to dtype, clip(array, zero_level, None) - zero_level,
+    clip(array, 0, max_level), and flip, where all operations are computed in the given dtype.
+    If there is nothing to do, the array itself is returned.
+
+    Parameters
+    ----------
+    array : array to process.
+    zero_level : intensities below the zero level are clipped and the zero level is subtracted.
+    max_level : if not None, intensities above are clipped, intensities below zero are also clipped then.
+    dtype : dtype of the result, by default the dtype of the array.
+    flip_axis : if not None, axis along which the array is flipped.
+    tile_size : approximate number of voxels per tile on CPUs.
+
+    Returns
+    -------
+    Processed array.
+    """
+    array = Backend.to_backend(array)
+    xp = Backend.get_xp_module()
+
+    if dtype is None:
+        dtype = array.dtype
+    dtype = numpy.dtype(dtype)
+
+    # the levels are in the output dtype, as in the GPU kernel:
+    zero_level = dtype.type(zero_level)
+    if max_level is not None:
+        max_level = dtype.type(max_level)
+
+    clip_low = zero_level != 0 or max_level is not None
+    if not clip_low and flip_axis is None:
+        return array.astype(dtype, copy=False)
+
+    if flip_axis is not None:
+        array = xp.flip(array, flip_axis)
+
+    if isinstance(Backend.current(), CupyBackend):
+        import cupy
+
+        result = cupy.empty(array.shape, dtype=dtype)
+        _subtract_and_clip_kernel()(
+            array,
+            zero_level,
+            0 if max_level is None else max_level,
+            clip_low,
+            max_level is not None,
+            result,
+        )
+        return result
+
+    result = numpy.empty(array.shape, dtype=dtype)
+    if array.ndim == 0 or array.size == 0:
+        numpy.copyto(result, array, casting="unsafe")
+        return result
+
+    def _process_tile(start: int) -> None:
+        tile = result[start : start + tile_length]
+        numpy.copyto(tile, array[start : start + tile_length], casting="unsafe")
+        if clip_low:
+            numpy.maximum(tile, zero_level, out=tile)
+            if zero_level != 0:
+                numpy.subtract(tile, zero_level, out=tile)
+        if max_level is not None:
+            numpy.minimum(tile, max_level, out=tile)
+
+    slab_size = max(1, int(numpy.prod(array.shape[1:], dtype=numpy.int64)))
+    tile_length = max(1, tile_size // slab_size)
+
+    with ThreadPoolExecutor(max_workers=max(1, inner_threads())) as executor:
+        list(executor.map(_process_tile, range(0, array.shape[0], tile_length)))
+
+    return result
+
+
+@lru_cache(maxsize=None)
+def _subtract_and_clip_kernel():
+    import cupy
+
+    return cupy.ElementwiseKernel(
+        "X x, Y zero_level, Y max_level, bool clip_low, bool clip_high",
+        "Y y",
+        """
+        Y v = x;
+        if (clip_low) v = v > zero_level ? v - zero_level : (Y)0;
+        if (clip_high && v > max_level) v = max_level;
+        y = v;
+        """,
+        "subtract_and_clip",
+    )
@@ -0,0 +1,33 @@
+import os
+
+from dexp.utils import config
+from dexp.utils.config import (
+    THREADS_ENVIRONMENT_VARIABLES,
+    inner_threads,
+    set_thread_budget,
+)
+
+
+def test_thread_budget(monkeypatch):
+    for variable in THREADS_ENVIRONMENT_VARIABLES:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setattr(config, "_INNER_THREADS", None)
+
+    # the process-wide Blosc and MKL thread counts are not changed for the following tests:
+    configured = []
+    monkeypatch.setattr(config, "config_blosc", lambda nb_threads=None: configured.append(("blosc", nb_threads)))
+    monkeypatch.setattr(config, "set_mkl_threads", lambda nb_threads=None: configured.append(("mkl", nb_threads)))
+
+    assert set_thread_budget(workers=6, nb_cores=64) == 10
+    assert inner_threads() == 10
+    assert configured == [("blosc", 10), ("mkl", 10)]
+    for variable in THREADS_ENVIRONMENT_VARIABLES:
+        assert os.environ[variable] == "10"
+
+    # more workers than cores:
+    assert set_thread_budget(workers=128, nb_cores=64) == 1
+
+    # worker processes inherit the budget from the environment:
+    monkeypatch.setattr(config, "_INNER_THREADS", None)
+    monkeypatch.setenv("BLOSC_NTHREADS", "3")
+    assert inner_threads() == 3
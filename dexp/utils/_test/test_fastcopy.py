@@ -0,0 +1,39 @@
+import os
+
+import numpy
+import pytest
+
+from dexp.datasets import ZDataset
+from dexp.utils import fastcopy as fastcopy_module
+from dexp.utils.fastcopy import fastcopy
+
+
+@pytest.mark.parametrize("store", ["dir", "ndir", "zip"])
+def test_fastcopy(tmp_path, monkeypatch, store: str):
+    # small segments, so that files are copied in several concurrent segments:
+    monkeypatch.setattr(fastcopy_module, "SEGMENT_SIZE", 1000)
+
+    dataset = ZDataset(tmp_path / "source.zarr", mode="w", store=store)
+    array = numpy.random.randint(0, 4096, size=(3, 8, 32, 32), dtype=numpy.uint16)
+    dataset.add_channel("channel", shape=array.shape, dtype=array.dtype, codec="zstd", clevel=0)
+    dataset.write_array("channel", array)
+    source = dataset.path
+    dataset.close()
+
+    dest = str(tmp_path / ("copy" + source[len(str(tmp_path / "source")) :]))
+    nb_copied, nb_skipped, nb_bytes = fastcopy(source, dest, nb_threads=4)
+    assert nb_copied > 0 and nb_skipped == 0 and nb_bytes > 0
+    assert numpy.array_equal(ZDataset(dest).get_array("channel")[:], array)
+
+    # second copy skips identical files:
+    for compare in ("mtime", "hash"):
+        nb_copied, nb_skipped, _ = fastcopy(source, dest, nb_threads=4, compare=compare)
+        assert nb_copied == 0 and nb_skipped > 0
+
+    # modified files are copied again:
+    if os.path.isdir(dest):
+        modified = os.path.join(dest, ".zgroup")
+        with open(modified, "w") as file:
+            file.write("{}")
+        nb_copied, _, _ = fastcopy(source, dest, nb_threads=2)
+        assert nb_copied == 1
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def _nbytes(value: Any) -> int:
+    """Returns the number of bytes of an array or of a list/tuple of arrays."""
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return int(getattr(value, "nbytes", 0))
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the memory footprint of its values.
+    Values are expected to be (lists or tuples of) numpy or cupy arrays.
+    """
+
+    def __init__(self, max_nbytes: int):
+        """
+        Instantiates a LRU cache.
+
+        Parameters
+        ----------
+        max_nbytes : maximal number of bytes held by the cache, least recently used entries are evicted beyond that.
+        """
+        self.max_nbytes = max_nbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        nbytes = _nbytes(value)
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            if nbytes > self.max_nbytes:
+                return
+            self._data[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_nbytes:
+                _, (_, evicted_nbytes) = self._data.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def get_or_compute(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Returns the cached value for the given key, or computes it with 'function' and caches it."""
+        value = self.get(key)
+        if value is None:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __str__(self) -> str:
+        return (
+            f"LRUCache(entries={len(self)}, nbytes={self.nbytes}/{self.max_nbytes}, "
+            + f"hits={self.hits}, misses={self.misses})"
+        )
@@ -1,12 +1,86 @@
 import multiprocessing
+import os
+from typing import Optional
 
+import blosc as python_blosc
 from arbol import aprint
 from numcodecs import blosc
 
+from dexp.processing.utils.mkl_util import set_mkl_threads
 
-def config_blosc():
-    _cpu_count = multiprocessing.cpu_count() // 2
-    _nb_threads = max(1, _cpu_count)
+# Environment variables read by the native thread pools of Blosc, OpenMP and BLAS libraries,
+# they are inherited by the worker processes (joblib's loky, dask nannies) started after the budget is set:
+THREADS_ENVIRONMENT_VARIABLES = (
+    "BLOSC_NTHREADS",
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# Number of threads per outer worker, set by 'set_thread_budget':
+_INNER_THREADS: Optional[int] = None
+
+
+def inner_threads() -> int:
+    """
+    Returns the number of threads available within each outer worker: set by 'set_thread_budget',
+    or inherited from the environment of the parent process, by default half the number of cores.
+    """
+    if _INNER_THREADS is not None:
+        return _INNER_THREADS
+    if "BLOSC_NTHREADS" in os.environ:
+        return max(1, int(os.environ["BLOSC_NTHREADS"]))
+    return max(1, multiprocessing.cpu_count() // 2)
+
+
+def config_blosc(nb_threads: Optional[int] = None):
+    """
+    Configures the number of threads used by BLOSC (numcodecs for zarr, and python-blosc).
+
+    Parameters
+    ----------
+    nb_threads : number of threads, by default the number of threads per worker of the thread budget.
+    """
+    if nb_threads is None:
+        nb_threads = inner_threads()
     blosc.use_threads = True
-    blosc.set_nthreads(_nb_threads)
+    blosc.set_nthreads(nb_threads)
+    python_blosc.set_nthreads(nb_threads)
     aprint(f"Configured the number of threads used by BLOSC: {blosc.get_nthreads()}")
+
+
+def set_thread_budget(workers: int = 1, nb_cores: Optional[int] = None) -> int:
+    """
+    Divides the cores between outer workers (joblib jobs, dask worker threads, ...) and the threads used within
+    each worker by Blosc, MKL and OpenMP/BLAS, so that they do not oversubscribe the cores.
+    The budget is applied to the current process, and exported as environment variables
+    for the worker processes started afterwards.
+
+    Parameters
+    ----------
+    workers : number of outer workers running concurrently.
+    nb_cores : number of cores to divide, by default all cores.
+
+    Returns
+    -------
+    Number of threads per worker.
+    """
+    global _INNER_THREADS
+
+    if nb_cores is None:
+        nb_cores = multiprocessing.cpu_count()
+    workers = max(1, workers)
+    _INNER_THREADS = max(1, nb_cores // workers)
+
+    for variable in THREADS_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(_INNER_THREADS)
+
+    config_blosc(_INNER_THREADS)
+    set_mkl_threads(_INNER_THREADS)
+
+    aprint(
+        f"Thread budget: {nb_cores} cores = {workers} worker(s) x {_INNER_THREADS} thread(s) "
+        f"(Blosc, MKL, OpenMP/BLAS), {workers * _INNER_THREADS} threads in total."
+    )
+    return _INNER_THREADS
@@ -1,7 +1,10 @@
 from typing import Sequence, Union
 
+from arbol import aprint
 from dask.distributed import Client, LocalCluster
 
+from dexp.utils.config import set_thread_budget
+
 
 def get_dask_client(scheduler_file_or_devices: Union[str, Sequence[int]]) -> Client:
 
@@ -17,4 +20,15 @@ def get_dask_client(scheduler_file_or_devices: Union[str, Sequence[int]]) -> Cli
 
         client = Client(cluster)
 
+        # divides the cores between the threads of the local workers and the threads used within each task:
+        nb_worker_threads = sum(worker["nthreads"] for worker in client.scheduler_info()["workers"].values())
+        aprint(f"Local dask cluster with {nb_worker_threads} worker thread(s).")
+        client.run(set_thread_budget, nb_worker_threads)
+        set_thread_budget(nb_worker_threads)
+
     return client
+
+
+def get_number_of_workers(client: Client) -> int:
+    """Returns the number of workers of a dask client, at least one."""
+    return max(1, len(client.scheduler_info()["workers"]))
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from arbol import aprint, asection
+
+# Files larger than this are split in segments copied concurrently:
+SEGMENT_SIZE = 2**26
+
+# Modes for detecting files already identical at the destination:
+COMPARE_MODES = ("mtime", "hash")
+
+
+def _list_files(source: str) -> List[str]:
+    """Lists the files of a directory tree, relative to it."""
+    files = []
+    stack = [""]
+    while stack:
+        relative_dir = stack.pop()
+        with os.scandir(os.path.join(source, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(relative_path)
+                else:
+                    files.append(relative_path)
+    return files
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**22), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_identical(source_path: str, dest_path: str, compare: str) -> bool:
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source_path)
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if compare == "mtime":
+        return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+    return _file_hash(source_path) == _file_hash(dest_path)
+
+
+def _copy_segment(source_path: str, dest_path: str, offset: int, length: int) -> None:
+    """Copies a segment of a file in the kernel (copy_file_range, or sendfile), without user-space buffers."""
+    with open(source_path, "rb") as source_file, open(dest_path, "r+b") as dest_file:
+        source_fd, dest_fd = source_file.fileno(), dest_file.fileno()
+        end = offset + length
+        position = offset
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                while position < end:
+                    copied = os.copy_file_range(source_fd, dest_fd, end - position, position, position)
+                    if copied == 0:
+                        break
+                    position += copied
+            except OSError:
+                # e.g. unsupported across file systems on older kernels, continues below:
+                pass
+
+        if position < end and hasattr(os, "sendfile"):
+            try:
+                os.lseek(dest_fd, position, os.SEEK_SET)
+                while position < end:
+                    copied = os.sendfile(dest_fd, source_fd, position, end - position)
+                    if copied == 0:
+                        break
+                    position += copied
+            except OSError:
+                pass
+
+        if position < end:
+            # buffered copy:
+            source_file.seek(position)
+            dest_file.seek(position)
+            while position < end:
+                block = source_file.read(min(2**22, end - position))
+                if not block:
+                    break
+                dest_file.write(block)
+                position += len(block)
+
+        if position < end:
+            raise IOError(f"Could not copy bytes [{position}, {end}) of '{source_path}' to '{dest_path}'")
+
+
+def fastcopy(
+    source: str,
+    dest: str,
+    nb_threads: int = 8,
+    compare: str = "mtime",
+) -> Tuple[int, int, int]:
+    """
+    Copies a file or a directory tree (e.g. zarr directory, nested directory or zip stores) with a pool of threads,
+    each file is copied by the kernel with 'os.copy_file_range' (zero-copy, reflinks or server-side copies
+    where supported), falling back to 'os.sendfile' and then to buffered copies.
+    Large files are split in segments copied concurrently. The directory layout, modes and modification times
+    are preserved, files already identical at the destination are skipped, so that an interrupted copy resumes.
+
+    Parameters
+    ----------
+    source : source file or directory.
+    dest : destination file or directory.
+    nb_threads : number of copying threads.
+    compare : how files already identical at the destination are detected: 'mtime' (same size and modification
+        time) or 'hash' (same size and content hash).
+
+    Returns
+    -------
+    Number of copied files, number of skipped files, number of copied bytes.
+    """
+    if compare not in COMPARE_MODES:
+        raise ValueError(f"Invalid comparison mode '{compare}', must be one of {COMPARE_MODES}.")
+
+    if os.path.isdir(source):
+        relative_paths = _list_files(source)
+    else:
+        relative_paths = [""]
+
+    def _paths(relative_path: str) -> Tuple[str, str]:
+        if relative_path == "":
+            return source, dest
+        return os.path.join(source, relative_path), os.path.join(dest, relative_path)
+
+    with asection(f"Fast copying {len(relative_paths)} file(s) from '{source}' to '{dest}' with {nb_threads} threads"):
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executor:
+            identical = list(
+                executor.map(lambda relative_path: _is_identical(*_paths(relative_path), compare), relative_paths)
+            )
+
+            # destination files are created with their final size, then filled segment by segment:
+            to_copy = [relative_path for relative_path, same in zip(relative_paths, identical) if not same]
+            segments = []
+            nb_bytes = 0
+            for relative_path in to_copy:
+                source_path, dest_path = _paths(relative_path)
+                os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+                size = os.path.getsize(source_path)
+                with open(dest_path, "wb") as dest_file:
+                    dest_file.truncate(size)
+                segments += [
+                    (source_path, dest_path, offset, min(SEGMENT_SIZE, size - offset))
+                    for offset in range(0, size, SEGMENT_SIZE)
+                ]
+                nb_bytes += size
+
+            # largest segments first, for a better load balance:
+            segments.sort(key=lambda segment: -segment[3])
+            list(executor.map(lambda segment: _copy_segment(*segment), segments))
+
+        # modification times are set last, an interrupted copy never looks identical:
+        for relative_path in to_copy:
+            source_path, dest_path = _paths(relative_path)
+            shutil.copystat(source_path, dest_path)
+
+        elapsed = time.time() - start
+        aprint(
+            f"Copied {len(to_copy)} file(s), skipped {len(relative_paths) - len(to_copy)} identical file(s), "
+            f"{nb_bytes / 1e6:.1f} MB in {elapsed:.2f}s ({nb_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)."
+        )
+
+    return len(to_copy), len(relative_paths) - len(to_copy), nb_bytes